@@ -0,0 +1,212 @@
+""" Benchmarks of array operations on a single machine
+
+Run all benchmarks from the command line::
+
+    $ python -m dask.array.benchmarks
+    $ python -m dask.array.benchmarks --size 2000 --chunk 250 --depth 2
+
+or from Python:
+
+>>> from dask.array.benchmarks import run_benchmarks
+>>> run_benchmarks()  # doctest: +SKIP
+{'map_overlap-2d': 191233874.6, 'map_overlap-3d': 98710238.1,
+ 'rechunk-2d': 312771052.9, 'rechunk-3d': 171154370.4,
+ 'elemwise': 266083914.7, 'elemwise-unfused': 205418297.2,
+ 'elemwise-memory': 2126512, 'elemwise-unfused-memory': 2626832}
+"""
+from __future__ import print_function, division
+
+from time import time
+
+import numpy as np
+
+from . import random
+from .core import from_array, sin
+from .optimization import optimize
+from .wrap import ones
+from .. import threaded
+from ..async import get_sync
+
+
+def laplacian(x):
+    """ Discrete Laplacian of a block, wrapping around at its edges
+
+    The wrapped cells on the edges are trimmed away by ``map_overlap``.
+
+    >>> laplacian(np.array([0., 1., 4., 9., 16.]))
+    array([ 17.,   2.,   2.,   2., -23.])
+    """
+    out = -2 * x.ndim * x
+    for axis in range(x.ndim):
+        out += np.roll(x, 1, axis)
+        out += np.roll(x, -1, axis)
+    return out
+
+
+def map_overlap_throughput(shape, chunks, depth=1, boundary='reflect',
+                           func=laplacian, nrounds=3):
+    """ Bytes per second of ``map_overlap`` on a random array
+
+    Best of ``nrounds`` computations with the threaded scheduler.
+    """
+    x = random.random(shape, chunks=chunks)
+    y = x.map_overlap(func, depth=depth, boundary=boundary)
+    nbytes = np.prod(shape) * 8
+    durations = []
+    for i in range(nrounds):
+        start = time()
+        y.compute()
+        durations.append(time() - start)
+    return nbytes / min(durations)
+
+
+def rechunk_throughput(shape, old, new, nrounds=3):
+    """ Bytes per second of rechunking an array from ``old`` to ``new`` chunks
+
+    Best of ``nrounds`` computations with the threaded scheduler.
+    """
+    y = ones(shape, chunks=old).rechunk(new)
+    nbytes = np.prod(shape) * 8
+    durations = []
+    for i in range(nrounds):
+        start = time()
+        y.compute()
+        durations.append(time() - start)
+    return nbytes / min(durations)
+
+
+def expression(x, y, z):
+    """ A large elementwise expression, see ``fuse_elemwise`` """
+    return (sin(x) * y + 1) ** 2 - z / 3 * (x - y)
+
+
+def _elemwise_sum(shape, chunks, func):
+    """ Sum of func on three random arrays held in memory """
+    x, y, z = [from_array(np.random.random(shape), chunks=chunks)
+               for i in range(3)]
+    return func(x, y, z).sum()
+
+
+def _compute(x, elemwise=True, get=threaded.get):
+    """ Compute x, with or without ``fuse_elemwise`` """
+    keys = x._keys()
+    return get(optimize(x.dask, keys, elemwise=elemwise), keys)
+
+
+def elemwise_throughput(shape, chunks, func=expression, nrounds=3,
+                        elemwise=True):
+    """ Bytes of input per second of an elementwise expression of three arrays
+
+    The inputs are held in memory.  We sum the result so that we measure the
+    expression rather than the concatenation of its blocks.  Best of
+    ``nrounds`` computations with the threaded scheduler, with or without
+    ``fuse_elemwise``.
+    """
+    s = _elemwise_sum(shape, chunks, func)
+    nbytes = 3 * np.prod(shape) * 8
+    durations = []
+    for i in range(nrounds):
+        start = time()
+        _compute(s, elemwise)
+        durations.append(time() - start)
+    return nbytes / min(durations)
+
+
+def elemwise_memory(shape, chunks, func=expression, elemwise=True):
+    """ Peak bytes allocated by an elementwise expression of three arrays
+
+    NumPy reports its arrays to ``tracemalloc``, so this counts the blocks
+    and temporaries of the computation but not the inputs held in memory.
+    We compute one block at a time so that the result does not depend on
+    the number of threads.  Returns None without ``tracemalloc`` (Python 2).
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    s = _elemwise_sum(shape, chunks, func)
+    tracemalloc.start()
+    try:
+        _compute(s, elemwise, get=get_sync)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(size=2000, chunk=250, depth=1, boundary='reflect',
+                   nrounds=3):
+    """ Run all benchmarks, return dict of results
+
+    The 2-D benchmarks run on a square of side ``size``.  The 3-D
+    benchmarks run on a cube with the same number of elements.  The rechunk
+    benchmarks turn slabs of ``chunk`` rows into slabs of ``chunk`` columns,
+    like a transposition, see ``plan_rechunk``.  The elemwise benchmarks
+    evaluate ``expression`` on three squares of side ``size``, with and
+    without ``fuse_elemwise``.  Their peak memory is only measured where
+    ``tracemalloc`` is available.
+    """
+    side = int(round(size ** (2. / 3)))
+    block = max(int(round(chunk ** (2. / 3))), 2 * depth)
+    results = {'map_overlap-2d': map_overlap_throughput((size, size),
+                                                        (chunk, chunk),
+                                                        depth, boundary,
+                                                        nrounds=nrounds),
+               'map_overlap-3d': map_overlap_throughput((side,) * 3,
+                                                        (block,) * 3,
+                                                        depth, boundary,
+                                                        nrounds=nrounds),
+               'rechunk-2d': rechunk_throughput((size, size),
+                                                (chunk, size), (size, chunk),
+                                                nrounds=nrounds),
+               'rechunk-3d': rechunk_throughput((side,) * 3,
+                                                (block, side, side),
+                                                (side, side, block),
+                                                nrounds=nrounds),
+               'elemwise': elemwise_throughput((size, size), (chunk, chunk),
+                                               nrounds=nrounds),
+               'elemwise-unfused': elemwise_throughput((size, size),
+                                                       (chunk, chunk),
+                                                       nrounds=nrounds,
+                                                       elemwise=False)}
+    for suffix, elemwise in [('', True), ('-unfused', False)]:
+        nbytes = elemwise_memory((size, size), (chunk, chunk),
+                                 elemwise=elemwise)
+        if nbytes is not None:
+            results['elemwise%s-memory' % suffix] = nbytes
+    return results
+
+
+def main(args=None):
+    import argparse  # not in Python 2.6
+    parser = argparse.ArgumentParser(
+            description='Benchmark dask.array on this machine')
+    parser.add_argument('--size', type=int, default=2000,
+                        help='side of the 2-D array')
+    parser.add_argument('--chunk', type=int, default=250,
+                        help='side of the 2-D blocks, width of the slabs')
+    parser.add_argument('--depth', type=int, default=1)
+    parser.add_argument('--boundary', default='reflect')
+    parser.add_argument('--nrounds', type=int, default=3)
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(size=args.size, chunk=args.chunk,
+                             depth=args.depth, boundary=args.boundary,
+                             nrounds=args.nrounds)
+
+    print('map_overlap 2-D:  %10.1f MB/s' % (results['map_overlap-2d'] / 1e6))
+    print('map_overlap 3-D:  %10.1f MB/s' % (results['map_overlap-3d'] / 1e6))
+    print('rechunk 2-D:      %10.1f MB/s' % (results['rechunk-2d'] / 1e6))
+    print('rechunk 3-D:      %10.1f MB/s' % (results['rechunk-3d'] / 1e6))
+    print('elemwise:         %10.1f MB/s' % (results['elemwise'] / 1e6))
+    print('elemwise unfused: %10.1f MB/s' %
+          (results['elemwise-unfused'] / 1e6))
+    if 'elemwise-memory' in results:
+        print('elemwise:         %10.1f MB peak' %
+              (results['elemwise-memory'] / 1e6))
+        print('elemwise unfused: %10.1f MB peak' %
+              (results['elemwise-unfused-memory'] / 1e6))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ import inspect
 from numbers import Number
 from collections import Iterable, MutableMapping
 from bisect import bisect
+from hashlib import md5
 from itertools import product
 from collections import Iterator
 from functools import partial, wraps
@@ -51,6 +52,38 @@ def getarray(a, b, lock=None):
     return c
 
 
+class ElemwiseFunction(object):
+    """ A function declared to operate elementwise on its array arguments
+
+    Applying the function and then slicing the result gives the same as
+    slicing the arguments and then applying the function.  The optimizer uses
+    this to read only the parts of the inputs that are needed, see
+    ``map_blocks(..., elementwise=True)``.
+
+    >>> f = ElemwiseFunction(np.sqrt)
+    >>> f(np.array([1.0, 4.0]))
+    array([ 1.,  2.])
+    """
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    @property
+    def __name__(self):
+        return getattr(self.func, '__name__', type(self.func).__name__)
+
+    def __eq__(self, other):
+        return type(other) is ElemwiseFunction and self.func == other.func
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.func)
+
+
 from .optimization import optimize
 
 
@@ -416,6 +449,13 @@ def map_blocks(func, *arrs, **kwargs):
 
     >>> def func(block, block_id=None):
     ...     pass
+
+    Declare functions that operate elementwise with ``elementwise=True``.
+    Slicing the result then reads only the needed parts of the inputs.
+
+    >>> y = x.map_blocks(np.sqrt, elementwise=True)
+    >>> y[:2].compute()  # reads and computes only x[:2]
+    array([ 0.,  1.])
     """
     if not callable(func):
         raise TypeError("First argument must be callable function, not %s\n"
@@ -424,6 +464,10 @@ def map_blocks(func, *arrs, **kwargs):
                 type(func).__name__)
     dtype = kwargs.get('dtype')
     assert all(isinstance(arr, Array) for arr in arrs)
+    elementwise = kwargs.get('elementwise', False)
+    if elementwise and kwargs.get('chunks') is not None:
+        raise ValueError("Elementwise functions keep the chunks of their "
+                         "inputs, can not specify chunks")
 
     inds = [tuple(range(x.ndim))[::-1] for x in arrs]
     args = list(concat(zip(arrs, inds)))
@@ -441,6 +485,10 @@ def map_blocks(func, *arrs, **kwargs):
     if spec and 'block_id' in spec.args:
         for k in core.flatten(result._keys()):
             result.dask[k] = (partial(func, block_id=k[1:]),) + result.dask[k][1:]
+    if elementwise:
+        for k in core.flatten(result._keys()):
+            result.dask[k] = ((ElemwiseFunction(result.dask[k][0]),) +
+                              result.dask[k][1:])
 
     # Assert user specified chunks
     chunks = kwargs.get('chunks')
@@ -828,9 +876,7 @@ class Array(Base):
             raise IndexError("All indexers must have the same length, got\n"
                     "\t%s" % str(key))
         key = key + (slice(None, None),) * (self.ndim - len(key))
-        key = [i if isinstance(i, list) else
-               i.tolist() if isinstance(i, np.ndarray) else
-               None for i in key]
+        key = [i if isinstance(i, (list, np.ndarray)) else None for i in key]
         return _vindex(self, *key)
 
     @property
@@ -1031,8 +1077,9 @@ class Array(Base):
         return vnorm(self, ord=ord, axis=axis, keepdims=keepdims)
 
     @wraps(map_blocks)
-    def map_blocks(self, func, chunks=None, dtype=None):
-        return map_blocks(func, self, chunks=chunks, dtype=dtype)
+    def map_blocks(self, func, chunks=None, dtype=None, elementwise=False):
+        return map_blocks(func, self, chunks=chunks, dtype=dtype,
+                          elementwise=elementwise)
 
     def map_overlap(self, func, depth, boundary=None, trim=True, **kwargs):
         """ Map a function over blocks of the array with some overlap
@@ -1076,9 +1123,9 @@ class Array(Base):
     def squeeze(self):
         return squeeze(self)
 
-    def rechunk(self, chunks):
+    def rechunk(self, chunks, **kwargs):
         from .rechunk import rechunk
-        return rechunk(self, chunks)
+        return rechunk(self, chunks, **kwargs)
 
 
 normalize_token.register(Array, lambda a: a.name)
@@ -1563,6 +1610,8 @@ def partial_by_order(op, other):
     else:
         other_arg = '...'
     f.__name__ = '{0}({1})'.format(op.__name__, other_arg)
+    f.op = op
+    f.other = other
     return f
 
 
@@ -2287,55 +2336,95 @@ def _vindex(x, *indexes):
     >>> result = _vindex(d, [0, 1, 6, 0], [0, 1, 0, 7])
     >>> result.compute()
     array([ 0,  9, 48,  7])
+
+    We assign points to blocks with one ``searchsorted`` per axis and group
+    them with one ``argsort``, so this scales to millions of points.  Tasks
+    hold the points of each block as arrays.
     """
-    indexes = [list(index) if index is not None else index for index in indexes]
-    bounds = [list(accumulate(add, (0,) + c)) for c in x.chunks]
-    bounds2 = [b for i, b in zip(indexes, bounds) if i is not None]
+    indexes = [_vindex_array(index, dim) if index is not None else None
+               for index, dim in zip(indexes, x.shape)]
     axis = _get_axis(indexes)
-
-    points = list()
-    for i, idx in enumerate(zip(*[i for i in indexes if i is not None])):
-        block_idx = [np.searchsorted(b, ind, 'right') - 1
-                     for b, ind in zip(bounds2, idx)]
-        inblock_idx = [ind - bounds2[k][j]
-                    for k, (ind, j) in enumerate(zip(idx, block_idx))]
-        points.append((i, tuple(block_idx), tuple(inblock_idx)))
-
-    per_block = groupby(1, points)
-    per_block = dict((k, v) for k, v in per_block.items() if v)
+    arrays = [i for i in indexes if i is not None]
+    npoints = len(arrays[0])
+    bounds = [np.cumsum((0,) + c) for c, i in zip(x.chunks, indexes)
+              if i is not None]
+    numblocks = [len(c) for c, i in zip(x.chunks, indexes) if i is not None]
+
+    block_idx = [np.searchsorted(b, ind, 'right') - 1
+                 for b, ind in zip(bounds, arrays)]
+    inblock_idx = [ind - b[j] for b, ind, j in zip(bounds, arrays, block_idx)]
+
+    # Group points by block, keeping their order within each block
+    if npoints:
+        flat = np.ravel_multi_index(block_idx, numblocks)
+        order = np.argsort(flat, kind='mergesort')
+        flat = flat[order]
+        splits = np.flatnonzero(np.diff(flat)) + 1
+        starts = np.concatenate([[0], splits])
+        stops = np.concatenate([splits, [npoints]])
+        blocks = [tuple(int(j[order[start]]) for j in block_idx)
+                  for start in starts]
+        locations = [order[start:stop] for start, stop in zip(starts, stops)]
+        inblocks = [[i[loc] for i in inblock_idx] for loc in locations]
+    else:
+        blocks = locations = inblocks = []
 
     other_blocks = list(product(*[list(range(len(c))) if i is None else [None]
                                 for i, c in zip(indexes, x.chunks)]))
 
-    token = tokenize(x, indexes)
+    token = tokenize(x, [_array_token(i) if i is not None else None
+                         for i in indexes])
     name = 'vindex-slice-' + token
 
-    full_slices = [slice(None, None) if i is None else None for i in indexes]
+    point_axes = tuple(i for i, index in enumerate(indexes)
+                       if index is not None)
 
     dsk = dict((keyname(name, i, okey),
                 (_vindex_transpose,
                   (_vindex_slice, (x.name,) + interleave_none(okey, key),
-                     interleave_none(full_slices, list(zip(*pluck(2, per_block[key]))))),
+                     np.array(inblock), point_axes),
                   axis))
-                for i, key in enumerate(per_block)
+                for i, (key, inblock) in enumerate(zip(blocks, inblocks))
                 for okey in other_blocks)
 
-    if per_block:
+    if blocks:
         dsk2 = dict((keyname('vindex-merge-' + token, 0, okey),
                      (_vindex_merge,
-                       [list(pluck(0, per_block[key])) for key in per_block],
-                       [keyname(name, i, okey) for i in range(len(per_block))]))
+                       locations,
+                       [keyname(name, i, okey) for i in range(len(blocks))]))
                      for okey in other_blocks)
     else:
         dsk2 = dict()
 
     chunks = [c for i, c in zip(indexes, x.chunks) if i is None]
-    chunks.insert(0, (len(points),) if points else ())
+    chunks.insert(0, (npoints,) if npoints else ())
     chunks = tuple(chunks)
 
     return Array(merge(x.dask, dsk, dsk2), 'vindex-merge-' + token, chunks, x.dtype)
 
 
+def _vindex_array(index, dim):
+    """ Normalize a point-wise index into an array of non-negative integers
+
+    >>> _vindex_array([1, -1, 2], 5)
+    array([1, 4, 2])
+    """
+    index = np.asarray(index)
+    if not len(index):
+        return index.astype(np.intp)
+    if index.dtype.kind not in 'iu':
+        raise IndexError("vindex expects integer indices, got %s"
+                         % index.dtype)
+    if (index >= dim).any() or (index < -dim).any():
+        raise IndexError("Index out of bounds for axis of length %d" % dim)
+    return np.where(index < 0, index + dim, index).astype(np.intp)
+
+
+def _array_token(index):
+    """ Deterministic token of the contents of an integer array """
+    return md5(np.ascontiguousarray(index).view('u1')).hexdigest()
+
+
 def _get_axis(indexes):
     """ Get axis along which point-wise slicing results lie
 
@@ -2356,10 +2445,23 @@ def _get_axis(indexes):
     return x2.shape.index(1)
 
 
-def _vindex_slice(block, points):
-    """ Pull out point-wise slices from block """
-    points = [p if isinstance(p, slice) else list(p) for p in points]
-    return block[tuple(points)]
+def _vindex_slice(block, points, axes):
+    """ Pull out point-wise slices from block
+
+    ``points`` has one row of indices for each of ``axes``.  We keep all of
+    the other axes.
+
+    >>> block = np.arange(12).reshape((3, 4))
+    >>> _vindex_slice(block, np.array([[0, 2], [1, 3]]), (0, 1))
+    array([ 1, 11])
+    >>> _vindex_slice(block, np.array([[0, 2]]), (0,))
+    array([[ 0,  1,  2,  3],
+           [ 8,  9, 10, 11]])
+    """
+    index = [slice(None, None)] * block.ndim
+    for axis, row in zip(axes, points):
+        index[axis] = row
+    return block[tuple(index)]
 
 def _vindex_transpose(block, axis):
     """ Rotate block so that points are on the first dimension """
@@ -2378,7 +2480,7 @@ def _vindex_merge(locations, values):
            [40, 50, 60],
            [10, 20, 30]])
     """
-    locations = list(map(list, locations))
+    locations = list(locations)
     values = list(values)
 
     n = sum(map(len, locations))
@@ -1,23 +1,24 @@
 from __future__ import absolute_import
 
 from functools import partial
+from itertools import product
+from operator import getitem
 
 import numpy as np
 import numpy.fft as npfft
+from toolz import merge
 
-from .core import map_blocks
+from ..base import tokenize
+from .core import Array, map_blocks, concatenate
+from . import wrap
 
 
-chunk_error = ("Dask array only supports taking an FFT along an axis that \n"
-               "has a single chunk. An FFT operation was tried on axis %s \n"
-               "which has chunks %s. To change the array's chunks use "
-               "dask.Array.rechunk.")
-
 fft_preamble = """
     Wrapping of numpy.fft.%s
 
-    The axis along which the FFT is applied must have a one chunk. To change
-    the array's chunking use dask.Array.rechunk.
+    Axes with a single chunk are transformed block by block with numpy.
+    Axes with many chunks are transformed with the four-step algorithm, see
+    ``chunked_fft``, and keep blocks of about the same size.
 
     The numpy.fft.%s docstring follows below:
 
@@ -26,10 +27,12 @@ fft_preamble = """
 
 def _fft_wrap(fft_func, dtype, out_chunk_fn):
     def func(a, n=None, axis=-1):
+        if axis < 0:
+            axis += a.ndim
         if len(a.chunks[axis]) != 1:
-            raise ValueError(chunk_error % (axis, a.chunks[axis]))
+            return _chunked[fft_func.__name__](a, n, axis)
 
-        chunks = out_chunk_fn(a, n, axis)
+        chunks = tuple(out_chunk_fn(a, n, axis))
 
         return map_blocks(partial(fft_func, n=n, axis=axis), a, dtype=dtype,
                           chunks=chunks)
@@ -40,6 +43,313 @@ def _fft_wrap(fft_func, dtype, out_chunk_fn):
     return func
 
 
+def _factor(n):
+    """ Split n into n1 * n2 with n1 <= n2 and n2 as close to sqrt(n) as
+    possible
+
+    >>> _factor(12)
+    (3, 4)
+    >>> _factor(13)
+    (1, 13)
+    """
+    n2 = int(np.ceil(np.sqrt(n)))
+    while n % n2:
+        n2 += 1
+    return n // n2, n2
+
+
+def _split_axis(block, axis, n2):
+    """ Reshape axis of length r * n2 into two axes (r, n2) """
+    shape = block.shape
+    return block.reshape(shape[:axis] + (-1, n2) + shape[axis + 1:])
+
+
+def _merge_axes(block, axis):
+    """ Flatten axes (n1, m) into one axis of length m * n1, column first """
+    block = np.swapaxes(block, axis, axis + 1)
+    shape = block.shape
+    return block.reshape(shape[:axis] + (-1,) + shape[axis + 2:])
+
+
+def _twiddle(block, axis, n, offset, sign):
+    """ Multiply block by exp(sign * 2j * pi * k1 * n2 / n)
+
+    ``k1`` counts along ``axis`` from zero, ``n2`` along ``axis + 1`` from
+    ``offset``.
+    """
+    k1 = np.arange(block.shape[axis])
+    n2 = np.arange(offset, offset + block.shape[axis + 1])
+    phase = np.outer(k1, n2) % n  # exact, keeps the angles small
+    shape = [1] * block.ndim
+    shape[axis] = len(k1)
+    shape[axis + 1] = len(n2)
+    return block * np.exp(sign * 2j * np.pi * phase / n).reshape(shape)
+
+
+def _chirp(block, axis, n, offset, sign):
+    """ Multiply block by exp(sign * 1j * pi * k ** 2 / n)
+
+    ``k`` counts along ``axis`` from ``offset``.
+    """
+    k = np.arange(offset, offset + block.shape[axis]) % (2 * n)
+    phase = k * k % (2 * n)  # exact, keeps the angles small
+    shape = [1] * block.ndim
+    shape[axis] = len(k)
+    return block * np.exp(sign * 1j * np.pi * phase / n).reshape(shape)
+
+
+def _chirp_filter(n, m, start, stop, sign):
+    """ Values start to stop of the length m filter of Bluestein's algorithm
+
+    Holds exp(-sign * 1j * pi * k ** 2 / n) at k and m - k for k < n, zeros
+    in between.
+    """
+    i = np.arange(start, stop)
+    k = np.where(i < n, i, m - i)
+    out = np.exp(-sign * 1j * np.pi * (k * k % (2 * n)) / n)
+    out[k >= n] = 0
+    return out
+
+
+def _multiply_along(block, vector, axis):
+    """ Multiply block by vector along axis """
+    shape = [1] * block.ndim
+    shape[axis] = len(vector)
+    return block * vector.reshape(shape)
+
+
+def _blocks(x, axis, n):
+    """ Blocks of about ``n`` elements along ``axis`` for a chunk of x """
+    return max(1, max(x.chunks[axis]) // n)
+
+
+def _even_chunks(n, size):
+    """ Chunks of ``size`` covering ``n``
+
+    >>> _even_chunks(10, 4)
+    (4, 4, 2)
+    """
+    return (size,) * (n // size) + ((n % size,) if n % size else ())
+
+
+def chunked_fft(a, axis, inverse=False):
+    """ FFT or inverse FFT along an axis that has many chunks
+
+    We use the four-step algorithm.  With n = n1 * n2 we view the axis as
+    an (n1, n2) matrix of rows of n2 consecutive values:
+
+    1.  Rechunk so that each task holds all n1 values of a few columns
+    2.  Transform the columns with numpy and multiply by the twiddle
+        factors exp(-2j * pi * k1 * n2 / n)
+    3.  Rechunk so that each task holds all n2 values of a few rows and
+        transform the rows
+    4.  Rechunk back to columns.  Column k2 holds the outputs k2 * n1 to
+        (k2 + 1) * n1, we write them out in that order
+
+    The rechunks are transpositions of the matrix, see ``rechunk``.  Each
+    task holds about as many values as a block of the input, but at least
+    n1 or n2 values.  Lengths without a divisor near sqrt(n), e.g. primes or
+    twice a prime, would need tasks of nearly all n values.  We transform
+    those with Bluestein's algorithm instead, as a convolution of length
+    m >= 2 * n - 1 that we compute with FFTs of a power of two length, see
+    ``bluestein_fft``.
+
+    >>> import dask.array as da
+    >>> x = da.from_array(np.arange(12.), chunks=4)
+    >>> y = chunked_fft(x, axis=0)
+    >>> np.allclose(y.compute(), np.fft.fft(np.arange(12.)))
+    True
+    """
+    func = npfft.ifft if inverse else npfft.fft
+    n = a.shape[axis]
+    if len(a.chunks[axis]) == 1:
+        return map_blocks(partial(func, axis=axis), a, dtype=np.complex_)
+    n1, n2 = _factor(n)
+    if n2 > 16 * n1:
+        return bluestein_fft(a, axis, inverse)
+    if n1 == 1:  # short prime length
+        a = a.rechunk({axis: n})
+        return map_blocks(partial(func, axis=axis), a, dtype=np.complex_)
+
+    token = tokenize(a, axis, inverse)
+
+    # rows of n2 consecutive values become a new axis
+    rows = _even_chunks(n1, _blocks(a, axis, n2))
+    a = a.rechunk({axis: tuple(r * n2 for r in rows)})
+    name = 'fft-split-' + token
+    dsk = dict(((name,) + idx[:axis + 1] + (0,) + idx[axis + 1:],
+                (_split_axis, (a.name,) + idx, axis, n2))
+               for idx in product(*map(range, a.numblocks)))
+    chunks = a.chunks[:axis] + (rows, (n2,)) + a.chunks[axis + 1:]
+    x = Array(merge(dsk, a.dask), name, chunks, dtype=a._dtype)
+
+    # transform columns, then twiddle
+    x = x.rechunk({axis: n1, axis + 1: _blocks(a, axis, n1)})
+    x = map_blocks(partial(func, axis=axis), x, dtype=np.complex_)
+    name = 'fft-twiddle-' + token
+    offsets = np.cumsum((0,) + x.chunks[axis + 1][:-1]).tolist()
+    sign = 1 if inverse else -1
+    dsk = dict(((name,) + idx,
+                (_twiddle, (x.name,) + idx, axis, n, offsets[idx[axis + 1]],
+                 sign))
+               for idx in product(*map(range, x.numblocks)))
+    x = Array(merge(dsk, x.dask), name, x.chunks, dtype=np.complex_)
+
+    # transform rows
+    x = x.rechunk({axis: _blocks(a, axis, n2), axis + 1: n2})
+    x = map_blocks(partial(func, axis=axis + 1), x, dtype=np.complex_)
+
+    # columns are contiguous in the output
+    x = x.rechunk({axis: n1, axis + 1: _blocks(a, axis, n1)})
+    name = 'fft-merge-' + token
+    dsk = dict(((name,) + idx[:axis] + idx[axis + 1:],
+                (_merge_axes, (x.name,) + idx, axis))
+               for idx in product(*map(range, x.numblocks)))
+    chunks = (x.chunks[:axis] + (tuple(c * n1 for c in x.chunks[axis + 1]),) +
+              x.chunks[axis + 2:])
+    return Array(merge(dsk, x.dask), name, chunks, dtype=np.complex_)
+
+
+def bluestein_fft(a, axis, inverse=False):
+    """ FFT or inverse FFT along an axis of any length, as a convolution
+
+    With jk = (j ** 2 + k ** 2 - (k - j) ** 2) / 2 the transform of x is
+
+        X[k] = c[k] * sum_j (x[j] * c[j]) * conj(c[k - j])
+
+    for the chirp c[j] = exp(-1j * pi * j ** 2 / n).  We zero-pad x * c to
+    the next power of two m >= 2 * n - 1 and compute the convolution with
+    three ``chunked_fft`` of length m, which factor well.  This costs about
+    six times as much work as a transform of length n, but each task holds
+    about as many values as a block of the input for any n.
+
+    >>> import dask.array as da
+    >>> x = da.from_array(np.arange(13.), chunks=4)
+    >>> y = bluestein_fft(x, axis=0)
+    >>> np.allclose(y.compute(), np.fft.fft(np.arange(13.)))
+    True
+    """
+    n = a.shape[axis]
+    m = 2 ** int(np.ceil(np.log2(2 * n - 1)))
+    sign = 1 if inverse else -1
+    token = tokenize(a, axis, inverse)
+
+    name = 'bluestein-chirp-' + token
+    offsets = np.cumsum((0,) + a.chunks[axis][:-1]).tolist()
+    dsk = dict(((name,) + idx,
+                (_chirp, (a.name,) + idx, axis, n, offsets[idx[axis]], sign))
+               for idx in product(*map(range, a.numblocks)))
+    x = Array(merge(dsk, a.dask), name, a.chunks, dtype=np.complex_)
+    x = chunked_fft(_resize(x, m, axis), axis)
+
+    name = 'bluestein-filter-' + token
+    chunks = _even_chunks(m, max(a.chunks[axis]))
+    starts = np.cumsum((0,) + chunks).tolist()
+    dsk = dict(((name, i), (_chirp_filter, n, m, starts[i], starts[i + 1],
+                            sign))
+               for i in range(len(chunks)))
+    b = chunked_fft(Array(dsk, name, (chunks,), dtype=np.complex_), 0)
+    b = b.rechunk((x.chunks[axis],))
+
+    name = 'bluestein-convolve-' + token
+    dsk = dict(((name,) + idx,
+                (_multiply_along, (x.name,) + idx, (b.name, idx[axis]), axis))
+               for idx in product(*map(range, x.numblocks)))
+    x = Array(merge(dsk, x.dask, b.dask), name, x.chunks, dtype=np.complex_)
+    x = _slice_axis(chunked_fft(x, axis, inverse=True), axis, 0, n)
+    x = x.rechunk({axis: a.chunks[axis]})
+
+    name = 'bluestein-' + token
+    dsk = dict(((name,) + idx,
+                (_chirp, (x.name,) + idx, axis, n, offsets[idx[axis]], sign))
+               for idx in product(*map(range, x.numblocks)))
+    x = Array(merge(dsk, x.dask), name, x.chunks, dtype=np.complex_)
+    if inverse:
+        x = map_blocks(partial(np.multiply, 1. / n), x, dtype=np.complex_)
+    return x
+
+
+def _resize(a, n, axis):
+    """ Truncate or zero-pad a along axis to length n, like numpy.fft """
+    if n is None or n == a.shape[axis]:
+        return a
+    if n < a.shape[axis]:
+        return a[(slice(None),) * axis + (slice(0, n),)]
+    chunks = list(a.chunks)
+    chunks[axis] = _even_chunks(n - a.shape[axis], max(a.chunks[axis]))
+    pad = wrap.zeros(tuple(map(sum, chunks)), chunks=tuple(chunks),
+                     dtype=a._dtype)
+    return concatenate([a, pad], axis=axis)
+
+
+def _slice_axis(a, axis, start, stop):
+    return a[(slice(None),) * axis + (slice(start, stop),)]
+
+
+def _reverse(a, axis):
+    """ Reverse a along axis """
+    name = 'reverse-' + tokenize(a, axis)
+    nblocks = a.numblocks[axis]
+    index = (slice(None),) * axis + (slice(None, None, -1),)
+    dsk = dict(((name,) + idx,
+                (getitem, (a.name,) + idx[:axis] + (nblocks - 1 - idx[axis],) +
+                          idx[axis + 1:], index))
+               for idx in product(*map(range, a.numblocks)))
+    chunks = list(a.chunks)
+    chunks[axis] = chunks[axis][::-1]
+    return Array(merge(dsk, a.dask), name, chunks, dtype=a._dtype)
+
+
+def _chunked_fft(a, n, axis):
+    return chunked_fft(_resize(a, n, axis), axis)
+
+
+def _chunked_ifft(a, n, axis):
+    return chunked_fft(_resize(a, n, axis), axis, inverse=True)
+
+
+def _chunked_rfft(a, n, axis):
+    a = _resize(a, n, axis)
+    m = a.shape[axis] // 2 + 1
+    return _slice_axis(chunked_fft(a, axis), axis, 0, m)
+
+
+def _chunked_irfft(a, n, axis):
+    if n is None:
+        n = 2 * (a.shape[axis] - 1)
+    # rebuild the full Hermitian spectrum of length n
+    h = _resize(a, n // 2 + 1, axis)
+    tail = _reverse(_slice_axis(h, axis, 1, n - n // 2), axis)
+    x = concatenate([h, map_blocks(np.conj, tail, dtype=np.complex_)],
+                    axis=axis)
+    return map_blocks(np.real, chunked_fft(x, axis, inverse=True),
+                      dtype=np.float_)
+
+
+def _chunked_hfft(a, n, axis):
+    if n is None:
+        n = 2 * (a.shape[axis] - 1)
+    a = map_blocks(np.conj, a, dtype=np.complex_)
+    return map_blocks(partial(np.multiply, n), _chunked_irfft(a, n, axis),
+                      dtype=np.float_)
+
+
+def _conj_divide(x, n):
+    return np.conj(x) / n
+
+
+def _chunked_ihfft(a, n, axis):
+    if n is None:
+        n = a.shape[axis]
+    return map_blocks(partial(_conj_divide, n=n), _chunked_rfft(a, n, axis),
+                      dtype=np.complex_)
+
+
+_chunked = {'fft': _chunked_fft, 'ifft': _chunked_ifft,
+            'rfft': _chunked_rfft, 'irfft': _chunked_irfft,
+            'hfft': _chunked_hfft, 'ihfft': _chunked_ihfft}
+
+
 def _fft_out_chunks(a, n, axis):
     """ For computing the output chunks of fft and ifft"""
     if n is None:
@@ -101,3 +411,101 @@ hfft = _fft_wrap(npfft.hfft, np.float_, _hfft_out_chunks)
 
 
 ihfft = _fft_wrap(npfft.ihfft, np.complex_, _ihfft_out_chunks)
+
+
+fftn_preamble = """
+    Wrapping of numpy.fft.%s
+
+    We apply the one dimensional transforms along each axis in turn.  Axes
+    with many chunks are transformed with the four-step algorithm, see
+    ``chunked_fft``.
+
+    The numpy.fft.%s docstring follows below:
+
+    """
+
+
+def _cook_nd_inputs(a, s, axes, invreal=False):
+    """ Normalize the shape and axes arguments like numpy.fft """
+    if s is None:
+        if axes is None:
+            axes = list(range(a.ndim))
+        s = [a.shape[axis] for axis in axes]
+        if invreal:
+            s[-1] = 2 * (s[-1] - 1)
+    elif axes is None:
+        axes = list(range(-len(s), 0))
+    if len(s) != len(axes):
+        raise ValueError("Shape and axes have different lengths.")
+    axes = [axis + a.ndim if axis < 0 else axis for axis in axes]
+    return list(s), axes
+
+
+def _fftn_wrap(fft_func, np_func, default_axes=None):
+    def func(a, s=None, axes=None):
+        if axes is None:
+            axes = default_axes
+        s, axes = _cook_nd_inputs(a, s, axes)
+        for n, axis in reversed(list(zip(s, axes))):
+            a = fft_func(a, n, axis)
+        return a
+
+    np_name = np_func.__name__
+    func.__doc__ = (fftn_preamble % (np_name, np_name)) + np_func.__doc__
+    func.__name__ = np_name
+    return func
+
+
+fftn = _fftn_wrap(fft, npfft.fftn)
+
+
+ifftn = _fftn_wrap(ifft, npfft.ifftn)
+
+
+fft2 = _fftn_wrap(fft, npfft.fft2, (-2, -1))
+
+
+ifft2 = _fftn_wrap(ifft, npfft.ifft2, (-2, -1))
+
+
+def _rfftn_wrap(np_func, default_axes=None):
+    def func(a, s=None, axes=None):
+        if axes is None:
+            axes = default_axes
+        s, axes = _cook_nd_inputs(a, s, axes)
+        a = rfft(a, s[-1], axes[-1])
+        for n, axis in zip(s[:-1], axes[:-1]):
+            a = fft(a, n, axis)
+        return a
+
+    np_name = np_func.__name__
+    func.__doc__ = (fftn_preamble % (np_name, np_name)) + np_func.__doc__
+    func.__name__ = np_name
+    return func
+
+
+def _irfftn_wrap(np_func, default_axes=None):
+    def func(a, s=None, axes=None):
+        if axes is None:
+            axes = default_axes
+        s, axes = _cook_nd_inputs(a, s, axes, invreal=True)
+        for n, axis in zip(s[:-1], axes[:-1]):
+            a = ifft(a, n, axis)
+        return irfft(a, s[-1], axes[-1])
+
+    np_name = np_func.__name__
+    func.__doc__ = (fftn_preamble % (np_name, np_name)) + np_func.__doc__
+    func.__name__ = np_name
+    return func
+
+
+rfftn = _rfftn_wrap(npfft.rfftn)
+
+
+irfftn = _irfftn_wrap(npfft.irfftn)
+
+
+rfft2 = _rfftn_wrap(npfft.rfft2, (-2, -1))
+
+
+irfft2 = _irfftn_wrap(npfft.irfft2, (-2, -1))
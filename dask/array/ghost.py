@@ -1,6 +1,7 @@
 from operator import getitem
 from itertools import product
 
+import numpy as np
 from toolz import merge, pipe, concat, partition, partial
 from toolz.curried import map
 
@@ -280,6 +281,164 @@ def boundaries(x, depth=None, kind=None):
     return x
 
 
+def _ghost_segments(i, nblocks, depth, kind):
+    """ Pieces of the ghosted block ``i`` along one axis
+
+    Returns a list of ``(out, block, index)`` triples.  The values at
+    ``out`` in the new block come from ``index`` of input block ``block``.
+    Constant boundaries have a block of ``None`` and their value as index.
+
+    >>> _ghost_segments(1, 3, 2, None)  # doctest: +NORMALIZE_WHITESPACE
+    [(slice(0, 2, None), 0, slice(-2, None, None)),
+     (slice(2, -2, None), 1, slice(None, None, None)),
+     (slice(-2, None, None), 2, slice(0, 2, None))]
+    >>> _ghost_segments(0, 3, 2, 'reflect')  # doctest: +NORMALIZE_WHITESPACE
+    [(slice(0, 2, None), 0, slice(1, None, -1)),
+     (slice(2, -2, None), 0, slice(None, None, None)),
+     (slice(-2, None, None), 1, slice(0, 2, None))]
+    """
+    if not depth:
+        return [(slice(None, None, None), i, slice(None, None, None))]
+    segments = []
+
+    if i > 0:
+        segments.append((slice(0, depth), i - 1, slice(-depth, None)))
+    elif kind == 'periodic':
+        segments.append((slice(0, depth), nblocks - 1, slice(-depth, None)))
+    elif kind == 'reflect':
+        segments.append((slice(0, depth), 0, slice(depth - 1, None, -1)))
+    elif kind == 'nearest':
+        segments.append((slice(0, depth), 0, slice(0, 1)))
+    elif kind is not None:
+        segments.append((slice(0, depth), None, kind))
+    start = depth if segments else 0
+
+    last = nblocks - 1
+    if i < last:
+        right = (slice(-depth, None), i + 1, slice(0, depth))
+    elif kind == 'periodic':
+        right = (slice(-depth, None), 0, slice(0, depth))
+    elif kind == 'reflect':
+        right = (slice(-depth, None), last, slice(-1, -depth - 1, -1))
+    elif kind == 'nearest':
+        right = (slice(-depth, None), last, slice(-1, None))
+    elif kind is not None:
+        right = (slice(-depth, None), None, kind)
+    else:
+        right = None
+
+    stop = -depth if right else None
+    segments.append((slice(start, stop), i, slice(None, None, None)))
+    if right:
+        segments.append(right)
+    return segments
+
+
+def ghost_block(center, indices, values):
+    """ Assemble a ghosted block from its center and the neighboring slabs
+
+    Allocates the output once and copies each value into its place.
+    ``indices[0]`` is the place of the center block, which sets the shape
+    along axes without neighbors and the dtype.
+
+    >>> ghost_block(np.array([1, 2, 3]), [(slice(1, -1),), (slice(0, 1),),
+    ...                                   (slice(-1, None),)],
+    ...             [0, 4])
+    array([0, 1, 2, 3, 4])
+    """
+    indices = list(indices)
+    shape = []
+    for i, n in enumerate(center.shape):
+        ind = indices[0][i]
+        start = ind.start or 0
+        stop = -ind.stop if ind.stop else 0
+        shape.append(n + start + stop)
+
+    out = np.empty(shape, dtype=center.dtype)
+    out[indices[0]] = center
+    for ind, value in zip(indices[1:], values):
+        out[ind] = value
+    return out
+
+
+def ghost_direct(x, depth, boundary):
+    """ Share boundaries between neighboring blocks in one task per block
+
+    This produces the same array as ``ghost``.  Rather than adding boundary
+    blocks, concatenating neighbors and trimming the result, each new block
+    is built by a single ``ghost_block`` task from its center block and
+    slices of its neighbors, as wide as ``depth``.  Boundary conditions
+    take their slabs from the edge blocks, or from the opposite edge when
+    periodic.
+
+    Parameters
+    ----------
+
+    x: da.Array
+        A dask array
+    depth: dict
+        The size of the shared boundary per axis
+    boundary: dict
+        The boundary condition on each axis, None or missing for none
+
+    See Also
+    --------
+
+    ghost
+    ghost_internal
+    """
+    token = tokenize(x, sorted(depth.items()), sorted(boundary.items()))
+    name = 'ghost-' + token
+    numblocks = x.numblocks
+    full = slice(None, None, None)
+
+    axes = []
+    for i, bds in enumerate(x.chunks):
+        d = depth.get(i, 0)
+        kind = boundary.get(i)
+        axes.append([_ghost_segments(j, len(bds), d, kind)
+                     for j in range(len(bds))])
+
+    dsk = dict()
+    for idx in product(*map(range, numblocks)):
+        indices = []
+        values = []
+        for pieces in product(*[axes[i][j] for i, j in enumerate(idx)]):
+            out = tuple(p[0] for p in pieces)
+            constant = [p[2] for p in pieces if p[1] is None]
+            if constant:
+                # later axes take the corners, as in ``boundaries``
+                value = constant[-1]
+            else:
+                key = (x.name,) + tuple(p[1] for p in pieces)
+                index = tuple(p[2] for p in pieces)
+                if all(ind == full for ind in index):
+                    value = key
+                else:
+                    value = (getitem, key, index)
+            indices.append(out)
+            values.append(value)
+        # the center always comes first, see _ghost_segments
+        center = [i for i, v in enumerate(values)
+                  if v == (x.name,) + idx][0]
+        indices.insert(0, indices.pop(center))
+        values.pop(center)
+        dsk[(name,) + idx] = (ghost_block, (x.name,) + idx,
+                              tuple(indices), values)
+
+    chunks = []
+    for i, bds in enumerate(x.chunks):
+        d = depth.get(i, 0)
+        kind = boundary.get(i)
+        left = [d if j > 0 or kind is not None else 0
+                for j in range(len(bds))]
+        right = [d if j < len(bds) - 1 or kind is not None else 0
+                 for j in range(len(bds))]
+        chunks.append(tuple(l + c + r for l, c, r in zip(left, bds, right)))
+
+    return Array(merge(dsk, x.dask), name, chunks, dtype=x._dtype)
+
+
 def ghost(x, depth, boundary):
     """ Share boundaries between neighboring blocks
 
@@ -351,12 +510,7 @@ def ghost(x, depth, boundary):
                              "with a larger chunk size or a chunk size that\n"
                              "more evenly divides the shape of your array." %
                              (d, min(c)))
-    x2 = boundaries(x, depth, boundary)
-    x3 = ghost_internal(x2, depth)
-    trim = dict((k, v*2 if boundary.get(k, None) is not None else 0)
-                for k, v in depth.items())
-    x4 = chunk.trim(x3, trim)
-    return x4
+    return ghost_direct(x, depth, boundary)
 
 
 def map_overlap(x, func, depth, boundary=None, trim=True, **kwargs):
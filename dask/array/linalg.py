@@ -1,8 +1,10 @@
 from __future__ import absolute_import
 
 import operator
+from itertools import product
 
 import numpy as np
+from toolz import merge, partition_all, partial
 
 from ..base import tokenize
 from .core import top, dotmany, Array
@@ -17,7 +19,7 @@ def _cumsum_blocks(it):
         yield (total_previous, total)
 
 
-def tsqr(data, name=None, compute_svd=False):
+def tsqr(data, name=None, compute_svd=False, split_every=8):
     """ Direct Tall-and-Skinny QR algorithm
 
     As presented in:
@@ -32,12 +34,20 @@ def tsqr(data, name=None, compute_svd=False):
     Singular Value Decomposition.  It requires that the input array have a
     single column of blocks, each of which fit in memory.
 
+    We factor each block, then reduce the R factors in a tree: we stack
+    ``split_every`` of them at a time and factor them again until one R
+    remains.  Q is the product of the Q factors along the path from each
+    block to the root.  No task holds more than ``split_every`` R factors,
+    so many blocks do not make a large serial step at the end.
+
     Parameters
     ----------
 
     data: Array
     compute_svd: bool
         Whether to compute the SVD rather than the QR decomposition
+    split_every: int
+        Number of R factors to stack in each reduction of the tree
 
     See Also
     --------
@@ -52,8 +62,11 @@ def tsqr(data, name=None, compute_svd=False):
             "Input must have the following properites:\n"
             "  1. Have two dimensions\n"
             "  2. Have only one column of blocks")
+    if split_every < 2:
+        raise ValueError("split_every must be at least 2, got %d"
+                         % split_every)
 
-    prefix = name or 'tsqr-' + tokenize(data, compute_svd)
+    prefix = name or 'tsqr-' + tokenize(data, compute_svd, split_every)
     prefix += '_'
 
     m, n = data.shape
@@ -73,52 +86,64 @@ def tsqr(data, name=None, compute_svd=False):
                       (operator.getitem, (name_qr_st1, i, 0), 1))
                      for i in range(numblocks[0]))
 
-    # Stacking for in-core QR computation
-    to_stack = [(name_r_st1, i, 0) for i in range(numblocks[0])]
-    name_r_st1_stacked = prefix + 'R_st1_stacked'
-    dsk_r_st1_stacked = {(name_r_st1_stacked, 0, 0): (np.vstack,
-                                                      (tuple, to_stack))}
-    # In-core QR computation
-    name_qr_st2 = prefix + 'QR_st2'
-    dsk_qr_st2 = top(np.linalg.qr, name_qr_st2, 'ij', name_r_st1_stacked, 'ij',
-                     numblocks={name_r_st1_stacked: (1, 1)})
-    # qr[0]
-    name_q_st2_aux = prefix + 'Q_st2_aux'
-    dsk_q_st2_aux = {(name_q_st2_aux, 0, 0): (operator.getitem,
-                                              (name_qr_st2, 0, 0), 0)}
-    q2_block_sizes = [min(e, n) for e in data.chunks[0]]
-    block_slices = [(slice(e[0], e[1]), slice(0, n))
-                    for e in _cumsum_blocks(q2_block_sizes)]
-    name_q_st2 = prefix + 'Q_st2'
-    dsk_q_st2 = dict(((name_q_st2, i, 0),
-                      (operator.getitem, (name_q_st2_aux, 0, 0), b))
-                     for i, b in enumerate(block_slices))
-    # qr[1]
-    name_r_st2 = prefix + 'R'
-    dsk_r_st2 = {(name_r_st2, 0, 0): (operator.getitem, (name_qr_st2, 0, 0), 1)}
+    # Reduce the R factors in a tree, stacking split_every at a time
+    dsk_tree_r = {}
+    dsk_tree_q = {}
+    levels = []
+    name_r = name_r_st1
+    rows = [min(e, n) for e in data.chunks[0]]  # rows of each R factor
+    while not levels or len(rows) > 1:
+        level = len(levels)
+        name_qr = prefix + 'QR_st2-%d' % level
+        name_q = prefix + 'Q_st2-%d' % level
+        groups = list(partition_all(split_every, range(len(rows))))
+        for g, children in enumerate(groups):
+            to_stack = [(name_r, c, 0) for c in children]
+            dsk_tree_r[(name_qr, g, 0)] = (np.linalg.qr,
+                                           (np.vstack, (tuple, to_stack)))
+            dsk_tree_q[(name_q, g, 0)] = (operator.getitem,
+                                          (name_qr, g, 0), 0)
+        levels.append((name_q, groups, rows))
+        name_r = prefix + 'R_st2-%d' % level
+        dsk_tree_r.update(((name_r, g, 0),
+                           (operator.getitem, (name_qr, g, 0), 1))
+                          for g in range(len(groups)))
+        rows = [min(sum(rows[c] for c in children), n)
+                for children in groups]
 
-    name_q_st3 = prefix + 'Q'
-    dsk_q_st3 = top(np.dot, name_q_st3, 'ij', name_q_st1, 'ij',
-                    name_q_st2, 'ij', numblocks={name_q_st1: numblocks,
-                                                 name_q_st2: numblocks})
+    name_r_st2 = prefix + 'R'
+    dsk_tree_r[(name_r_st2, 0, 0)] = dsk_tree_r.pop((name_r, 0, 0))
+
+    # Multiply the Q factors back down the tree.  Each node passes the rows
+    # of its accumulated Q that belong to a child on to that child.
+    name_acc = levels[-1][0]
+    for level in reversed(range(len(levels))):
+        groups, rows = levels[level][1:]
+        if level:
+            name_child = levels[level - 1][0]
+            name_out = prefix + 'Q_st3-%d' % level
+        else:
+            name_child = name_q_st1
+            name_out = prefix + 'Q'
+        for g, children in enumerate(groups):
+            offsets = _cumsum_blocks([rows[c] for c in children])
+            for c, (start, stop) in zip(children, offsets):
+                dsk_tree_q[(name_out, c, 0)] = (
+                        np.dot, (name_child, c, 0),
+                        (operator.getitem, (name_acc, g, 0),
+                         (slice(start, stop), slice(0, n))))
+        name_acc = name_out
+    name_q_st3 = name_acc
 
-    dsk_q = {}
-    dsk_q.update(data.dask)
-    dsk_q.update(dsk_qr_st1)
-    dsk_q.update(dsk_q_st1)
-    dsk_q.update(dsk_r_st1)
-    dsk_q.update(dsk_r_st1_stacked)
-    dsk_q.update(dsk_qr_st2)
-    dsk_q.update(dsk_q_st2_aux)
-    dsk_q.update(dsk_q_st2)
-    dsk_q.update(dsk_q_st3)
     dsk_r = {}
     dsk_r.update(data.dask)
     dsk_r.update(dsk_qr_st1)
     dsk_r.update(dsk_r_st1)
-    dsk_r.update(dsk_r_st1_stacked)
-    dsk_r.update(dsk_qr_st2)
-    dsk_r.update(dsk_r_st2)
+    dsk_r.update(dsk_tree_r)
+    dsk_q = {}
+    dsk_q.update(dsk_r)
+    dsk_q.update(dsk_q_st1)
+    dsk_q.update(dsk_tree_q)
 
     if not compute_svd:
         q = Array(dsk_q, name_q_st3, shape=data.shape, chunks=data.chunks)
@@ -327,3 +352,475 @@ def svd(a, name=None):
     dask.array.linalg.tsqr: Actual implementation with citation
     """
     return tsqr(a, name, compute_svd=True)
+
+
+def _check_square_blocks(a):
+    if not (a.ndim == 2 and a.shape[0] == a.shape[1] and
+            a.chunks[0] == a.chunks[1]):
+        raise ValueError(
+            "Input must have the following properites:\n"
+            "  1. Have two dimensions\n"
+            "  2. Be square\n"
+            "  3. Have square blocks on the diagonal, the same chunks along "
+            "both axes\n"
+            "Got shape %s and chunks %s, use rechunk to change the chunks"
+            % (a.shape, a.chunks))
+
+
+def _lu_factor(a):
+    """ LU decomposition with partial pivoting of a possibly tall matrix
+
+    Returns ``p, l, u`` with ``a[p] == l.dot(u)``.  ``l`` has ones on its
+    diagonal.  We factor the left half of the columns, update the right
+    half with matrix products and factor it, recursively.
+
+    >>> a = np.array([[1., 2.], [3., 4.], [5., 6.]])
+    >>> p, l, u = _lu_factor(a)
+    >>> np.allclose(a[p], l.dot(u))
+    True
+    """
+    m, n = a.shape
+    if n <= 16 or m < n:
+        return _lu_factor_unblocked(a)
+    n1 = n // 2
+    p, l1, u1 = _lu_factor(a[:, :n1])
+    a2 = a[p, n1:]
+    u12 = _solve(l1[:n1], a2[:n1])
+    p2, l2, u2 = _lu_factor(a2[n1:] - np.dot(l1[n1:], u12))
+
+    p[n1:] = p[n1:][p2]
+    l = np.zeros((m, n), dtype=l2.dtype)
+    l[:, :n1] = l1
+    l[n1:, :n1] = l1[n1:][p2]
+    l[n1:, n1:] = l2
+    u = np.zeros((n, n), dtype=u2.dtype)
+    u[:n1, :n1] = u1
+    u[:n1, n1:] = u12
+    u[n1:, n1:] = u2
+    return p, l, u
+
+
+def _lu_factor_unblocked(a):
+    """ LU decomposition with partial pivoting, one column at a time """
+    a = np.array(a, dtype=np.result_type(a.dtype, np.float64))
+    m, n = a.shape
+    k = min(m, n)
+    p = np.arange(m)
+    for j in range(k):
+        i = j + np.argmax(np.abs(a[j:, j]))
+        if i != j:
+            a[[j, i]] = a[[i, j]]
+            p[[j, i]] = p[[i, j]]
+        if a[j, j] != 0:
+            a[j + 1:, j] /= a[j, j]
+        a[j + 1:, j + 1:] -= np.outer(a[j + 1:, j], a[j, j + 1:])
+    l = np.tril(a[:, :k], -1) + np.eye(m, k)
+    u = np.triu(a[:k])
+    return p, l, u
+
+
+def _permute_rows(x, factors):
+    """ Rows of x in the pivoting order of an ``_lu_factor`` result """
+    return x[factors[0]]
+
+
+def _compose_tail(p, q, n):
+    """ Permutation p followed by q on all but the first n rows """
+    p = p.copy()
+    p[n:] = p[n:][q]
+    return p
+
+
+def _permute_tail(l, q, n):
+    """ Permute all but the first n rows of l with q """
+    l = l.copy()
+    l[n:] = l[n:][q]
+    return l
+
+
+def _permutation_block(perm, rows, cols):
+    """ Block of the permutation matrix P with P[perm[j], j] == 1 """
+    block = np.zeros((rows.stop - rows.start, cols.stop - cols.start))
+    j = np.arange(cols.start, cols.stop)
+    i = perm[cols]
+    inside = (i >= rows.start) & (i < rows.stop)
+    block[i[inside] - rows.start, j[inside] - cols.start] = 1
+    return block
+
+
+def _solve(a, b):
+    """ Solve a.dot(x) == b for a triangular block a
+
+    NumPy has no triangular solver, we use the general one.
+    """
+    return np.linalg.solve(a, b)
+
+
+def _subtract_dot(c, a, b):
+    """ c - a.dot(b) """
+    return c - np.dot(a, b)
+
+
+def _subtract_dot_t(c, a, b):
+    """ c - a.dot(b.T) """
+    return c - np.dot(a, b.T)
+
+
+def _solve_transposed(l, a):
+    """ x with x.dot(l.T) == a """
+    return _solve(l, a.T).T
+
+
+def _solve_substituted(a, b, blocks, solutions):
+    """ Solve a.dot(x) == b - sum(block.dot(solution)) """
+    for block, solution in zip(blocks, solutions):
+        b = b - np.dot(block, solution)
+    return _solve(a, b)
+
+
+def _lu_graph(a):
+    """ Graph of the blocked LU decomposition of a
+
+    Returns ``dsk, perm, l, u``.  ``perm`` is the key of the row permutation
+    with ``a[perm] == l.dot(u)``, ``l`` and ``u`` are the names of the
+    blocks of the factors.
+    """
+    token = tokenize(a)
+    sizes = a.chunks[0]
+    offsets = np.cumsum((0,) + sizes).tolist()
+    nb = len(sizes)
+
+    name_panel = 'lu-panel-' + token
+    name_col = 'lu-column-' + token
+    name_q = 'lu-permutation-' + token
+    name_lp = 'lu-l-panel-' + token
+    name_l = 'lu-l-' + token
+    name_u = 'lu-u-' + token
+
+    dsk = {}
+    current = dict(((i, j), (a.name, i, j))
+                   for i in range(nb) for j in range(nb))
+    for k in range(nb):
+        # Factor the panel of column k below the diagonal, with pivoting
+        dsk[(name_panel, k)] = (_lu_factor,
+                                (np.vstack,
+                                 (tuple, [current[i, k]
+                                          for i in range(k, nb)])))
+        l_panel = (operator.getitem, (name_panel, k), 1)
+        l_kk = (operator.getitem, l_panel, (slice(0, sizes[k]),))
+        dsk[(name_u, k, k)] = (operator.getitem, (name_panel, k), 2)
+
+        # Pivot the columns to the right and update the trailing matrix
+        name_a = 'lu-trailing-%d-' % k + token
+        for j in range(k + 1, nb):
+            dsk[(name_col, k, j)] = (_permute_rows,
+                                     (np.vstack,
+                                      (tuple, [current[i, j]
+                                               for i in range(k, nb)])),
+                                     (name_panel, k))
+            dsk[(name_u, k, j)] = (_solve, l_kk,
+                                   (operator.getitem, (name_col, k, j),
+                                    (slice(0, sizes[k]),)))
+            for i in range(k + 1, nb):
+                rows = (slice(offsets[i] - offsets[k],
+                              offsets[i + 1] - offsets[k]),)
+                dsk[(name_a, i, j)] = (_subtract_dot,
+                                       (operator.getitem, (name_col, k, j),
+                                        rows),
+                                       (operator.getitem, l_panel, rows),
+                                       (name_u, k, j))
+                current[i, j] = (name_a, i, j)
+
+    # Later pivots reorder the rows of earlier panels of L
+    dsk[(name_q, nb - 1)] = (operator.getitem, (name_panel, nb - 1), 0)
+    for k in reversed(range(nb - 1)):
+        dsk[(name_q, k)] = (_compose_tail,
+                            (operator.getitem, (name_panel, k), 0),
+                            (name_q, k + 1), sizes[k])
+    for k in range(nb):
+        l_panel = (operator.getitem, (name_panel, k), 1)
+        if k < nb - 1:
+            l_panel = (_permute_tail, l_panel, (name_q, k + 1), sizes[k])
+        dsk[(name_lp, k)] = l_panel
+        for i in range(k, nb):
+            rows = (slice(offsets[i] - offsets[k],
+                          offsets[i + 1] - offsets[k]),)
+            dsk[(name_l, i, k)] = (operator.getitem, (name_lp, k), rows)
+        for j in range(k):
+            dsk[(name_l, j, k)] = (np.zeros, (sizes[j], sizes[k]))
+            dsk[(name_u, k, j)] = (np.zeros, (sizes[k], sizes[j]))
+
+    return merge(a.dask, dsk), (name_q, 0), name_l, name_u
+
+
+def lu(a):
+    """
+    Compute the LU decomposition of a square matrix with partial pivoting.
+
+    We factor one column of blocks at a time.  We search the whole column
+    below the diagonal for pivots, so this is as stable as the LU
+    decomposition of LAPACK.  Then we update the blocks to the right and
+    below in parallel.  The chunks of ``a`` must be the same along both
+    axes.
+
+    Example
+    -------
+
+    >>> p, l, u = da.linalg.lu(x)  # doctest: +SKIP
+
+    Returns
+    -------
+
+    p:  Array, permutation matrix
+    l:  Array, lower triangular with unit diagonal
+    u:  Array, upper triangular
+
+    such that ``a == p.dot(l).dot(u)``
+
+    See Also
+    --------
+
+    scipy.linalg.lu : Equivalent SciPy Operation
+    """
+    _check_square_blocks(a)
+    dsk, perm, name_l, name_u = _lu_graph(a)
+    token = tokenize(a)
+    name_p = 'lu-p-' + token
+    offsets = np.cumsum((0,) + a.chunks[0]).tolist()
+    blocks = [slice(start, stop)
+              for start, stop in zip(offsets[:-1], offsets[1:])]
+    dsk_p = dict(((name_p, i, j), (_permutation_block, perm, rows, cols))
+                 for i, rows in enumerate(blocks)
+                 for j, cols in enumerate(blocks))
+
+    dtype = np.result_type(a._dtype or np.float64, np.float64)
+    p = Array(merge(dsk, dsk_p), name_p, shape=a.shape, chunks=a.chunks,
+              dtype=np.float64)
+    l = Array(dsk, name_l, shape=a.shape, chunks=a.chunks, dtype=dtype)
+    u = Array(dsk, name_u, shape=a.shape, chunks=a.chunks, dtype=dtype)
+    return p, l, u
+
+
+def cholesky(a):
+    """
+    Compute the Cholesky decomposition of a symmetric positive definite
+    matrix.
+
+    We factor one column of blocks at a time and update the blocks below
+    and to the right in parallel.  Only the lower triangle of ``a`` is
+    read.  The chunks of ``a`` must be the same along both axes.
+
+    Example
+    -------
+
+    >>> l = da.linalg.cholesky(x)  # doctest: +SKIP
+
+    Returns
+    -------
+
+    l:  Array, lower triangular with ``a == l.dot(l.T)``
+
+    See Also
+    --------
+
+    np.linalg.cholesky : Equivalent NumPy Operation
+    """
+    _check_square_blocks(a)
+    token = tokenize(a)
+    sizes = a.chunks[0]
+    nb = len(sizes)
+    name_l = 'cholesky-' + token
+
+    dsk = {}
+    current = dict(((i, j), (a.name, i, j))
+                   for i in range(nb) for j in range(i + 1))
+    for k in range(nb):
+        dsk[(name_l, k, k)] = (np.linalg.cholesky, current[k, k])
+        for i in range(k + 1, nb):
+            dsk[(name_l, i, k)] = (_solve_transposed, (name_l, k, k),
+                                   current[i, k])
+        name_a = 'cholesky-trailing-%d-' % k + token
+        for i in range(k + 1, nb):
+            for j in range(k + 1, i + 1):
+                dsk[(name_a, i, j)] = (_subtract_dot_t, current[i, j],
+                                       (name_l, i, k), (name_l, j, k))
+                current[i, j] = (name_a, i, j)
+        for j in range(k + 1, nb):
+            dsk[(name_l, k, j)] = (np.zeros, (sizes[k], sizes[j]))
+
+    dtype = np.result_type(a._dtype or np.float64, np.float64)
+    return Array(merge(a.dask, dsk), name_l, shape=a.shape, chunks=a.chunks,
+                 dtype=dtype)
+
+
+def solve_triangular(a, b, lower=False):
+    """
+    Solve the equation ``a.dot(x) == b`` for ``x``, ``a`` triangular.
+
+    Blocked forward or back substitution.  Each block of ``x`` is solved
+    as soon as the blocks it depends on are known, the columns of ``b``
+    in parallel.  The chunks of ``a`` must be the same along both axes,
+    we rechunk the rows of ``b`` to match.
+
+    Example
+    -------
+
+    >>> x = da.linalg.solve_triangular(l, b, lower=True)  # doctest: +SKIP
+
+    Parameters
+    ----------
+
+    a: Array, triangular matrix
+    b: Array, vector or matrix
+    lower: bool
+        Whether ``a`` is lower or upper triangular
+
+    See Also
+    --------
+
+    scipy.linalg.solve_triangular : Equivalent SciPy Operation
+    """
+    _check_square_blocks(a)
+    if b.ndim not in (1, 2) or b.shape[0] != a.shape[0]:
+        raise ValueError("b must be a vector or matrix with as many rows as "
+                         "a, got shapes %s and %s" % (a.shape, b.shape))
+    if b.chunks[0] != a.chunks[0]:
+        b = b.rechunk((a.chunks[0],) + b.chunks[1:])
+
+    name = 'solve-triangular-' + tokenize(a, b, lower)
+    nb = len(a.chunks[0])
+    order = list(range(nb)) if lower else list(reversed(range(nb)))
+
+    dsk = {}
+    for c in product(*map(range, b.numblocks[1:])):
+        for i in order:
+            known = range(i) if lower else range(i + 1, nb)
+            dsk[(name, i) + c] = (_solve_substituted, (a.name, i, i),
+                                  (b.name, i) + c,
+                                  [(a.name, i, j) for j in known],
+                                  [(name, j) + c for j in known])
+
+    dtype = np.result_type(a._dtype or np.float64, b._dtype or np.float64,
+                           np.float64)
+    return Array(merge(a.dask, b.dask, dsk), name, shape=b.shape,
+                 chunks=b.chunks, dtype=dtype)
+
+
+def _take_rows(x, perm):
+    return x[perm]
+
+
+def solve(a, b, sym_pos=False):
+    """
+    Solve the equation ``a.dot(x) == b`` for ``x``.
+
+    We use the blocked LU decomposition, or the Cholesky decomposition if
+    ``a`` is symmetric positive definite, and then solve the triangular
+    systems.  The chunks of ``a`` must be the same along both axes.
+
+    Example
+    -------
+
+    >>> x = da.linalg.solve(a, b)  # doctest: +SKIP
+
+    Parameters
+    ----------
+
+    a: Array, square matrix
+    b: Array, vector or matrix
+    sym_pos: bool
+        Whether ``a`` is symmetric positive definite
+
+    See Also
+    --------
+
+    np.linalg.solve : Equivalent NumPy Operation
+    dask.array.linalg.lu
+    dask.array.linalg.cholesky
+    """
+    _check_square_blocks(a)
+    if sym_pos:
+        l = cholesky(a)
+        return solve_triangular(l.T, solve_triangular(l, b, lower=True))
+
+    if b.ndim not in (1, 2) or b.shape[0] != a.shape[0]:
+        raise ValueError("b must be a vector or matrix with as many rows as "
+                         "a, got shapes %s and %s" % (a.shape, b.shape))
+    if b.chunks[0] != a.chunks[0]:
+        b = b.rechunk((a.chunks[0],) + b.chunks[1:])
+    dsk, perm, name_l, name_u = _lu_graph(a)
+    l = Array(dsk, name_l, shape=a.shape, chunks=a.chunks)
+    u = Array(dsk, name_u, shape=a.shape, chunks=a.chunks)
+
+    # Pivot the rows of b, one column of blocks at a time
+    token = tokenize(a, b)
+    name_column = 'solve-pivoted-' + token
+    name_b = 'solve-b-' + token
+    offsets = np.cumsum((0,) + a.chunks[0]).tolist()
+    dsk_b = {}
+    for c in product(*map(range, b.numblocks[1:])):
+        column = [(b.name, i) + c for i in range(b.numblocks[0])]
+        dsk_b[(name_column,) + c] = (_take_rows,
+                                     (np.concatenate, (tuple, column)), perm)
+        for i in range(b.numblocks[0]):
+            dsk_b[(name_b, i) + c] = (operator.getitem, (name_column,) + c,
+                                      (slice(offsets[i], offsets[i + 1]),))
+    pb = Array(merge(b.dask, dsk, dsk_b), name_b, shape=b.shape,
+               chunks=b.chunks, dtype=b._dtype)
+
+    return solve_triangular(u, solve_triangular(l, pb, lower=True))
+
+
+def lstsq(a, b):
+    """
+    Return the least-squares solution to a linear matrix equation using
+    QR decomposition.
+
+    Solves the equation ``a.dot(x) = b`` by computing a vector ``x`` that
+    minimizes the Euclidean 2-norm ``|| b - a.dot(x) ||^2``.  ``a`` must be
+    tall-and-skinny with a single column of blocks, see ``tsqr``.
+
+    Example
+    -------
+
+    >>> x, residuals, rank, s = da.linalg.lstsq(a, b)  # doctest: +SKIP
+
+    Returns
+    -------
+
+    x:  Array, least-squares solution
+    residuals:  Array, sums of squared residuals for each column of ``b``
+    rank:  Array, rank of ``a``
+    s:  Array, singular values of ``a``
+
+    See Also
+    --------
+
+    np.linalg.lstsq : Equivalent NumPy Operation
+    dask.array.linalg.tsqr: Actual implementation with citation
+    """
+    q, r = qr(a)
+    if b.chunks[0] != a.chunks[0]:
+        b = b.rechunk((a.chunks[0],) + b.chunks[1:])
+    x = solve_triangular(r, q.T.dot(b))
+    residuals = ((b - a.dot(x)) ** 2).sum(axis=0)
+    if b.ndim == 1:
+        name = 'lstsq-residuals-' + tokenize(residuals)
+        residuals = Array(merge(residuals.dask,
+                                {(name, 0): (np.atleast_1d,
+                                             (residuals.name,))}),
+                          name, shape=(1,), chunks=((1,),),
+                          dtype=residuals._dtype)
+
+    token = tokenize(a, b)
+    name_rank = 'lstsq-rank-' + token
+    rank = Array(merge(r.dask, {(name_rank,): (np.linalg.matrix_rank,
+                                               (r.name, 0, 0))}),
+                 name_rank, shape=(), chunks=(), dtype=int)
+    name_s = 'lstsq-singular-values-' + token
+    n = a.shape[1]
+    s = Array(merge(r.dask, {(name_s, 0): (partial(np.linalg.svd,
+                                                   compute_uv=False),
+                                           (r.name, 0, 0))}),
+              name_s, shape=(n,), chunks=((n,),), dtype=np.float64)
+    return x, residuals, rank, s
@@ -1,7 +1,9 @@
 from ..optimize import cull, fuse
-from ..core import flatten
+from ..core import flatten, istask, ishashable, get_dependencies
 from ..optimize import dealias, inline_functions
-from .core import getarray
+from .core import getarray, ElemwiseFunction
+from numbers import Integral, Number
+import operator
 from operator import getitem
 from dask.rewrite import RuleSet, RewriteRule
 from toolz import valmap, partial
@@ -13,16 +15,24 @@ def optimize(dsk, keys, **kwargs):
 
     1.  Cull tasks not necessary to evaluate keys
     2.  Remove full slicing, e.g. x[:]
-    3.  Inline fast functions like getitem and np.transpose
+    3.  Fuse trees of elementwise operations into single tasks
+    4.  Inline fast functions like getitem and np.transpose
+    5.  Slice the inputs of elementwise operations rather than their outputs
+
+    Pass ``elemwise=False`` to skip step 3.
     """
     fast_functions=kwargs.get('fast_functions',
                              set([getarray, getitem, np.transpose]))
-    dsk2 = cull(dsk, list(flatten(keys)))
+    keys = list(flatten(keys))
+    dsk2 = cull(dsk, keys)
     dsk3 = remove_full_slices(dsk2)
+    if kwargs.get('elemwise', True):
+        dsk3 = fuse_elemwise(dsk3, keys)
     dsk4 = fuse(dsk3)
     dsk5 = valmap(rewrite_rules.rewrite, dsk4)
     dsk6 = inline_functions(dsk5, fast_functions=fast_functions)
-    return dsk6
+    dsk7 = valmap(push_slices, dsk6)
+    return dsk7
 
 
 def is_full_slice(task):
@@ -206,3 +216,308 @@ def fuse_slice(a, b):
             j += 1
         return tuple(result)
     raise NotImplementedError()
+
+
+operators = [operator.add, operator.sub, operator.mul, operator.truediv,
+             operator.floordiv, operator.mod, operator.pow, operator.neg,
+             operator.pos, operator.abs, operator.invert, operator.and_,
+             operator.or_, operator.xor, operator.lshift, operator.rshift,
+             operator.eq, operator.ne, operator.lt, operator.le, operator.gt,
+             operator.ge] + ([operator.div] if hasattr(operator, 'div') else [])
+
+# Functions that we may evaluate in place, with the ufuncs that do so
+inplace_ufuncs = dict((f, f) for f in [np.add, np.subtract, np.multiply,
+    np.divide, np.true_divide, np.power, np.negative, np.absolute, np.sqrt,
+    np.square, np.exp, np.expm1, np.log, np.log1p, np.sin, np.cos, np.tan,
+    np.arcsin, np.arccos, np.arctan, np.sinh, np.cosh, np.tanh, np.maximum,
+    np.minimum])
+inplace_ufuncs.update({operator.add: np.add, operator.sub: np.subtract,
+                       operator.mul: np.multiply,
+                       operator.truediv: np.true_divide,
+                       operator.pow: np.power, operator.neg: np.negative,
+                       operator.abs: np.absolute})
+if hasattr(operator, 'div'):
+    inplace_ufuncs[operator.div] = np.divide
+
+
+def is_elemwise(func):
+    """ Is func an elementwise operation on arrays?
+
+    >>> is_elemwise(np.sin)
+    True
+    >>> is_elemwise(operator.add)
+    True
+    >>> is_elemwise(np.sum)
+    False
+    """
+    if isinstance(func, np.ufunc):
+        return func.nout == 1
+    if isinstance(func, (ElemwiseFunction, ElemwiseProgram)):
+        return True
+    if hasattr(func, 'op') and hasattr(func, 'other'):  # partial_by_order
+        return is_elemwise(func.op)
+    try:
+        return func in operators
+    except TypeError:
+        return False
+
+
+class ElemwiseProgram(object):
+    """ A tree of elementwise operations, evaluated in a single task
+
+    Operations are stored in the order in which they run.  Each is a function
+    and a tuple of arguments of the form ``('input', i)``, the i'th argument
+    of the call, ``('temp', j)``, the result of the j'th operation, or
+    ``('const', value)``.  The last operation gives the result.
+
+    Intermediate results are freed as soon as they are used.  If an operation
+    has a NumPy ufunc and an intermediate floating point result of the right
+    shape and dtype among its arguments then we write into that rather than
+    allocate a new array.  Only results of the ufuncs and operators in
+    ``inplace_ufuncs`` count, other functions may return views of or even the
+    very blocks that they were given.
+
+    >>> prog = ElemwiseProgram([(operator.add, (('input', 0), ('const', 1))),
+    ...                         (operator.mul, (('temp', 0), ('input', 1)))])
+    >>> prog
+    ElemwiseProgram(mul(add(_0, 1), _1))
+    >>> prog(np.arange(3.0), 2.0)
+    array([ 2.,  4.,  6.])
+
+    See Also
+    --------
+    fuse_elemwise
+    """
+    def __init__(self, ops):
+        self.ops = tuple(ops)
+
+    def __call__(self, *inputs):
+        temps = [None] * len(self.ops)
+        owned = [False] * len(self.ops)  # freshly allocated by a ufunc
+        for j, (func, args) in enumerate(self.ops):
+            vals = []
+            scratch = None
+            for kind, value in args:
+                if kind == 'input':
+                    vals.append(inputs[value])
+                elif kind == 'temp':
+                    val, temps[value] = temps[value], None
+                    if (scratch is None and owned[value] and
+                            _is_scratch(val)):
+                        scratch = val
+                    vals.append(val)
+                else:
+                    vals.append(value)
+            ufunc = inplace_ufuncs.get(func)
+            if (scratch is not None and ufunc is not None and
+                    _fits(scratch, vals)):
+                if (ufunc is np.power and np.isscalar(vals[1]) and
+                        vals[1] == 2):  # as fast as ndarray.__pow__
+                    ufunc, vals = np.square, vals[:1]
+                temps[j] = ufunc(*vals, out=scratch)
+            else:
+                temps[j] = func(*vals)
+            owned[j] = ufunc is not None
+        return temps[-1]
+
+    @property
+    def __name__(self):
+        def expr(j):
+            func, args = self.ops[j]
+            return '%s(%s)' % (getattr(func, '__name__', func),
+                               ', '.join(expr(v) if kind == 'temp' else
+                                         '_%d' % v if kind == 'input' else
+                                         repr(v) for kind, v in args))
+        return expr(len(self.ops) - 1)
+
+    def __repr__(self):
+        return 'ElemwiseProgram(%s)' % self.__name__
+
+    def __eq__(self, other):
+        return type(other) is ElemwiseProgram and self.ops == other.ops
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.ops)
+
+
+def _is_scratch(x):
+    """ Is x an array that we may overwrite, if a ufunc created it? """
+    return (type(x) is np.ndarray and x.base is None and
+            x.dtype.kind == 'f' and x.flags.writeable)
+
+
+def _fits(out, args):
+    """ Can a ufunc on args write into out without changing the result? """
+    if not all(type(a) is np.ndarray or np.isscalar(a) for a in args):
+        return False
+    shape = np.broadcast(*args).shape if len(args) > 1 else np.shape(args[0])
+    return shape == out.shape and np.result_type(*args) == out.dtype
+
+
+def _elemwise_task(dsk, task):
+    """ Function and argument specs of an elementwise task, else None
+
+    Functions with constant arguments from ``partial_by_order`` are unpacked.
+    """
+    if not istask(task):
+        return None
+    func, specs = task[0], []
+    for arg in task[1:]:
+        if istask(arg) or isinstance(arg, list):
+            return None
+        if ishashable(arg) and arg in dsk:
+            specs.append(('key', arg))
+        else:
+            specs.append(('const', arg))
+    if hasattr(func, 'op') and hasattr(func, 'other'):  # partial_by_order
+        for i, arg in func.other:
+            specs.insert(i, ('const', arg))
+        func = func.op
+    if not is_elemwise(func):
+        return None
+    return func, specs
+
+
+def fuse_elemwise(dsk, keys=None):
+    """ Fuse trees of elementwise tasks into single tasks
+
+    Expressions like ``((x + 1) * y - z) ** 2`` create one task per operator
+    and block.  ``fuse`` only merges linear chains, so the tasks of the
+    different operators stay separate and each allocates a full block.  Here
+    we replace every tree of elementwise tasks, whose intermediate results
+    have no other use, with a single ``ElemwiseProgram`` task.  Keys in
+    ``keys`` stay in the graph.
+
+    >>> dsk = {'x': 1, 'y': 2,
+    ...        'a': (operator.add, 'x', 1),
+    ...        'b': (operator.mul, 'a', 'y')}
+    >>> dsk2 = fuse_elemwise(dsk, ['b'])
+    >>> sorted(dsk2)
+    ['b', 'x', 'y']
+    >>> dsk2['b']
+    (ElemwiseProgram(mul(add(_0, 1), _1)), 'x', 'y')
+    """
+    keys = set(flatten(keys)) if keys is not None else set()
+    elem = dict()
+    for k, task in dsk.items():
+        e = _elemwise_task(dsk, task)
+        if e is not None:
+            elem[k] = e
+
+    dependents = dict()
+    for k in dsk:
+        for dep in get_dependencies(dsk, k, as_list=True):
+            dependents.setdefault(dep, []).append(k)
+    # Intermediate results used exactly once, by another elementwise task
+    inline = set(k for k in elem
+                 if k not in keys and len(dependents.get(k, ())) == 1 and
+                 dependents[k][0] in elem)
+    if not inline:
+        return dsk
+
+    def build(key, ops, leaves):
+        func, specs = elem[key]
+        args = []
+        for kind, value in specs:
+            if kind == 'const':
+                args.append(('const', value))
+            elif value in inline:
+                args.append(('temp', build(value, ops, leaves)))
+            else:
+                if value not in leaves:
+                    leaves[value] = len(leaves)
+                args.append(('input', leaves[value]))
+        ops.append((func, tuple(args)))
+        return len(ops) - 1
+
+    rv = dict((k, v) for k, v in dsk.items() if k not in inline)
+    roots = set(dependents[k][0] for k in inline) - inline
+    for root in roots:
+        ops, leaves = [], dict()
+        build(root, ops, leaves)
+        rv[root] = ((ElemwiseProgram(ops),) +
+                    tuple(sorted(leaves, key=leaves.get)))
+    return rv
+
+
+def _block_shape(task):
+    """ Shape of the result of an elementwise task, None if not evident
+
+    We know the shapes of slices with explicit bounds and the shapes of
+    elementwise operations on arrays of equal shapes and scalars.
+
+    >>> _block_shape((getarray, 'x', (slice(0, 10), slice(5, 10))))
+    (10, 5)
+    >>> _block_shape((operator.add, (getarray, 'x', (slice(0, 10),)), 1))
+    (10,)
+    >>> _block_shape((operator.add, 'x', 1)) is None
+    True
+
+    Only numbers are scalars, other arguments like 'y' may be keys of blocks.
+
+    >>> _block_shape((operator.add, (getarray, 'x', (slice(0, 10),)),
+    ...               'y')) is None
+    True
+    """
+    if not istask(task):
+        return None
+    if task[0] in (getitem, getarray):
+        index = task[2] if isinstance(task[2], tuple) else (task[2],)
+        if all(isinstance(i, slice) and i.step in (None, 1) and
+               isinstance(i.start, Integral) and
+               isinstance(i.stop, Integral) and 0 <= i.start <= i.stop
+               for i in index):
+            return tuple(i.stop - i.start for i in index)
+        return None
+    if not is_elemwise(task[0]):
+        return None
+    shapes = set()
+    for arg in task[1:]:
+        if istask(arg):
+            shapes.add(_block_shape(arg))
+        elif not isinstance(arg, (Number, np.number, np.bool_)):
+            return None
+    if len(shapes) != 1:
+        return None
+    return shapes.pop()
+
+
+def _slice_inputs(task, index):
+    """ Slice every array input of an elementwise task by index """
+    if task[0] in (getitem, getarray):
+        try:
+            return (task[0], task[1], fuse_slice(task[2], index)) + task[3:]
+        except NotImplementedError:
+            return (getitem, task, index)
+    return task[:1] + tuple(_slice_inputs(arg, index) if istask(arg) else arg
+                            for arg in task[1:])
+
+
+def push_slices(task):
+    """ Slice the inputs of elementwise operations rather than their outputs
+
+    ``(x + 1)[:3, :2]`` computes ``x + 1`` on whole blocks only to keep a
+    small part.  If the inputs are slices of known shape, all equal, we slice
+    them instead, so that we read and compute only what we need.  This
+    reaches down to ``getarray`` calls on the data source, e.g. on an HDF5
+    dataset.
+
+    >>> task = (getitem, (operator.add,
+    ...                   (getarray, 'x', (slice(0, 10), slice(0, 10))), 1),
+    ...         (slice(0, 3), 2))
+    >>> push_slices(task) == (operator.add,
+    ...                       (getarray, 'x', (slice(0, 3, None), 2)), 1)
+    True
+    """
+    if not istask(task):
+        if isinstance(task, list):
+            return [push_slices(t) for t in task]
+        return task
+    if (task[0] in (getitem, getarray) and len(task) == 3 and
+            istask(task[1]) and task[1][0] not in (getitem, getarray) and
+            _block_shape(task[1]) is not None):
+        return push_slices(_slice_inputs(task[1], task[2]))
+    return task[:1] + tuple(push_slices(arg) for arg in task[1:])
@@ -5,15 +5,23 @@ The rechunk module defines:
         converting chunks to new dimensions
     rechunk: a function to convert the blocks
         of an existing dask array to new chunks or blockshape
+    plan_rechunk: a function to choose intermediate chunks
+        through which to rechunk in several steps
+    DiskStage: a temporary file through which to rechunk
+        arrays that do not fit in memory
 """
 
+from bisect import bisect_left, bisect_right
+import os
+import tempfile
 from itertools import product, chain
-from operator import getitem, add
+from operator import getitem, add, mul
 import numpy as np
-from toolz import merge, accumulate
+from toolz import merge, accumulate, reduce
 
 from ..base import tokenize
-from .core import concatenate3, Array, normalize_chunks
+from .core import (concatenate3, Array, normalize_chunks, from_array,
+        insert_to_ooc)
 
 
 def cumdims_label(chunks, const):
@@ -165,7 +173,155 @@ def blockshape_dict_to_tuple(old_chunks, d):
     return tuple(new_chunks)
 
 
-def rechunk(x, chunks):
+MAX_STAGES = 4
+TASK_MEMORY_FACTOR = 4
+
+
+def _cumulative(chunks):
+    return tuple(accumulate(add, (0,) + tuple(chunks)))
+
+
+def _prod(seq):
+    return reduce(mul, seq, 1)
+
+
+def estimate_graph_size(old_chunks, new_chunks):
+    """ Number of tasks to rechunk from old to new chunks in one step
+
+    There is one task to slice out each intersection of an old block with a
+    new block and one task to concatenate each new block.
+
+    >>> old = ((10,) * 10, (100,))     # row blocks
+    >>> new = ((100,), (10,) * 10)     # column blocks
+    >>> estimate_graph_size(old, new)
+    110
+    """
+    npieces = [len(set(_cumulative(o)) | set(_cumulative(n))) - 1
+               for o, n in zip(old_chunks, new_chunks)]
+    return _prod(npieces) + _prod(map(len, new_chunks))
+
+
+def estimate_task_memory(old_chunks, new_chunks):
+    """ Largest number of elements of old blocks needed by one new block
+
+    Each new block concatenates pieces of all of the old blocks that overlap
+    it, so all of these must be in memory at once.
+
+    >>> old = ((10,) * 10, (100,))
+    >>> new = ((100,), (10,) * 10)
+    >>> estimate_task_memory(old, new)   # every old block, the whole array
+    10000
+    """
+    total = 1
+    for old, new in zip(old_chunks, new_chunks):
+        cumold = _cumulative(old)
+        largest = 0
+        start = 0
+        for n in new:
+            stop = start + n
+            if n:
+                i = bisect_right(cumold, start) - 1
+                j = bisect_left(cumold, stop)
+                largest = max(largest, cumold[j] - cumold[i])
+            start = stop
+        total *= largest
+    return total
+
+
+def _even_chunks(n, nblocks):
+    """ Split n into nblocks nearly equal chunks
+
+    >>> _even_chunks(10, 3)
+    (4, 3, 3)
+    """
+    nblocks = max(1, min(n, nblocks))
+    q, r = divmod(n, nblocks)
+    return (q + 1,) * r + (q,) * (nblocks - r)
+
+
+def _intermediate_chunks(old_chunks, new_chunks, t):
+    """ Chunks a fraction t of the way from old to new chunks
+
+    The number of blocks along each dimension moves geometrically from the
+    old number to the new one.  Dimensions with the same number of blocks in
+    old and new chunks keep their old chunks.
+
+    >>> _intermediate_chunks(((10,) * 100, (1000,)),
+    ...                      ((1000,), (10,) * 100), 0.5)  # doctest: +ELLIPSIS
+    ((100, 100, ..., 100), (100, 100, ..., 100))
+    """
+    chunks = []
+    for old, new in zip(old_chunks, new_chunks):
+        if len(old) == len(new) or not sum(old):
+            chunks.append(old)
+        else:
+            nblocks = len(old) ** (1 - t) * len(new) ** t
+            chunks.append(_even_chunks(sum(old), int(round(nblocks))))
+    return tuple(chunks)
+
+
+def plan_rechunk(old_chunks, new_chunks, itemsize, block_size_limit=None,
+                 max_stages=MAX_STAGES):
+    """ Plan to rechunk in several steps through intermediate chunks
+
+    Rechunking in one step can be expensive.  Turning row blocks into column
+    blocks slices every old block once for every new block, and every new
+    block needs every old block in memory.  Going through intermediate chunks,
+    with numbers of blocks per dimension between the old and the new ones,
+    creates fewer tasks overall and bounds the memory of each task.
+
+    We consider plans of one to ``max_stages`` steps.  Among the plans whose
+    tasks need at most ``block_size_limit`` bytes of input data we choose the
+    one with the fewest tasks, see ``estimate_graph_size`` and
+    ``estimate_task_memory``.  The limit defaults to ``TASK_MEMORY_FACTOR``
+    times the largest old or new block.  If no plan meets the limit we choose
+    the one that needs the least memory.
+
+    Returns the list of chunks to pass through, ending with ``new_chunks``.
+
+    >>> old = ((10,) * 100, (1000,))
+    >>> new = ((1000,), (10,) * 100)
+    >>> steps = plan_rechunk(old, new, itemsize=8)
+    >>> len(steps)
+    2
+    >>> steps[0] == ((100,) * 10, (100,) * 10)
+    True
+    >>> steps[-1] == new
+    True
+
+    See Also
+    --------
+    rechunk
+    """
+    old_chunks = tuple(map(tuple, old_chunks))
+    new_chunks = tuple(map(tuple, new_chunks))
+    if old_chunks == new_chunks:
+        return [new_chunks]
+    if block_size_limit is None:
+        largest = max(_prod(map(max, c)) if all(c) else 0
+                      for c in [old_chunks, new_chunks])
+        block_size_limit = TASK_MEMORY_FACTOR * largest * itemsize
+
+    best = None
+    for nstages in range(1, max_stages + 1):
+        steps = [_intermediate_chunks(old_chunks, new_chunks, i / nstages)
+                 for i in range(1, nstages)] + [new_chunks]
+        plan = []
+        for c in steps:
+            if c != (plan[-1] if plan else old_chunks):
+                plan.append(c)
+        pairs = list(zip([old_chunks] + plan[:-1], plan))
+        ntasks = sum(estimate_graph_size(a, b) for a, b in pairs)
+        nbytes = max(estimate_task_memory(a, b) for a, b in pairs) * itemsize
+        cost = (nbytes > block_size_limit,
+                ntasks if nbytes <= block_size_limit else nbytes,
+                len(plan))
+        if best is None or cost < best[0]:
+            best = (cost, plan)
+    return best[1]
+
+
+def rechunk(x, chunks, method=None, memory_limit=None, directory=None):
     """
     Convert blocks in dask array x for new chunks.
 
@@ -183,11 +339,28 @@ def rechunk(x, chunks):
 
     >>> y = rechunk(x, chunks={1: 2})  # rechunk axis 1 with blockshape 2
 
+    Expensive rechunks go through intermediate chunks, see ``plan_rechunk``.
+
+    Rechunks that do not fit in memory, like turning a time-chunked cube into
+    spatial blocks, may go through disk instead.  We write all old blocks to a
+    temporary memory-mapped file and then read the new blocks from it, see
+    ``DiskStage``.
+
+    >>> y = rechunk(x, chunks=(7, 7, 1, 1), method='disk')
+
     Parameters
     ----------
 
     x:   dask array
     chunks:  the new block dimensions to create
+    method: 'tasks' or 'disk', optional
+        Rechunk in memory with slicing and concatenation tasks, or through a
+        staging file on disk.  By default we use tasks unless they would need
+        more than ``memory_limit`` bytes at once.
+    memory_limit: int, optional
+        Bytes of input data that one rechunking task may hold in memory
+    directory: string, optional
+        Where to put the staging file, defaults to the temporary directory
     """
     if isinstance(chunks, dict):
         if not chunks or isinstance(next(iter(chunks.values())), int):
@@ -201,6 +374,109 @@ def rechunk(x, chunks):
     if not len(chunks) == x.ndim or tuple(map(sum, chunks)) != x.shape:
         raise ValueError("Provided chunks are not consistent with shape")
 
+    itemsize = x._dtype.itemsize if x._dtype is not None else 8
+    steps = plan_rechunk(x.chunks, chunks, itemsize,
+                         block_size_limit=memory_limit)
+    if method is None:
+        if memory_limit is not None and x.shape and all(x.shape):
+            chunks_steps = [x.chunks] + steps
+            nbytes = max(estimate_task_memory(a, b) * itemsize
+                         for a, b in zip(chunks_steps[:-1], chunks_steps[1:]))
+            method = 'disk' if nbytes > memory_limit else 'tasks'
+        else:
+            method = 'tasks'
+    if method == 'disk':
+        return _rechunk_through_disk(x, chunks, directory=directory)
+    if method != 'tasks':
+        raise ValueError("Unknown rechunk method %r, expected 'tasks' or "
+                         "'disk'" % method)
+    for c in steps:
+        x = _compute_rechunk(x, c)
+    return x
+
+
+class DiskStage(object):
+    """ Temporary memory-mapped file to hold an array while we rechunk it
+
+    Supports numpy-style getitem and setitem.  Stages pickle by filename, so
+    that processes on the same machine share the file.  The process that
+    created the stage deletes the file when the stage is garbage collected.
+
+    >>> stage = DiskStage((4, 5), 'f8')
+    >>> stage[:2] = 1
+    >>> stage[1:3, 0].tolist()
+    [1.0, 0.0]
+    """
+    def __init__(self, shape, dtype, directory=None):
+        fd, self.filename = tempfile.mkstemp(prefix='dask-rechunk-',
+                                             suffix='.dat', dir=directory)
+        os.close(fd)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._array = None
+        self._owner = True
+        self.array  # allocate the file
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.memmap(self.filename, dtype=self.dtype,
+                                    mode='r+' if not self._owner else 'w+',
+                                    shape=self.shape)
+        return self._array
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __setitem__(self, index, value):
+        self.array[index] = value
+
+    def __getstate__(self):
+        return (self.filename, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.filename, self.shape, self.dtype = state
+        self._array = None
+        self._owner = False
+
+    def __del__(self):
+        if self._owner:
+            self._array = None
+            try:
+                os.remove(self.filename)
+            except OSError:
+                pass
+
+
+def _staged(stage, *writes):
+    return stage
+
+
+def _rechunk_through_disk(x, chunks, directory=None):
+    """ Rechunk x by way of a DiskStage
+
+    We store the old blocks into the stage as with ``Array.store`` and read the
+    new blocks back out as with ``from_array``.  Reading waits until all
+    writing is done, so only a few blocks are in memory at any time.
+    """
+    if x.dtype == object:
+        raise ValueError("Can not rechunk arrays of objects through disk")
+    if not x.shape or not all(x.shape) or x.chunks == chunks:
+        return _compute_rechunk(x, chunks)
+    stage = DiskStage(x.shape, x.dtype, directory=directory)
+
+    token = tokenize(x, chunks, 'disk')
+    write_name = 'rechunk-store-' + token
+    writes = dict(((write_name,) + k[1:], v)
+                  for k, v in insert_to_ooc(stage, x).items())
+    y = from_array(stage, chunks, name='rechunk-disk-' + token)
+    dsk = merge(x.dask, writes, y.dask)
+    dsk[y.name] = (_staged, stage) + tuple(sorted(writes))
+    return Array(dsk, y.name, chunks, dtype=x.dtype)
+
+
+def _compute_rechunk(x, chunks):
+    """ Rechunk x to chunks in one step """
     crossed = intersect_chunks(x.chunks, chunks)
     x2 = dict()
     temp_name = 'rechunk-' + tokenize(x, chunks)
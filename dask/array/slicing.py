@@ -482,33 +482,90 @@ def take(outname, inname, blockdims, index, axis=0):
     >>> dsk  # doctest: +SKIP
     {('y', 0): (getitem, ('x', 0), ([1, 3, 5],)),
      ('y', 2): (getitem, ('x', 2), ([7],))}
+
+    Otherwise we split the output into blocks as large as the largest input
+    block.  Each gathers its values from the input blocks and puts them in
+    order, see ``take_unsorted``.
+
+    >>> blockdims, dsk = take('y', 'x', [(20, 20, 20, 20)],
+    ...                       [75, 5, 31] * 10, axis=0)
+    >>> blockdims
+    ((20, 10),)
     """
     if issorted(index):
         return take_sorted(outname, inname, blockdims, index, axis)
+    return take_unsorted(outname, inname, blockdims, index, axis)
 
-    n = len(blockdims)
-    sizes = blockdims[axis]  # the blocksizes on the axis that we care about
 
-    index_lists = partition_by_size(sizes, sorted(index))
+def take_unsorted(outname, inname, blockdims, index, axis=0):
+    """ Index array with unsorted list index
+
+    Forms a dask for the following case
+
+        x[:, [10, 3, 5, 1], ...]
 
-    dims = [[0] if axis == i else list(range(len(bd)))
-                for i, bd in enumerate(blockdims)]
-    keys = list(product([outname], *dims))
+    Output blocks along ``axis`` are as large as the largest input block.
+    For each we sort its part of the index with ``argsort``, take the
+    values from each input block in sorted order, concatenate them and put
+    them back in the order of the index with the inverse permutation.
 
-    rev_index = list(map(sorted(index).index, index))
-    vals = [(getitem, (np.concatenate,
-                  (list, [(getitem, ((inname,) + d[:axis] + (i,) + d[axis+1:]),
-                                   ((colon,)*axis + (IL,) + (colon,)*(n-axis-1)))
-                                for i, IL in enumerate(index_lists)
-                                if IL]),
-                        axis),
-                     ((colon,)*axis + (rev_index,) + (colon,)*(n-axis-1)))
-            for d in product(*dims)]
+    >>> blockdims, dsk = take_unsorted('y', 'x', [(20, 20)], [25, 1, 3])
+    >>> blockdims
+    ((3,),)
+    >>> dsk  # doctest: +SKIP
+    {('y', 0): (getitem, (np.concatenate, (list, [(getitem, ('x', 0), ([1, 3],)),
+                                                  (getitem, ('x', 1), ([5],))]),
+                                          0),
+                         ([2, 0, 1],))}
+
+    See also:
+        take - calls this function
+    """
+    n = len(blockdims)
+    sizes = blockdims[axis]  # the blocksizes on the axis that we care about
+    bounds = np.cumsum((0,) + tuple(sizes))
+    index = np.asarray(index, dtype=np.intp)
+
+    blocksize = max(sizes)
+    outsizes = tuple(min(blocksize, len(index) - i)
+                     for i in range(0, len(index), blocksize))
+
+    # block indices along the other axes
+    dims = [list(range(len(bd))) for bd in blockdims]
+    otherdims = list(product(*(dims[:axis] + dims[axis + 1:])))
+
+    dsk = dict()
+    start = 0
+    for j, size in enumerate(outsizes):
+        part = index[start:start + size]
+        start += size
+
+        order = np.argsort(part, kind='mergesort')
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        part = part[order]
+
+        blocks = np.searchsorted(bounds, part, 'right') - 1
+        splits = np.flatnonzero(np.diff(blocks)) + 1
+        pieces = [(int(b[0]), (p - bounds[b[0]]).tolist())
+                  for b, p in zip(np.split(blocks, splits),
+                                  np.split(part, splits))]
+        inverse = inverse.tolist()
+
+        for d in otherdims:
+            key = (outname,) + d[:axis] + (j,) + d[axis:]
+            dsk[key] = (getitem,
+                        (np.concatenate,
+                          (list, [(getitem, (inname,) + d[:axis] + (i,) + d[axis:],
+                                   (colon,) * axis + (IL,) + (colon,) * (n - axis - 1))
+                                  for i, IL in pieces]),
+                          axis),
+                        (colon,) * axis + (inverse,) + (colon,) * (n - axis - 1))
 
     blockdims2 = list(blockdims)
-    blockdims2[axis] = (len(index),)
+    blockdims2[axis] = outsizes
 
-    return tuple(blockdims2), dict(zip(keys, vals))
+    return tuple(blockdims2), dsk
 
 
 def posify_index(shape, ind):
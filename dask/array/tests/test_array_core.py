@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, print_function
 import pytest
 pytest.importorskip('numpy')
 
+import warnings
 from operator import add
 
 from toolz import merge
@@ -1328,6 +1329,34 @@ def test_vindex_errors():
     assert raises(IndexError, lambda: d.vindex[[1, 2, 3], [1, 2, 3], 0])
     assert raises(IndexError, lambda: d.vindex[[1], [1, 2, 3]])
     assert raises(IndexError, lambda: d.vindex[[1, 2, 3], [[1], [2], [3]]])
+    assert raises(IndexError, lambda: d.vindex[[1, 5], [1, 2]])
+    assert raises(IndexError, lambda: d.vindex[[1.5, 2], [1, 2]])
+
+
+def test_point_slicing_many_points():
+    x = np.random.random((40, 50))
+    d = da.from_array(x, chunks=(7, 11))
+    i = np.random.randint(-40, 40, 10000)
+    j = np.random.randint(0, 50, 10000)
+
+    result = d.vindex[i, j]
+    assert result.chunks == ((10000,),)
+    assert eq(result, x[i, j])
+    assert same_keys(result, d.vindex[i.copy(), j.copy()])
+    assert not same_keys(result, d.vindex[i, j[::-1]])
+
+def test_vindex_no_elementwise_comparison_warnings():
+    x = np.random.random((40, 50))
+    i = np.random.randint(0, 40, 100)
+    j = np.random.randint(0, 50, 100)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for chunks in [(7, 11), (40, 50)]:  # one block fuses the merge
+            d = da.from_array(x, chunks=chunks)
+            assert np.allclose(d.vindex[i, j].compute(), x[i, j])
+            y = d.vindex[i[:1], j[:1]]
+            assert np.allclose(y.compute(), x[i[:1], j[:1]])
+
 
 def test_vindex_merge():
     from dask.array.core import _vindex_merge
@@ -0,0 +1,30 @@
+import pytest
+pytest.importorskip('numpy')
+
+from dask.array.benchmarks import (run_benchmarks, rechunk_throughput,
+                                   elemwise_throughput, elemwise_memory)
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(size=40, chunk=10, depth=2, nrounds=1)
+    assert set(['map_overlap-2d', 'map_overlap-3d', 'rechunk-2d',
+                'rechunk-3d', 'elemwise', 'elemwise-unfused']) <= set(results)
+    assert all(v > 0 for v in results.values())
+
+
+def test_rechunk_throughput():
+    assert rechunk_throughput((20, 30, 40), (2, 30, 40), (20, 30, 4),
+                              nrounds=2) > 0
+
+
+def test_elemwise_throughput():
+    assert elemwise_throughput((30, 40), (10, 10), nrounds=2) > 0
+    assert elemwise_throughput((30, 40), (10, 10), nrounds=2,
+                               elemwise=False) > 0
+
+
+def test_elemwise_memory():
+    pytest.importorskip('tracemalloc')
+    fused = elemwise_memory((400, 400), (200, 200))
+    unfused = elemwise_memory((400, 400), (200, 200), elemwise=False)
+    assert 0 < fused < unfused
@@ -1,11 +1,12 @@
 import numpy as np
 import numpy.fft as npfft
 
-import dask
+from dask.async import get_sync
 from dask.array.core import Array
-from dask.utils import raises
 import dask.array as da
-from dask.array.fft import fft, ifft, rfft, irfft, hfft, ihfft
+from dask.array.fft import (fft, ifft, rfft, irfft, hfft, ihfft, fft2, ifft2,
+                            fftn, ifftn, rfft2, irfft2, rfftn, irfftn,
+                            chunked_fft, bluestein_fft)
 
 
 def mismatch_err(mismatch_type, got, expected):
@@ -17,12 +18,12 @@ def eq(a, b):
 
     if isinstance(a, Array):
         adt = a._dtype
-        a = a.compute(get=dask.get)
+        a = a.compute(get=get_sync)
     else:
         adt = getattr(a, 'dtype', None)
     if isinstance(b, Array):
         bdt = b._dtype
-        b = b.compute(get=dask.get)
+        b = b.compute(get=get_sync)
     else:
         bdt = getattr(b, 'dtype', None)
 
@@ -55,10 +56,57 @@ darr = da.from_array(nparr, chunks=(1, 10))
 darr2 = da.from_array(nparr, chunks=(10, 1))
 
 
-def test_cant_fft_chunked_axis():
-    bad_darr = da.from_array(nparr, chunks=(5, 5))
-    assert raises(ValueError, lambda: fft(bad_darr))
-    assert raises(ValueError, lambda: fft(bad_darr, axis=0))
+def test_fft_chunked_axis():
+    x = da.from_array(nparr, chunks=(5, 5))
+    assert eq(fft(x), npfft.fft(nparr))
+    assert eq(fft(x, axis=0), npfft.fft(nparr, axis=0))
+    assert eq(ifft(x, 12, axis=0), npfft.ifft(nparr, 12, axis=0))
+    assert eq(rfft(x, 7), npfft.rfft(nparr, 7))
+    assert eq(irfft(x, axis=0), npfft.irfft(nparr, axis=0))
+    assert eq(irfft(x, 13), npfft.irfft(nparr, 13))
+    assert eq(hfft(x, 12, axis=0), npfft.hfft(nparr, 12, axis=0))
+    assert eq(ihfft(x), npfft.ihfft(nparr))
+
+
+def test_chunked_fft():
+    a = np.random.random(4096) + 1j * np.random.random(4096)
+    x = da.from_array(a, chunks=256)
+    y = chunked_fft(x, axis=0)
+    assert max(y.chunks[0]) <= 256
+    assert np.allclose(y.compute(), npfft.fft(a))
+    assert np.allclose(chunked_fft(y, axis=0, inverse=True).compute(), a)
+
+    b = np.random.random((6, 35, 4))  # odd length along the chunked axis
+    x = da.from_array(b, chunks=(3, 8, 4))
+    assert np.allclose(chunked_fft(x, axis=1).compute(), npfft.fft(b, axis=1))
+
+    x = da.from_array(np.arange(13.), chunks=5)  # prime length
+    assert np.allclose(chunked_fft(x, axis=0).compute(),
+                       npfft.fft(np.arange(13.)))
+    assert same_keys(chunked_fft(x, axis=0), chunked_fft(x, axis=0))
+
+
+def test_bluestein_fft():
+    for n in [101, 2 * 101]:  # prime, twice a prime
+        a = np.random.random((n, 3)) + 1j * np.random.random((n, 3))
+        x = da.from_array(a, chunks=(10, 3))
+        y = chunked_fft(x, axis=0)
+        assert any(k[0].startswith('bluestein') for k in y.dask)
+        assert y.chunks == x.chunks
+        assert eq(y, npfft.fft(a, axis=0))
+        assert eq(chunked_fft(x, axis=0, inverse=True), npfft.ifft(a, axis=0))
+
+        # tasks hold a few blocks of the input, not n / 2 values
+        keys = [k for k in y.dask
+                if isinstance(k, tuple) and not k[0].startswith(x.name)]
+        sizes = [v.size for v in get_sync(y.dask, keys)]
+        assert max(sizes) <= 4 * 10 * 3
+
+    a = np.random.random(7)
+    x = da.from_array(a, chunks=3)
+    assert eq(bluestein_fft(x, axis=0), npfft.fft(a))
+    assert eq(bluestein_fft(x, axis=0, inverse=True), npfft.ifft(a))
+    assert eq(fft(x, 11), npfft.fft(a, 11))
 
 
 def test_fft():
@@ -141,3 +189,29 @@ def test_fft_consistent_names():
     assert same_keys(fft(darr, 5), fft(darr, 5))
     assert same_keys(fft(darr2, 5, axis=0), fft(darr2, 5, axis=0))
     assert not same_keys(fft(darr, 5), fft(darr, 13))
+
+
+def test_fftn():
+    a = np.random.random((8, 10, 6))
+    for chunks in [(8, 10, 6), (4, 5, 3)]:
+        x = da.from_array(a, chunks=chunks)
+        assert eq(fftn(x), npfft.fftn(a))
+        assert eq(ifftn(x, axes=(0, 2)), npfft.ifftn(a, axes=(0, 2)))
+        assert eq(fftn(x, s=(4, 12)), npfft.fftn(a, s=(4, 12)))
+        assert eq(fft2(x), npfft.fft2(a))
+        assert eq(ifft2(x, axes=(1, 0)), npfft.ifft2(a, axes=(1, 0)))
+
+
+def test_rfftn():
+    a = np.random.random((8, 10, 6))
+    for chunks in [(8, 10, 6), (4, 5, 3)]:
+        x = da.from_array(a, chunks=chunks)
+        assert eq(rfftn(x), npfft.rfftn(a))
+        assert eq(rfftn(x, s=(6, 9), axes=(0, 1)),
+                  npfft.rfftn(a, s=(6, 9), axes=(0, 1)))
+        assert eq(rfft2(x), npfft.rfft2(a))
+
+        y = da.from_array(npfft.rfftn(a), chunks=chunks)
+        assert eq(irfftn(y), npfft.irfftn(npfft.rfftn(a)))
+        assert eq(irfftn(y, s=a.shape), a)
+        assert eq(irfft2(y, s=(10, 6)), npfft.irfft2(npfft.rfftn(a), s=(10, 6)))
@@ -8,7 +8,7 @@ import dask
 import dask.array as da
 from dask.array.ghost import (Array, fractional_slice, getitem, trim_internal,
                               ghost_internal, nearest, constant, boundaries,
-                              reflect, periodic, ghost)
+                              reflect, periodic, ghost, ghost_direct)
 from dask.core import get
 
 
@@ -179,6 +179,38 @@ def test_ghost():
     assert g.chunks == ((8, 8), (5, 5))
 
 
+def test_ghost_one_task_per_block():
+    x = np.arange(120).reshape((4, 5, 6))
+    d = da.from_array(x, chunks=(2, 3, 3))
+    g = ghost(d, depth={0: 1, 1: 2, 2: 1},
+              boundary={0: 'periodic', 1: 'nearest', 2: 0})
+    assert len(g.dask) == len(d.dask) + 8
+
+    expected = np.pad(x, ((1, 1), (0, 0), (0, 0)), mode='wrap')
+    expected = np.pad(expected, ((0, 0), (2, 2), (0, 0)), mode='edge')
+    expected = np.pad(expected, ((0, 0), (0, 0), (1, 1)), mode='constant')
+    result = np.array(g)
+    assert g.chunks == ((4, 4), (7, 6), (5, 5))
+    assert eq(result[:4, :7, :5], expected[:4, :7, :5])  # first block
+    assert eq(result[-4:, -6:, -5:], expected[-4:, -6:, -5:])  # last block
+
+
+def test_ghost_direct_matches_ghost_internal():
+    x = np.random.randint(0, 100, size=(10, 9))
+    d = da.from_array(x, chunks=(4, 3))
+    for depth in [{0: 2, 1: 1}, {0: 0, 1: 3}, {1: 2}]:
+        for boundary in [{0: 'reflect', 1: 'periodic'}, {0: 'nearest'},
+                         {1: -1}]:
+            old = ghost_internal(boundaries(d, depth, boundary), depth)
+            trim = dict((k, v * 2 if boundary.get(k) is not None else 0)
+                        for k, v in depth.items())
+            old = old[tuple(slice(trim.get(i, 0), -trim.get(i, 0) or None)
+                            for i in range(d.ndim))]
+            new = ghost_direct(d, depth, boundary)
+            assert new.chunks == old.chunks
+            assert eq(new, old)
+
+
 def test_map_overlap():
     x = da.arange(10, chunks=5)
 
@@ -5,7 +5,9 @@ pytest.importorskip('numpy')
 
 import numpy as np
 from dask.array import from_array
-from dask.array.linalg import tsqr, svd_compressed, qr, svd
+from dask.utils import raises
+from dask.array.linalg import (tsqr, svd_compressed, qr, svd, lu, cholesky,
+                               solve_triangular, solve, lstsq)
 
 
 def same_keys(a, b):
@@ -46,6 +48,31 @@ def test_tsqr_irregular_blocks():
     assert np.all(r == np.triu(r))  # r must be upper triangular
 
 
+def test_tsqr_many_blocks():
+    m, n = 370, 10
+    mat = np.random.rand(m, n)
+    data = from_array(mat, chunks=(10, n), name='A')  # 37 blocks
+
+    for split_every in [2, 3, 8]:
+        q, r = tsqr(data, split_every=split_every)
+        stacks = [v[1][1][1] for v in r.dask.values()
+                  if v[0] is np.linalg.qr and v[1][0] is np.vstack]
+        assert len(stacks) > 1
+        assert all(len(stack) <= split_every for stack in stacks)
+        q = np.array(q)
+        r = np.array(r)
+
+        assert np.allclose(mat, np.dot(q, r))  # accuracy check
+        assert np.allclose(np.eye(n, n), np.dot(q.T, q))  # q orthonormal
+        assert np.all(r == np.triu(r))  # r must be upper triangular
+
+        u, s, vt = tsqr(data, compute_svd=True, split_every=split_every)
+        s_exact = np.linalg.svd(mat, compute_uv=False)
+        assert np.allclose(np.array(s), s_exact)
+        assert np.allclose(mat, np.dot(np.array(u) * np.array(s),
+                                       np.array(vt)))
+
+
 def test_tsqr_svd_regular_blocks():
     m, n = 20, 10
     mat = np.random.rand(m, n)
@@ -139,3 +166,97 @@ def test_svd_compressed():
     assert np.allclose(np.eye(r, r), np.dot(u.T, u))  # u must be orthonormal
     assert np.allclose(np.eye(r, r), np.dot(vt, vt.T))  # v must be orthonormal
     assert np.allclose(s, s_exact)  # s must contain the singular values
+
+
+def test_lu():
+    np.random.seed(0)
+    for n, c in [(20, 5), (30, 7), (12, 12)]:
+        mat = np.random.rand(n, n)
+        data = from_array(mat, chunks=c)
+
+        p, l, u = lu(data)
+        p, l, u = np.array(p), np.array(l), np.array(u)
+
+        assert np.allclose(mat, p.dot(l).dot(u))  # accuracy check
+        assert np.all(l == np.tril(l))  # l must be lower triangular
+        assert np.allclose(np.diag(l), 1)
+        assert np.all(np.abs(l) <= 1 + 1e-12)  # pivots along whole panels
+        assert np.all(u == np.triu(u))  # u must be upper triangular
+        assert np.allclose(p.dot(p.T), np.eye(n))
+
+    assert same_keys(lu(data)[1], lu(data)[1])
+    assert raises(ValueError, lambda: lu(from_array(mat, chunks=(6, 4))))
+    assert raises(ValueError, lambda: lu(from_array(mat[:, :6], chunks=6)))
+
+
+def test_cholesky():
+    np.random.seed(1)
+    for n, c in [(20, 5), (30, 7)]:
+        mat = np.random.rand(n, n)
+        mat = mat.dot(mat.T) + n * np.eye(n)
+        l = np.array(cholesky(from_array(mat, chunks=c)))
+        assert np.allclose(l, np.linalg.cholesky(mat))
+        assert np.allclose(mat, l.dot(l.T))
+
+
+def test_solve_triangular():
+    np.random.seed(2)
+    n = 20
+    mat = np.tril(np.random.rand(n, n)) + n * np.eye(n)
+    for b in [np.random.rand(n), np.random.rand(n, 6)]:
+        bd = from_array(b, chunks=(4,) + b.shape[1:])  # rechunked to a
+        x = solve_triangular(from_array(mat, chunks=5), bd, lower=True)
+        assert x.chunks[0] == (5, 5, 5, 5)
+        assert np.allclose(np.array(x), np.linalg.solve(mat, b))
+        x = solve_triangular(from_array(mat.T, chunks=5), bd)
+        assert np.allclose(np.array(x), np.linalg.solve(mat.T, b))
+
+
+def test_solve():
+    np.random.seed(3)
+    n = 30
+    mat = np.random.rand(n, n)
+    spd = mat.dot(mat.T) + n * np.eye(n)
+    for b in [np.random.rand(n), np.random.rand(n, 4)]:
+        bd = from_array(b, chunks=(7,) + b.shape[1:])
+        x = solve(from_array(mat, chunks=7), bd)
+        assert np.allclose(np.array(x), np.linalg.solve(mat, b))
+        x = solve(from_array(spd, chunks=7), bd, sym_pos=True)
+        assert np.allclose(np.array(x), np.linalg.solve(spd, b))
+
+
+def test_lstsq():
+    np.random.seed(4)
+    m, n = 100, 10
+    mat = np.random.rand(m, n)
+    data = from_array(mat, chunks=(15, n))
+    for b in [np.random.rand(m), np.random.rand(m, 3)]:
+        x, residuals, rank, s = lstsq(data, from_array(b, chunks=20))
+        x_exact, residuals_exact, rank_exact, s_exact = np.linalg.lstsq(mat, b)
+        assert np.allclose(np.array(x), x_exact)
+        assert np.allclose(np.array(residuals), residuals_exact)
+        assert int(rank.compute()) == rank_exact
+        assert np.allclose(np.array(s), s_exact)
+
+
+def test_solve_scales_with_blocks():
+    np.random.seed(5)
+    n, c = 96, 12
+    mat = np.random.rand(n, n)
+    b = np.random.rand(n)
+    data = from_array(mat, chunks=c)
+    nb = n // c
+
+    # no task of the factorization holds more than a column of blocks
+    p, l, u = lu(data)
+    stacks = [v[1][1][1] for k, v in u.dask.items()
+              if k[0].startswith(('lu-panel', 'lu-column'))]
+    assert len(stacks) == nb * (nb + 1) // 2
+    assert max(map(len, stacks)) == nb
+    x = solve(data, from_array(b, chunks=c))
+    assert np.linalg.norm(mat.dot(np.array(x)) - b) < 1e-10 * n
+
+    # the trailing updates of each step are independent tasks
+    l = cholesky(data.dot(data.T))
+    updates = [k for k in l.dask if k[0].startswith('cholesky-trailing-0')]
+    assert len(updates) == nb * (nb - 1) // 2
@@ -1,10 +1,15 @@
 import pytest
 pytest.importorskip('numpy')
 
+from operator import add, mul, sub
+import numpy as np
 from dask.array.optimization import (getitem, rewrite_rules, optimize,
-        remove_full_slices, fuse_slice)
+        remove_full_slices, fuse_slice, fuse_elemwise, ElemwiseProgram,
+        push_slices)
 from dask.utils import raises
-from dask.array.core import getarray
+from dask.array.core import getarray, ElemwiseFunction
+from dask.async import get_sync
+import dask.array as da
 
 
 def test_fuse_getitem():
@@ -101,3 +106,145 @@ def test_hard_fuse_slice_cases():
     term = (getarray, (getarray, 'x', (None, slice(None, None))),
                      (slice(None, None), 5))
     assert rewrite_rules.rewrite(term) == (getarray, 'x', (None, 5))
+
+
+def test_fuse_elemwise():
+    dsk = {'x': 1, 'y': 2, 'z': 3,
+           'a': (add, 'x', 1),
+           'b': (mul, 'a', 'y'),
+           'c': (sub, 'b', 'z'),
+           'd': (np.square, 'c'),
+           'e': (np.sum, 'd')}
+    result = fuse_elemwise(dsk, ['e'])
+    assert sorted(result) == ['d', 'e', 'x', 'y', 'z']
+    assert result['d'][1:] == ('x', 'y', 'z')
+    assert result['d'][0](1, 2, 3) == np.square((1 + 1) * 2 - 3)
+
+    # intermediate results with other uses stay
+    dsk2 = dict(dsk, f=(np.sum, 'b'))
+    result = fuse_elemwise(dsk2, ['e', 'f'])
+    assert 'b' in result and 'a' not in result and 'c' not in result
+
+    # as do results used twice by the same task, and requested keys
+    dsk3 = dict(dsk, d=(mul, 'c', 'c'))
+    assert 'c' in fuse_elemwise(dsk3, ['e'])
+    assert 'c' in fuse_elemwise(dsk, ['e', 'c'])
+
+
+def test_elemwise_program_in_place():
+    prog = ElemwiseProgram([(np.sin, (('input', 0),)),
+                            (add, (('temp', 0), ('const', 1))),
+                            (mul, (('temp', 1), ('input', 1))),
+                            (pow, (('temp', 2), ('const', 2)))])
+    for x, y in [(np.arange(6.0), np.arange(6.0)),
+                 (np.arange(6, dtype='f4'), 2.5),
+                 (np.arange(6.0), np.arange(6)),
+                 (np.arange(6.0).reshape((2, 3)), np.arange(3.0)),
+                 (np.arange(3.0), np.arange(6.0).reshape((2, 3)))]:
+        expected = ((np.sin(x) + 1) * y) ** 2
+        result = prog(x, y)
+        assert result.dtype == expected.dtype
+        assert np.allclose(result, expected)
+    x = np.arange(6.0)
+    prog(x, x)
+    assert (x == np.arange(6.0)).all()  # inputs are untouched
+
+
+def test_elemwise_program_leaves_shared_blocks_alone():
+    # y is the block x itself, which 'out' still needs
+    dsk = {'x': (np.ones, 2),
+           'y': (ElemwiseFunction(lambda a: a), 'x'),
+           'z': (add, 'y', 1),
+           'w': (mul, 'z', 2),
+           'out': (sum, ['w', 'x'])}
+    expected = get_sync(dsk, 'out')
+    assert (expected == [5, 5]).all()
+    dsk2 = fuse_elemwise(dsk, ['out'])
+    assert 'z' not in dsk2
+    assert (get_sync(dsk2, 'out') == expected).all()
+
+
+def test_optimize_elemwise_expression():
+    a = np.random.random((10, 10))
+    b = np.random.random((10, 10))
+    x = da.from_array(a, chunks=(5, 5))
+    y = da.from_array(b, chunks=(5, 5))
+    z = ((x + 1) * y - da.sin(x)) ** 2 / 3
+
+    dsk = optimize(z.dask, z._keys())
+    tasks = [v for k, v in dsk.items() if k[0] == z.name]
+    assert len(dsk) == len(tasks) + 2  # the two numpy arrays
+    assert all(isinstance(task[0], ElemwiseProgram) for task in tasks)
+    assert np.allclose(z.compute(), ((a + 1) * b - np.sin(a)) ** 2 / 3)
+
+
+class RecordingArray(object):
+    """ Array-like that records which parts of it we read """
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.reads = []
+
+    def __getitem__(self, index):
+        result = self.data[index]
+        self.reads.append(np.size(result))
+        return result
+
+
+def test_push_slices_to_source():
+    a = RecordingArray(np.random.random((100, 100)))
+    b = RecordingArray(np.random.random((100, 100)))
+    x = da.from_array(a, chunks=(50, 50))
+    y = da.from_array(b, chunks=(50, 50))
+
+    assert np.allclose((x + 1)[:3, :2].compute(), (a.data + 1)[:3, :2])
+    assert a.reads == [6]
+
+    del a.reads[:]
+    z = (da.sin(x) * y - 1)[45:55, 10]
+    assert np.allclose(z.compute(),
+                       (np.sin(a.data) * b.data - 1)[45:55, 10])
+    assert sorted(a.reads) == sorted(b.reads) == [5, 5]
+
+
+def test_push_slices_through_map_blocks():
+    a = RecordingArray(np.arange(100.0))
+    x = da.from_array(a, chunks=50)
+
+    assert np.allclose(x.map_blocks(np.sqrt, elementwise=True)[:4].compute(),
+                       np.sqrt(np.arange(4.0)))
+    assert a.reads == [4]
+
+    del a.reads[:]
+    assert np.allclose(x.map_blocks(np.cumsum)[:4].compute(),
+                       np.cumsum(np.arange(4.0)))
+    assert a.reads == [50]
+
+    assert raises(ValueError, lambda: x.map_blocks(np.sqrt, chunks=(50, 50),
+                                                   elementwise=True))
+
+
+def test_push_slices_with_broadcasting():
+    a = RecordingArray(np.random.random((10, 10)))
+    b = RecordingArray(np.random.random(10))
+    x = da.from_array(a, chunks=(5, 5))
+    y = da.from_array(b, chunks=5)
+
+    z = (x + y)[:2, 1:3]
+    assert np.allclose(z.compute(), (a.data + b.data)[:2, 1:3])
+    assert a.reads == [25] and b.reads == [5]  # shapes differ, no push
+
+
+def test_push_slices_with_string_keys():
+    task = (getitem, (add, (getarray, 'x', (slice(0, 10),)), 'y'),
+            (slice(2, 4),))
+    assert push_slices(task) == task
+    dsk = {'x': np.arange(10), 'y': np.arange(10), 'z': push_slices(task)}
+    assert (get_sync(dsk, 'z') == np.arange(10)[2:4] * 2).all()
+
+    task = (getitem, (add, (getarray, 'x', (slice(0, 10),)), 1),
+            (slice(2, 4),))
+    assert push_slices(task) != task  # numbers are still scalars
+    assert (get_sync({'x': np.arange(10), 'z': push_slices(task)}, 'z') ==
+            np.arange(1, 11)[2:4]).all()
@@ -5,6 +5,9 @@ from itertools import product
 import numpy as np
 from dask.array.rechunk import intersect_chunks, rechunk, normalize_chunks
 from dask.array.rechunk import cumdims_label, _breakpoints, _intersect_1d
+from dask.array.rechunk import (plan_rechunk, estimate_graph_size,
+        estimate_task_memory, DiskStage)
+import dask
 import dask.array as da
 from dask.utils import raises
 
@@ -177,3 +180,99 @@ def test_rechunk_with_integer():
     y = x.rechunk(3)
     assert y.chunks == ((3, 2),)
     assert (x.compute() == y.compute()).all()
+
+
+def test_estimates():
+    old = ((10,) * 10, (100,))
+    new = ((100,), (10,) * 10)
+    assert estimate_graph_size(old, new) == 10 * 10 + 10
+    assert estimate_graph_size(old, old) == 10 + 10
+    assert estimate_task_memory(old, new) == 100 * 100
+    assert estimate_task_memory(old, old) == 10 * 100
+    assert estimate_task_memory(((5, 5),), ((3, 4, 3),)) == 10
+
+
+def test_plan_rechunk():
+    old = ((10,) * 100, (1000,))
+    new = ((1000,), (10,) * 100)
+    steps = plan_rechunk(old, new, itemsize=8)
+    assert len(steps) > 1
+    assert steps[-1] == new
+
+    chunks = [old] + steps
+    pairs = list(zip(chunks[:-1], chunks[1:]))
+    assert (sum(estimate_graph_size(a, b) for a, b in pairs) <
+            estimate_graph_size(old, new))
+    assert (max(estimate_task_memory(a, b) for a, b in pairs) <
+            estimate_task_memory(old, new))
+
+
+def test_plan_rechunk_single_step():
+    old = ((4, 4, 2), (3, 3, 3, 1))
+    for new in [((10,), (3, 3, 3, 1)), ((2,) * 5, (5, 5)), old]:
+        assert plan_rechunk(old, new, itemsize=8) == [new]
+
+
+def test_rechunk_transposition():
+    a = np.random.uniform(0, 1, 60 * 60).reshape((60, 60))
+    x = da.from_array(a, chunks=(2, 60))
+    y = x.rechunk((60, 2))
+    assert y.chunks == ((60,), (2,) * 30)
+    assert len(plan_rechunk(x.chunks, y.chunks, 8)) > 1
+    assert np.all(y.compute() == a)
+
+    a = np.random.uniform(0, 1, 30 ** 3).reshape((30, 30, 30))
+    x = da.from_array(a, chunks=(1, 30, 30))
+    y = x.rechunk((30, 30, 1))
+    assert y.chunks == ((30,), (30,), (1,) * 30)
+    assert np.all(y.compute() == a)
+
+
+def test_rechunk_through_disk():
+    a = np.random.uniform(0, 1, 20 * 15 * 10).reshape((20, 15, 10))
+    x = da.from_array(a, chunks=(1, 15, 10))
+    y = x.rechunk((20, 5, 2), method='disk')
+    assert y.chunks == ((20,), (5, 5, 5), (2,) * 5)
+    assert any('disk' in str(k) for k in y.dask)
+    assert np.all(y.compute() == a)
+    assert np.all((y + 1).compute(get=dask.get) == a + 1)
+
+    assert np.all(x.rechunk(x.chunks, method='disk').compute() == a)
+    assert raises(ValueError, lambda: x.rechunk((20, 5, 2), method='foo'))
+
+
+def test_rechunk_through_disk_with_memory_limit():
+    x = da.ones((20, 20), chunks=(1, 20))
+    y = x.rechunk((20, 1), memory_limit=20 * 20 * 8)
+    assert not any('disk' in str(k) for k in y.dask)
+    y = x.rechunk((20, 1), memory_limit=2 * 20 * 8)
+    assert any('disk' in str(k) for k in y.dask)
+    assert np.all(y.compute() == 1)
+
+
+def test_disk_stage():
+    import os
+    import pickle
+    stage = DiskStage((10, 10), 'i4')
+    stage[:5] = 1
+    filename = stage.filename
+    assert os.path.exists(filename)
+
+    stage2 = pickle.loads(pickle.dumps(stage))
+    assert stage2[:, 0].tolist() == [1] * 5 + [0] * 5
+    stage2[5:] = 2
+    assert stage[:, 0].tolist() == [1] * 5 + [2] * 5
+
+    del stage2
+    assert os.path.exists(filename)
+    del stage
+    assert not os.path.exists(filename)
+
+
+def test_rechunk_through_disk_multiprocessing():
+    pytest.importorskip('dill')
+    from dask.multiprocessing import get
+    a = np.arange(100).reshape((10, 10))
+    x = da.from_array(a, chunks=(1, 10))
+    y = x.rechunk((10, 1), method='disk')
+    assert np.all(y.compute(get=get) == a)
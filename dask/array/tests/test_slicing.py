@@ -304,6 +304,21 @@ def test_take():
     assert chunks == ((20, 20, 20, 20), (4,))
 
 
+def test_take_unsorted_stays_chunked():
+    x = np.arange(2000).reshape((200, 10))
+    d = da.from_array(x, chunks=(20, 5))
+    perm = np.random.permutation(200)
+
+    y = d[perm]
+    assert y.chunks == ((20,) * 10, (5, 5))
+    assert (y.compute() == x[perm]).all()
+
+    index = np.random.randint(0, 10, size=25)
+    z = d[:, index]
+    assert z.chunks == ((20,) * 10, (5,) * 5)
+    assert (z.compute() == x[:, index]).all()
+
+
 def test_take_sorted():
     chunks, dsk = take('y', 'x', [(20, 20, 20, 20)], [1, 3, 5, 47], axis=0)
     expected = {('y', 0): (getitem, ('x', 0), ([1, 3, 5],)),
@@ -118,12 +118,15 @@ from __future__ import absolute_import, division, print_function
 
 import sys
 import traceback
+from collections import defaultdict
 from operator import add
+from timeit import default_timer
 from .core import istask, flatten, reverse_dict, get_dependencies, ishashable
 from .context import _globals
 from .order import order
 from .callbacks import unpack_callbacks
 from .optimize import cull
+from .compatibility import Empty
 
 def inc(x):
     return x + 1
@@ -380,9 +383,31 @@ this first-in-first-out policy reduces memory footprint
 The main function of the scheduler.  Get is the main entry point.
 '''
 
+SPECULATION_FACTOR = 4
+SPECULATION_INTERVAL = 0.05
+
+
+def key_prefix(key, task):
+    """ Name of the group of similar tasks that key belongs to
+
+    Tasks of a group are expected to take about equally long.
+
+    >>> key_prefix(('x', 1, 2), (inc, 1))
+    'x'
+    >>> key_prefix('y', (inc, 1))
+    'inc'
+    """
+    if isinstance(key, tuple) and key:
+        return key[0]
+    if istask(task):
+        return getattr(task[0], '__name__', type(task[0]).__name__)
+    return key
+
+
 def get_async(apply_async, num_workers, dsk, result, cache=None,
               queue=None, get_id=default_get_id, raise_on_exception=False,
-              rerun_exceptions_locally=None, callbacks=None, **kwargs):
+              rerun_exceptions_locally=None, callbacks=None, speculative=None,
+              **kwargs):
     """ Asynchronous get function
 
     This is a general version of various asynchronous schedulers for dask.  It
@@ -417,6 +442,12 @@ def get_async(apply_async, num_workers, dsk, result, cache=None,
         Callbacks are passed in as tuples of length 4. Multiple sets of
         callbacks may be passed in as a list of tuples. For more information,
         see the dask.diagnostics documentation.
+    speculative : bool or number, optional
+        Run a second copy of tasks that take this many times longer than the
+        median of their finished peers (see ``key_prefix``) while workers are
+        idle, and use whichever copy finishes first.  ``True`` means a factor
+        of 4.  Only use this for graphs of pure tasks, copies of a task may
+        run at the same time.  (False by default)
 
     See Also
     --------
@@ -447,6 +478,14 @@ def get_async(apply_async, num_workers, dsk, result, cache=None,
 
     if rerun_exceptions_locally is None:
         rerun_exceptions_locally = _globals.get('rerun_exceptions_locally', False)
+    if speculative is None:
+        speculative = _globals.get('speculative', False)
+    if speculative is True:
+        speculative = SPECULATION_FACTOR
+    started = dict()
+    durations = defaultdict(list)
+    duplicated = set()
+    extra = [0]  # copies of tasks that are running twice
 
     if state['waiting'] and not state['ready']:
         raise ValueError("Found no accessible jobs in dask")
@@ -464,9 +503,30 @@ def get_async(apply_async, num_workers, dsk, result, cache=None,
         data = dict((dep, state['cache'][dep])
                     for dep in get_dependencies(dsk, key))
         # Submit
+        started[key] = default_timer()
         apply_async(execute_task, args=[key, dsk[key], data, queue,
                                         get_id, raise_on_exception])
 
+    def speculate():
+        """ Run a copy of straggling tasks on idle workers """
+        now = default_timer()
+        for key in list(state['running']):
+            if len(state['running']) + extra[0] >= num_workers:
+                break
+            if key in duplicated:
+                continue
+            samples = sorted(durations[key_prefix(key, dsk[key])])
+            if len(samples) < 2:
+                continue
+            median = samples[len(samples) // 2]
+            if now - started[key] > speculative * median:
+                duplicated.add(key)
+                extra[0] += 1
+                data = dict((dep, state['cache'][dep])
+                            for dep in get_dependencies(dsk, key))
+                apply_async(execute_task, args=[key, dsk[key], data, queue,
+                                                get_id, raise_on_exception])
+
     # Seed initial tasks into the thread pool
     while state['ready'] and len(state['running']) < num_workers:
         fire_task()
@@ -474,11 +534,25 @@ def get_async(apply_async, num_workers, dsk, result, cache=None,
     # Main loop, wait on tasks to finish, insert new ones
     while state['waiting'] or state['ready'] or state['running']:
         try:
-            key, res, tb, worker_id = queue.get()
+            if speculative:
+                try:
+                    key, res, tb, worker_id = queue.get(
+                            timeout=SPECULATION_INTERVAL)
+                except Empty:
+                    speculate()
+                    continue
+            else:
+                key, res, tb, worker_id = queue.get()
         except KeyboardInterrupt:
             for f in finish_cbs:
                 f(dsk, state, True)
             raise
+        if key not in state['running']:  # slower copy of a speculated task
+            extra[0] -= 1
+            continue
+        if speculative and not isinstance(res, Exception):
+            durations[key_prefix(key, dsk[key])].append(
+                    default_timer() - started[key])
         if isinstance(res, Exception):
             for f in finish_cbs:
                 f(dsk, state, True)
@@ -502,8 +576,10 @@ def get_async(apply_async, num_workers, dsk, result, cache=None,
         finish_task(dsk, key, state, results, keyorder.get)
         for f in posttask_cbs:
             f(key, res, dsk, state, worker_id)
-        while state['ready'] and len(state['running']) < num_workers:
+        while state['ready'] and len(state['running']) + extra[0] < num_workers:
             fire_task()
+        if speculative:
+            speculate()
 
     # Final reporting
     while state['running'] or not queue.empty():
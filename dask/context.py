@@ -22,6 +22,7 @@ class set_options(object):
         func_loads/func_dumps - loads/dumps functions for serialization of data
             likely to contain functions.  Defaults to dill.loads/dill.dumps
         rerun_exceptions_locally - rerun failed tasks in master process
+        speculative - run second copies of straggling tasks, see get_async
 
     Example
     -------
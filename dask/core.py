@@ -287,7 +287,8 @@ def subs(task, key, val):
     """
     if not istask(task):
         try:
-            if task == key:
+            # Only compare like types, arrays compare elementwise
+            if type(task) is type(key) and task == key:
                 return val
         except ValueError:
             pass
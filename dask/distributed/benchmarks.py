@@ -0,0 +1,143 @@
+""" Benchmarks of the distributed scheduler on a single machine
+
+Run all benchmarks from the command line::
+
+    $ python -m dask.distributed.benchmarks
+    $ python -m dask.distributed.benchmarks --processes --transport ipc
+
+or from Python against an existing ``LocalCluster``:
+
+>>> from dask.distributed import LocalCluster
+>>> from dask.distributed.benchmarks import run_benchmarks
+>>> with LocalCluster(nworkers=4) as cluster:  # doctest: +SKIP
+...     run_benchmarks(cluster)
+{'throughput': 1523.2, 'latency': 0.0031, 'bandwidth': 410234511.3,
+ 'messages': 21094.3}
+"""
+from __future__ import print_function, division
+
+from time import time
+
+import zmq
+
+from .cluster import LocalCluster
+from .protocol import dumps_header, loads_header
+
+
+def inc(x):
+    return x + 1
+
+
+def task_throughput(cluster, ntasks=1000):
+    """ Tasks per second for a wide graph of trivial independent tasks """
+    client = cluster.client()
+    try:
+        dsk = dict((('inc', i), (inc, i)) for i in range(ntasks))
+        dsk['total'] = (sum, list(dsk))
+        start = time()
+        client.get(dsk, 'total')
+        return (ntasks + 1) / (time() - start)
+    finally:
+        client.close()
+
+
+def task_latency(cluster, nrounds=50):
+    """ Median seconds for a client to run a single trivial task """
+    client = cluster.client()
+    try:
+        durations = []
+        for i in range(nrounds):
+            start = time()
+            client.get({'x': (inc, i)}, 'x')
+            durations.append(time() - start)
+        return sorted(durations)[len(durations) // 2]
+    finally:
+        client.close()
+
+
+def transfer_bandwidth(cluster, nbytes=int(1e7), nrounds=5):
+    """ Bytes per second moved between scheduler and workers
+
+    Each round sends a block of bytes to a worker and gathers it back.
+    """
+    s = cluster.scheduler
+    data = b'0' * int(nbytes)
+    start = time()
+    for i in range(nrounds):
+        key = 'transfer-%d' % i
+        s.send_data(key, data)
+        s.gather([key])
+        s.release_key(key)
+    return 2 * nbytes * nrounds / (time() - start)
+
+
+def message_rate(cluster, nmessages=20000, window=1000):
+    """ Control messages per second answered by a worker
+
+    We send 'status' requests to a worker, up to ``window`` at a time, and
+    count the replies.  This measures the cost of handling small control
+    messages: framing, header encoding and the worker's event loop.
+    """
+    context = zmq.Context()
+    router = context.socket(zmq.ROUTER)
+    port = router.bind_to_random_port('tcp://127.0.0.1')
+    address = ('tcp://127.0.0.1:%d' % port).encode()
+    dealer = context.socket(zmq.DEALER)
+    dealer.connect(list(cluster.scheduler.workers)[0])
+    payload = b''
+    try:
+        start = time()
+        sent = received = 0
+        while received < nmessages:
+            while sent < nmessages and sent - received < window:
+                header = {'function': 'status', 'jobid': sent,
+                          'address': address, 'timestamp': time()}
+                dealer.send_multipart([dumps_header(header), payload])
+                sent += 1
+            _, header, _ = router.recv_multipart()
+            loads_header(header)
+            received += 1
+        return nmessages / (time() - start)
+    finally:
+        dealer.close(linger=0)
+        router.close(linger=0)
+        context.term()
+
+
+def run_benchmarks(cluster, ntasks=1000, nrounds=50, nbytes=int(1e7),
+                   nmessages=20000):
+    """ Run all benchmarks on cluster, return dict of results """
+    return {'throughput': task_throughput(cluster, ntasks),
+            'latency': task_latency(cluster, nrounds),
+            'bandwidth': transfer_bandwidth(cluster, nbytes),
+            'messages': message_rate(cluster, nmessages)}
+
+
+def main(args=None):
+    import argparse  # Python 2.7+, only the command line needs it
+    parser = argparse.ArgumentParser(
+            description='Benchmark dask.distributed on this machine')
+    parser.add_argument('--nworkers', type=int, default=4)
+    parser.add_argument('--processes', action='store_true',
+                        help='run workers in separate processes')
+    parser.add_argument('--transport', default='tcp', choices=['tcp', 'ipc'])
+    parser.add_argument('--ntasks', type=int, default=1000)
+    parser.add_argument('--nbytes', type=int, default=int(1e7))
+    parser.add_argument('--nmessages', type=int, default=20000)
+    args = parser.parse_args(args)
+
+    with LocalCluster(nworkers=args.nworkers, processes=args.processes,
+                      transport=args.transport) as cluster:
+        results = run_benchmarks(cluster, ntasks=args.ntasks,
+                                 nbytes=args.nbytes,
+                                 nmessages=args.nmessages)
+
+    print('Throughput:  %10.1f tasks/s' % results['throughput'])
+    print('Latency:     %10.2f ms/task' % (results['latency'] * 1000))
+    print('Bandwidth:   %10.1f MB/s' % (results['bandwidth'] / 1e6))
+    print('Messages:    %10.1f msgs/s' % results['messages'])
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -2,30 +2,153 @@ from __future__ import print_function
 
 import os
 import itertools
+import logging
+import random
+import socket
 import uuid
-from datetime import datetime
+from collections import defaultdict, deque
+from time import time
+from multiprocessing.pool import ThreadPool
+from threading import Thread, Lock, RLock, Event
 
 import zmq
 import dill
-from .scheduler import pickle
-from ..compatibility import unicode
+from .scheduler import pickle, persisted
+from .utils import funcname, ipc_address
+from .protocol import dumps_header, loads_header
+from toolz import merge
+
+from .. import core
+from ..base import tokenize
+from ..core import get_dependencies, flatten
+from ..optimize import cull
+from ..compatibility import unicode, Queue, apply
 
 context = zmq.Context()
 
-jobids = ('schedule-%d' % i for i in itertools.count())
+jobids = itertools.count()
+
+
+logger = logging.getLogger(__name__)
+
+
+class Future(object):
+    """ A remotely running computation
+
+    Futures are created by ``Client.submit`` and ``Client.map``.  The result
+    lives on the workers until every future pointing to it has been garbage
+    collected.
+
+    >>> future = client.submit(inc, 1)  # doctest: +SKIP
+    >>> future.result()  # doctest: +SKIP
+    2
+
+    Futures may be passed to further calls of ``submit`` to chain
+    computations without moving data through the client.
+
+    See Also
+    --------
+
+    Client.submit
+    Client.gather
+    as_completed
+    """
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.client._inc_ref(key)
+
+    @property
+    def _state(self):
+        return self.client.futures[self.key]
 
+    @property
+    def status(self):
+        """ One of 'pending', 'finished' or 'error' """
+        return self._state['status']
 
-with open('log.client', 'w') as f:  # delete file
-    pass
+    def done(self):
+        """ Is the computation complete """
+        return self._state['event'].is_set()
 
-def log(*args):
-    with open('log.client', 'a') as f:
-        print(*args, file=f)
+    def wait(self, timeout=None):
+        """ Block until the computation completes, return whether it did """
+        return self._state['event'].wait(timeout)
 
+    def exception(self, timeout=None):
+        """ Exception raised by the computation, or None """
+        self.wait(timeout)
+        return self._state['exception']
+
+    def result(self, timeout=None):
+        """ Wait for computation to complete and gather its result """
+        if not self.wait(timeout):
+            raise ValueError("Timed out waiting on %s" % str(self.key))
+        if self.status == 'error':
+            raise self._state['exception']
+        return self.client.gather([self])[0]
+
+    def add_done_callback(self, fn):
+        """ Call ``fn(future)`` once the computation completes
+
+        The callback runs in the client's listening thread if the computation
+        has not yet completed, so it should be quick.
+        """
+        self.client._add_callback(self.key, lambda: fn(self))
+
+    def __del__(self):
+        self.client._dec_ref(self.key)
+
+    def __repr__(self):
+        return '<Future: status: %s, key: %s>' % (self.status, str(self.key))
+
+
+def as_completed(futures):
+    """ Iterate over futures in the order in which they complete
+
+    >>> futures = client.map(inc, range(10))  # doctest: +SKIP
+    >>> for future in as_completed(futures):  # doctest: +SKIP
+    ...     print(future.result())  # doctest: +SKIP
+    """
+    futures = list(futures)
+    queue = Queue()
+    for future in futures:
+        future.add_done_callback(queue.put)
+    for i in range(len(futures)):
+        yield queue.get()
 
 
 class Client(object):
-    def __init__(self, scheduler, address=None):
+    """ Connection to a dask.distributed Scheduler
+
+    Parameters
+    ----------
+
+    scheduler: string
+        Address of the scheduler's client router
+    address: string
+        Identity of this client, defaults to a random name
+    hostname: string
+        A hostname/IP of this client visible to the workers, used to receive
+        data directly from them.  Defaults to ``socket.gethostname()``
+
+    State
+    -----
+
+    socket: zmq.Socket (DEALER)
+        Socket to communicate with the scheduler
+    callbacks: dict
+        Maps jobids of outstanding requests to functions to call on reply
+    futures: dict
+        Maps keys of live futures to their status and completion event
+    dask: dict
+        Tasks of live futures, used to resubmit dependencies
+    to_workers: zmq.Socket (ROUTER)
+        Socket on which workers send us data directly, created on first use
+    dealers: dict
+        DEALER sockets to the workers we request data from
+    """
+    def __init__(self, scheduler, address=None, hostname=None):
         self.address_to_scheduler = scheduler
         if address == None:
             address = 'client-' + str(uuid.uuid1())
@@ -35,48 +158,432 @@ class Client(object):
         self.socket = context.socket(zmq.DEALER)
         self.socket.setsockopt(zmq.IDENTITY, self.address)
         self.socket.connect(self.address_to_scheduler)
+
+        self.lock = RLock()
+        self.status = 'run'
+        self.callbacks = dict()
+        self.futures = dict()
+        self.refcount = defaultdict(int)
+        self.dask = dict()
+        self.pool = ThreadPool(4)
+
+        self.hostname = hostname or socket.gethostname()
+        self.to_workers = None
+        self.dealers = dict()
+        self._direct_lock = Lock()
+        self._direct_inboxes = dict()
+
+        self._listen_thread = Thread(target=self.listen_to_scheduler)
+        self._listen_thread.daemon = True
+        self._listen_thread.start()
+
         self.register_client()
 
-    def get(self, dsk, keys, keep_results=False):
-        header = {'function': 'schedule',
-                  'jobid': next(jobids)}
-        payload = {'dask': dsk, 'keys': keys, 'keep_results': keep_results}
+    def get(self, dsk, keys, keep_results=False, priority=0, direct=False,
+            speculative=False):
+        """ Compute dask graph on the cluster
 
-        self.send_to_scheduler(header, payload)
-        header2, payload2 = self.recv_from_scheduler()
+        Graphs from many clients run concurrently on the same workers.  Graphs
+        with higher ``priority`` get free workers first.
+
+        With ``direct=True`` the results travel straight from the workers to
+        this client rather than through the scheduler.  This is faster for
+        large results.
+
+        With ``speculative=True`` tasks that run much longer than is typical
+        for their function are also sent to an idle worker and the first
+        result wins.  Only use this for graphs of pure functions.
+        """
+        header = {'function': 'schedule'}
+        payload = {'dask': dsk, 'keys': keys, 'priority': priority,
+                   'keep_results': keep_results or direct,
+                   'gather': not direct, 'speculative': speculative}
+
+        header2, payload2 = self.send_recv(header, payload)
 
         if header2['status'] != 'OK':
             raise payload2['result']
+        if not direct:
+            return payload2['result']
+
+        try:
+            data = dict(self.gather_from_workers(payload2['locations']))
+        finally:
+            if not keep_results and payload2['created']:
+                self.send_to_scheduler({'function': 'release-keys'},
+                                       {'keys': payload2['created']})
+        return core.get(data, keys)
+
+    def submit(self, func, *args, **kwargs):
+        """ Submit a function application to the cluster, return a Future
+
+        Parameters
+        ----------
+
+        func: callable
+        *args, **kwargs:
+            Arguments to ``func``.  These may include Futures.
+        pure: bool
+            Whether ``func`` always returns the same output for the same
+            input, defaults to True.  Identical pure calls share one key and
+            so are only computed once.
+        key: string
+            Name of the result, defaults to a name derived from the inputs
+
+        Example
+        -------
+
+        >>> x = client.submit(inc, 1)  # doctest: +SKIP
+        >>> y = client.submit(add, x, 10)  # doctest: +SKIP
+        >>> y.result()  # doctest: +SKIP
+        12
+        """
+        pure = kwargs.pop('pure', True)
+        key = kwargs.pop('key', None)
+        task = self._task(func, args, kwargs)
+        if key is None:
+            token = tokenize(task) if pure else str(uuid.uuid4())
+            key = '%s-%s' % (funcname(func), token)
+        return self._submit({key: task}, [key])[0]
+
+    def map(self, func, *seqs, **kwargs):
+        """ Map a function over sequences of arguments, return Futures
 
+        All tasks are sent to the scheduler in a single message.
+
+        >>> futures = client.map(inc, range(10))  # doctest: +SKIP
+        """
+        pure = kwargs.pop('pure', True)
+        dsk = dict()
+        keys = []
+        for args in zip(*seqs):
+            task = self._task(func, args, kwargs)
+            token = tokenize(task) if pure else str(uuid.uuid4())
+            key = '%s-%s' % (funcname(func), token)
+            dsk[key] = task
+            keys.append(key)
+        return self._submit(dsk, keys)
+
+    def _task(self, func, args, kwargs):
+        """ Build a task, replacing futures by their keys """
+        args = [self._unpack(arg) for arg in args]
+        if kwargs:
+            kwargs = dict((k, self._unpack(v)) for k, v in kwargs.items())
+            return (apply, func, args, (dict, [[k, v] for k, v in kwargs.items()]))
+        return (func,) + tuple(args)
+
+    def _unpack(self, arg):
+        if isinstance(arg, Future):
+            return arg.key
+        if isinstance(arg, (list, tuple)) and any(isinstance(a, Future)
+                                                  for a in arg):
+            return [self._unpack(a) for a in arg]
+        return arg
+
+    def _submit(self, dsk, keys):
+        """ Send tasks to scheduler, return one future per key
+
+        Tasks of futures that these tasks depend on are sent along so that
+        the scheduler can wait on them or recompute them as necessary.
+        """
+        with self.lock:
+            self.dask.update(dsk)
+            for key in keys:
+                if key not in self.futures:
+                    self.futures[key] = {'status': 'pending',
+                                         'event': Event(),
+                                         'exception': None,
+                                         'callbacks': []}
+        futures = [Future(key, self) for key in keys]
+
+        with self.lock:
+            dsk2 = dict(dsk)
+            known = merge(self.dask, dsk)
+            stack = list(dsk)
+            while stack:
+                for dep in get_dependencies(known, stack.pop()):
+                    if dep not in dsk2:
+                        dsk2[dep] = known[dep]
+                        stack.append(dep)
+
+        header = {'function': 'submit'}
+        payload = {'dask': dsk2, 'keys': keys}
+        self.send_to_scheduler(header, payload)
+        return futures
+
+    def _task_finished(self, header, payload):
+        """ Scheduler reports that a submitted key has completed
+
+        See also:
+            Scheduler._submit_from_client
+        """
+        key = payload['key']
+        with self.lock:
+            state = self.futures.get(key)
+            if state is None or state['event'].is_set():
+                return
+            if isinstance(payload['status'], Exception):
+                state['status'] = 'error'
+                state['exception'] = payload['status']
+            else:
+                state['status'] = 'finished'
+            state['event'].set()
+            callbacks, state['callbacks'] = state['callbacks'], []
+        for cb in callbacks:
+            cb()
+
+    def _add_callback(self, key, callback):
+        with self.lock:
+            state = self.futures[key]
+            if not state['event'].is_set():
+                state['callbacks'].append(callback)
+                return
+        callback()
+
+    def _inc_ref(self, key):
+        with self.lock:
+            self.refcount[key] += 1
+
+    def _dec_ref(self, key):
+        with self.lock:
+            self.refcount[key] -= 1
+            if self.refcount[key] > 0:
+                return
+            del self.refcount[key]
+            self.futures.pop(key, None)
+            self.dask.pop(key, None)
+        if self.status != 'closed':
+            self.send_to_scheduler({'function': 'release-keys'},
+                                   {'keys': [key]})
+
+    def gather(self, futures, block=True, direct=False):
+        """ Gather the results of futures from the cluster
+
+        Parameters
+        ----------
+
+        futures: list of Futures
+        block: bool
+            If False return immediately with an ``AsyncResult`` whose
+            ``get`` method returns the results.
+        direct: bool
+            Receive the data directly from the workers rather than through
+            the scheduler.  See ``iter_gather``.
+
+        Example
+        -------
+
+        >>> futures = client.map(inc, range(3))  # doctest: +SKIP
+        >>> client.gather(futures)  # doctest: +SKIP
+        [1, 2, 3]
+        """
+        futures = list(futures)
+        if not block:
+            return self.pool.apply_async(self.gather, args=(futures,),
+                                         kwds={'direct': direct})
+        if direct:
+            data = dict(self.iter_gather(futures))
+            return [data[future.key] for future in futures]
+
+        for future in futures:
+            future.wait()
+            if future.status == 'error':
+                raise future.exception()
+        header = {'function': 'gather'}
+        payload = {'keys': [future.key for future in futures]}
+        header2, payload2 = self.send_recv(header, payload)
+        if header2['status'] != 'OK':
+            raise payload2['result']
         return payload2['result']
 
+    def iter_gather(self, futures):
+        """ Stream results of futures directly from the workers
+
+        Yields ``(key, result)`` pairs in the order in which the data arrives.
+        The scheduler only tells us which workers hold the data, the data
+        itself comes straight from the workers, many keys in parallel.
+
+        >>> futures = client.map(load, filenames)  # doctest: +SKIP
+        >>> for key, df in client.iter_gather(futures):  # doctest: +SKIP
+        ...     process(df)  # doctest: +SKIP
+
+        See Also:
+            Client.gather_from_workers
+        """
+        futures = list(futures)
+        for future in futures:
+            future.wait()
+            if future.status == 'error':
+                raise future.exception()
+        header = {'function': 'who-has'}
+        payload = {'keys': [future.key for future in futures]}
+        header2, payload2 = self.send_recv(header, payload)
+        if header2['status'] != 'OK':
+            raise payload2['result']
+        for kv in self.gather_from_workers(payload2['locations']):
+            yield kv
+
+    def gather_from_workers(self, locations, timeout=20):
+        """ Collect data directly from the workers that hold it
+
+        Yields ``(key, value)`` pairs as the data arrives.
+
+        >>> locations = {'x': ['tcp://alice:5000', 'tcp://bob:5000'],
+        ...              'y': ['tcp://bob:5000']}
+        >>> dict(client.gather_from_workers(locations))  # doctest: +SKIP
+        {'x': 1, 'y': 2}
+
+        Protocol
+        --------
+
+        1.  Client sends a 'getitem' request {'key': ..., 'queue': ...} for
+            every key to a randomly chosen worker holding it, with our own
+            listening address in the header
+        2.  Workers reply with 'getitem-ack' {'key': ..., 'value': ...} as for
+            requests from their peers, see ``Worker.getitem_worker``
+        3.  If a worker no longer has a key we ask another holder
+
+        See Also:
+            Worker.collect
+        """
+        locations = dict((k, list(v)) for k, v in locations.items())
+        qkey = str(uuid.uuid1())
+        with self._direct_lock:
+            self._direct_socket()
+            self._direct_inboxes[qkey] = deque()
+            for key, workers in locations.items():
+                self._request_from_worker(key, workers, qkey)
+        try:
+            while locations:
+                header, payload = self._recv_from_workers(qkey, timeout,
+                                                          locations)
+                key = payload['key']
+                if key not in locations:
+                    continue
+                if header['status'] == 'OK':
+                    del locations[key]
+                    yield key, payload['value']
+                else:
+                    with self._direct_lock:
+                        locations[key].remove(header['address'])
+                        self._request_from_worker(key, locations[key], qkey)
+        finally:
+            with self._direct_lock:
+                self._direct_inboxes.pop(qkey, None)
+
+    def _recv_from_workers(self, qkey, timeout, locations):
+        """ Next message from the workers for the gather ``qkey``
+
+        Gathers share one socket.  Whichever gather holds the lock reads from
+        it and files messages for other gathers in their inboxes, so the lock
+        is never held while a gather yields to its caller.
+        """
+        deadline = time() + timeout
+        while True:
+            with self._direct_lock:
+                inbox = self._direct_inboxes[qkey]
+                if inbox:
+                    return inbox.popleft()
+                if self.to_workers.poll(10):
+                    address, header, payload = self.to_workers.recv_multipart()
+                    header = loads_header(header)
+                    payload = header.get('loads', pickle.loads)(payload)
+                    other = self._direct_inboxes.get(payload.get('queue'))
+                    if other is not None:
+                        other.append((header, payload))
+                    continue
+            if time() > deadline:
+                raise ValueError("Waited %d seconds for data of %s from "
+                                 "workers" % (timeout, list(locations)))
+
+    def _direct_socket(self):
+        """ ROUTER socket on which workers send us data """
+        if self.to_workers is None:
+            self.to_workers = context.socket(zmq.ROUTER)
+            if self.address_to_scheduler.startswith(
+                    b'ipc://' if isinstance(self.address_to_scheduler, bytes)
+                    else 'ipc://'):
+                self.direct_address = ipc_address('client').encode()
+                self.to_workers.bind(self.direct_address)
+            else:
+                port = self.to_workers.bind_to_random_port('tcp://*')
+                self.direct_address = ('tcp://%s:%d' % (self.hostname,
+                                                         port)).encode()
+        return self.to_workers
+
+    def _request_from_worker(self, key, workers, qkey):
+        if not workers:
+            raise KeyError("%s is held by no worker" % str(key))
+        worker = random.choice(workers)
+        if worker not in self.dealers:
+            sock = context.socket(zmq.DEALER)
+            sock.connect(worker)
+            self.dealers[worker] = sock
+        header = {'function': 'getitem', 'jobid': key,
+                  'address': self.direct_address,
+                  'timestamp': time()}
+        payload = {'function': 'getitem', 'key': key, 'queue': qkey}
+        self.dealers[worker].send_multipart([dumps_header(header),
+                                             pickle.dumps(payload)])
+
     def scheduler_status(self):
         header = {'function': 'status'}
         payload = {}
-        self.send_to_scheduler(header, payload)
-
-        header2, payload2 = self.recv_from_scheduler()
+        header2, payload2 = self.send_recv(header, payload)
         return payload2
 
     def send_to_scheduler(self, header, payload):
-        log(self.address, 'Send to scheduler', header)
+        logger.debug('%s: Send to scheduler: %s', self.address, header)
         if 'address' not in header:
             header['address'] = self.address
-        header['timestamp'] = datetime.utcnow()
+        header['timestamp'] = time()
         header['loads'] = dill.loads
-        self.socket.send_multipart([pickle.dumps(header), dill.dumps(payload)])
+        with self.lock:
+            self.socket.send_multipart([dumps_header(header),
+                                        dill.dumps(payload)])
 
     def recv_from_scheduler(self):
-        header, payload = self.socket.recv_multipart()
-        header = pickle.loads(header)
+        with self.lock:
+            header, payload = self.socket.recv_multipart()
+        header = loads_header(header)
         loads = header.get('loads', pickle.loads)
         payload = loads(payload)
-        log(self.address, 'Received from scheduler', header)
+        logger.debug('%s: Received from scheduler: %s', self.address, header)
         return header, payload
 
+    def listen_to_scheduler(self):
+        """ Event loop: Listen to scheduler, route replies
+
+        Replies to requests are matched to the waiting caller by their jobid.
+        Notifications about finished tasks resolve futures.
+        """
+        while self.status != 'closed':
+            try:
+                if not self.socket.poll(100):
+                    continue
+            except zmq.ZMQError:
+                break
+            header, payload = self.recv_from_scheduler()
+            if header.get('function') == 'task-finished':
+                self._task_finished(header, payload)
+                continue
+            with self.lock:
+                callback = self.callbacks.pop(header.get('jobid'), None)
+            if callback is not None:
+                callback((header, payload))
+            else:
+                logger.warning('%s: Unexpected message: %s', self.address,
+                               header)
+
     def send_recv(self, header, payload):
+        """ Send request to scheduler and block on the reply """
+        jobid = 'client-job-%d' % next(jobids)
+        header['jobid'] = jobid
+        queue = Queue()
+        with self.lock:
+            self.callbacks[jobid] = queue.put
         self.send_to_scheduler(header, payload)
-        return self.recv_from_scheduler()
+        return queue.get()
 
     def set_collection(self, name, collection):
         """ Store collection in scheduler
@@ -119,6 +626,46 @@ class Client(object):
 
         return payload2['type'](*payload2['args'])
 
+    def persist(self, collection, name):
+        """ Compute collection, keep its partitions on the workers and share it
+
+        Like ``set_collection``, but the partitions are computed once and stay
+        in memory on the workers.  The returned collection, like the one
+        from ``get_collection``, points to these partitions rather than to
+        the graph that produced them, so computations on it from this or any
+        other client start from the data in memory.
+
+        >>> b = db.from_sequence(...).map(...).filter(...)  # doctest: +SKIP
+        >>> b = client.persist(b, 'mybag')  # doctest: +SKIP
+        >>> b.sum().compute(get=client.get)  # doctest: +SKIP
+
+        >>> b2 = client2.get_collection('mybag')  # doctest: +SKIP
+
+        Use ``delete_collection`` to release the partitions.
+        """
+        keys = list(flatten(collection._keys()))
+        dsk = dict((k, (persisted, (k,))) for k in keys)
+        args = (dsk,) + tuple(collection._args[1:])
+        header = {'function': 'persist-collection'}
+        payload = {'type': type(collection),
+                   'args': args,
+                   'keys': keys,
+                   'dask': cull(collection.dask, keys),
+                   'name': name}
+
+        header2, payload2 = self.send_recv(header, payload)
+        if header2['status'] != 'OK':
+            raise payload2['result']
+
+        return type(collection)(*args)
+
+    def delete_collection(self, name):
+        """ Remove shared collection from scheduler, release its partitions """
+        header = {'function': 'delete-collection'}
+        payload = {'name': name}
+        header2, payload2 = self.send_recv(header, payload)
+        assert header2['status'] == 'OK'
+
     def close_scheduler(self):
         header = {'function': 'close'}
         self.send_to_scheduler(header, {})
@@ -126,7 +673,15 @@ class Client(object):
     def close(self, close_scheduler=False):
         if close_scheduler:
             self.close_scheduler()
+        self.status = 'closed'
+        self._listen_thread.join()
+        self.pool.close()
         self.socket.close(1)
+        with self._direct_lock:
+            for sock in self.dealers.values():
+                sock.close(1)
+            if self.to_workers is not None:
+                self.to_workers.close(1)
 
     def register_client(self):
         header = {'function': 'register'}
@@ -135,6 +690,5 @@ class Client(object):
         self.registered_workers = payload2['workers']
 
     def get_registered_workers(self):
-        self.send_to_scheduler({'function': 'get_workers'}, {})
-        header, payload = self.recv_from_scheduler()
+        header, payload = self.send_recv({'function': 'get_workers'}, {})
         return payload['workers']
@@ -0,0 +1,118 @@
+from __future__ import print_function
+
+from multiprocessing import Process
+from time import sleep, time
+
+from .scheduler import Scheduler
+from .worker import Worker
+from .client import Client
+
+
+def _run_worker(scheduler, kwargs):
+    """ Run a blocking worker, target of worker processes """
+    Worker(scheduler, block=True, **kwargs)
+
+
+class LocalCluster(object):
+    """ A scheduler and several workers on this machine
+
+    Useful for testing and for benchmarking the distributed scheduler without
+    setting up a real cluster.
+
+    Parameters
+    ----------
+
+    nworkers: int
+        Number of workers to start
+    processes: bool
+        Run workers in separate processes (True) or in threads of this
+        process (False, default)
+    transport: string
+        'tcp' to communicate over ``tcp://127.0.0.1`` (default) or 'ipc' to
+        use local inter-process sockets
+    timeout: int
+        Seconds to wait for the workers to register with the scheduler
+    worker_kwargs: dict
+        Further keyword arguments for each Worker
+
+    Example
+    -------
+
+    >>> from dask.distributed import LocalCluster
+    >>> with LocalCluster(nworkers=4) as cluster:  # doctest: +SKIP
+    ...     client = cluster.client()
+    ...     client.get({'x': (inc, 1)}, 'x')
+    2
+
+    State
+    -----
+
+    scheduler: Scheduler
+    workers: list
+        Worker objects, or worker processes if ``processes=True``
+    """
+    def __init__(self, nworkers=4, processes=False, transport='tcp',
+                 timeout=20, worker_kwargs=None):
+        worker_kwargs = dict(worker_kwargs or {})
+        worker_kwargs.setdefault('transport', transport)
+        if transport == 'tcp':
+            worker_kwargs.setdefault('hostname', '127.0.0.1')
+            worker_kwargs.setdefault('bind_to_workers', '127.0.0.1')
+
+        self.processes = processes
+        self.scheduler = Scheduler(hostname='127.0.0.1',
+                                   bind_to_workers='127.0.0.1',
+                                   bind_to_clients='127.0.0.1',
+                                   transport=transport)
+        address = self.scheduler.address_to_workers
+        if processes:
+            self.workers = [Process(target=_run_worker,
+                                    args=(address, worker_kwargs))
+                            for i in range(nworkers)]
+            for p in self.workers:
+                p.daemon = True
+                p.start()
+        else:
+            self.workers = [Worker(address, **worker_kwargs)
+                            for i in range(nworkers)]
+
+        start = time()
+        while len(self.scheduler.workers) < nworkers:
+            if time() - start > timeout:
+                self.close()
+                raise ValueError("Only %d of %d workers registered after %d "
+                                 "seconds" % (len(self.scheduler.workers),
+                                              nworkers, timeout))
+            sleep(0.01)
+
+    @property
+    def address_to_clients(self):
+        return self.scheduler.address_to_clients
+
+    def client(self):
+        """ A new Client connected to this cluster's scheduler """
+        return Client(self.address_to_clients)
+
+    def close(self):
+        """ Close scheduler and workers """
+        if self.scheduler.status == 'closed':
+            return
+        self.scheduler.close()  # also closes all registered workers
+        if self.processes:
+            for p in self.workers:
+                p.join(timeout=5)
+                if p.is_alive():
+                    p.terminate()
+        else:
+            for w in self.workers:
+                w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return '<LocalCluster: scheduler=%s, workers=%d>' % (
+                self.address_to_clients.decode(), len(self.workers))
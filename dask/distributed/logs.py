@@ -0,0 +1,99 @@
+""" Logging for dask.distributed
+
+The scheduler, workers and clients log to the standard ``logging`` loggers
+``dask.distributed.scheduler``, ``dask.distributed.worker`` and
+``dask.distributed.client``.  Messages are formatted lazily, so debug messages
+cost little more than a level check unless debug logging is turned on.
+
+By default only warnings and errors are shown.  Turn on debug tracing to a
+file, written from a background thread, as follows:
+
+>>> from dask.distributed.logs import log_to_file
+>>> handler = log_to_file('dask-distributed.log')  # doctest: +SKIP
+>>> ...  # doctest: +SKIP
+>>> handler.close()  # doctest: +SKIP
+"""
+from __future__ import print_function
+
+import logging
+from threading import Thread
+
+from ..compatibility import Queue
+
+
+class BackgroundHandler(logging.Handler):
+    """ Logging handler that writes records from a background thread
+
+    Records are merged with their arguments in the logging thread, so that
+    later mutation of those arguments does not affect the message, and then
+    handed to a thread that passes them on to ``handler``.  Slow file I/O
+    therefore stays off the scheduler's and workers' critical paths.
+
+    Parameters
+    ----------
+
+    handler: logging.Handler
+        Handler that does the actual writing, e.g. a ``FileHandler``
+    """
+    def __init__(self, handler):
+        logging.Handler.__init__(self)
+        self.handler = handler
+        self.queue = Queue()
+        self._thread = Thread(target=self._write)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, record):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(
+                        record.exc_info)
+                record.exc_info = None
+            self.queue.put(record)
+        except Exception:
+            self.handleError(record)
+
+    def _write(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    break
+                self.handler.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """ Block until all queued records are written """
+        if self._thread.is_alive():
+            self.queue.join()
+        self.handler.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+        self.handler.close()
+        logging.Handler.close(self)
+
+
+def log_to_file(filename, level=logging.DEBUG, name='dask.distributed',
+                fmt='%(asctime)s %(name)s %(levelname)s %(message)s'):
+    """ Write dask.distributed logs at ``level`` and above to a file
+
+    Writing happens in a background thread.  Returns the installed handler;
+    remove it from the logger and close it to stop logging.
+
+    >>> handler = log_to_file('dask-distributed.log')  # doctest: +SKIP
+    >>> logging.getLogger('dask.distributed').removeHandler(handler)  # doctest: +SKIP
+    >>> handler.close()  # doctest: +SKIP
+    """
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(fmt))
+    handler = BackgroundHandler(file_handler)
+    logger = logging.getLogger(name)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
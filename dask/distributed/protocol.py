@@ -0,0 +1,152 @@
+""" Compact encoding of message headers
+
+Every message between schedulers, workers and clients has a *header*, a small
+dict that says what to do with the message, and a *payload* holding the
+arguments (see the "Protocol" section of the distributed docs).  Headers of
+control messages like ``'finished-task'`` or ``'heartbeat'`` are sent many
+thousands of times per second, so we encode them with ``struct`` rather than
+pickle.  This is smaller and faster to read and write.  Payloads are still
+serialized with pickle or dill as the header says.
+
+A header frame starts with two magic bytes and a version number::
+
+    magic    b'\\xdaK'
+    version  1 byte, currently 1
+    flags    1 byte, bit 0 set if the payload is serialized with dill
+    function 1 byte, index into FUNCTIONS
+    status   1 byte, index into STATUSES
+    time     8 byte float, seconds since the epoch
+    address  2 byte length, then the bytes of the address
+    jobid    1 byte type tag, then the jobid
+
+Headers with other contents, e.g. new function names, are pickled instead.
+Readers accept both, so peers that send pickled headers keep working.  The
+tables of names belong to the version.  Changing them means a new version.
+
+>>> header = {'function': 'heartbeat', 'address': b'tcp://alice:5000',
+...           'jobid': None, 'timestamp': 1443000000.0}
+>>> frame = dumps_header(header)
+>>> len(frame)
+33
+>>> loads_header(frame) == header
+True
+"""
+from __future__ import print_function, division
+
+import struct
+
+import dill
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from ..compatibility import unicode
+
+MAGIC = b'\xdaK'
+VERSION = 1
+
+FUNCTIONS = (None, 'status', 'compute', 'finished-task', 'heartbeat',
+             'getitem', 'getitem-ack', 'setitem', 'setitem-ack', 'delitem',
+             'worker-death', 'close', 'register', 'schedule', 'schedule-ack',
+             'submit', 'task-finished', 'gather', 'who-has', 'release-keys',
+             'set-collection', 'get-collection', 'persist-collection',
+             'delete-collection', 'get_workers')
+STATUSES = (None, 'OK', 'Error', 'Bad key')
+
+_function_codes = dict((f, i) for i, f in enumerate(FUNCTIONS))
+_status_codes = dict((s, i) for i, s in enumerate(STATUSES))
+
+_fixed = struct.Struct('!2sBBBBdH')
+_int = struct.Struct('!q')
+_FIELDS = frozenset(['function', 'status', 'timestamp', 'address', 'jobid'])
+
+DILL = 1  # flag
+
+NONE, INT, TEXT, BYTES, PICKLE = range(5)  # type tags of the jobid
+
+
+def dumps_header(header):
+    """ Serialize a message header to bytes
+
+    Compact if possible, see the module docstring, pickled otherwise.
+    """
+    try:
+        function = _function_codes[header.get('function')]
+        status = _status_codes[header.get('status')]
+    except (KeyError, TypeError):
+        return pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+    flags = 0
+    if 'dumps' in header or 'loads' in header:
+        if (header.get('dumps', dill.dumps) is not dill.dumps or
+                header.get('loads', dill.loads) is not dill.loads):
+            return pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+        flags |= DILL
+    for k in header:
+        if k not in _FIELDS and k != 'dumps' and k != 'loads':
+            return pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+
+    address = header.get('address') or b''
+    if isinstance(address, unicode):
+        address = address.encode()
+    timestamp = header.get('timestamp') or 0.0
+    if not isinstance(timestamp, float):
+        return pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+
+    jobid = header.get('jobid')
+    if jobid is None:
+        tail = b'\x00'
+    elif type(jobid) is int and -2**63 <= jobid < 2**63:
+        tail = b'\x01' + _int.pack(jobid)
+    elif type(jobid) is unicode:
+        tail = b'\x02' + jobid.encode('utf-8')
+    elif type(jobid) is bytes:
+        tail = b'\x03' + jobid
+    else:
+        tail = b'\x04' + pickle.dumps(jobid, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return b''.join([_fixed.pack(MAGIC, VERSION, flags, function, status,
+                                 timestamp, len(address)), address, tail])
+
+
+def loads_header(frame):
+    """ Deserialize a message header, compact or pickled
+
+    >>> header = {'function': 'status', 'jobid': 1}
+    >>> loads_header(dumps_header(header)) == header
+    True
+    """
+    if frame[:2] != MAGIC:
+        return pickle.loads(frame)
+    (_, version, flags, function, status, timestamp,
+     n) = _fixed.unpack_from(frame)
+    if version != VERSION:
+        raise ValueError("Unsupported header version %d, expected %d"
+                         % (version, VERSION))
+    header = {}
+    if function:
+        header['function'] = FUNCTIONS[function]
+    if status:
+        header['status'] = STATUSES[status]
+    if timestamp:
+        header['timestamp'] = timestamp
+    start = _fixed.size
+    if n:
+        header['address'] = frame[start:start + n]
+    start += n
+    tag = ord(frame[start:start + 1])
+    if tag == INT:
+        header['jobid'] = _int.unpack_from(frame, start + 1)[0]
+    elif tag == TEXT:
+        header['jobid'] = frame[start + 1:].decode('utf-8')
+    elif tag == BYTES:
+        header['jobid'] = frame[start + 1:]
+    elif tag == PICKLE:
+        header['jobid'] = pickle.loads(frame[start + 1:])
+    else:
+        header['jobid'] = None
+    if flags & DILL:
+        header['dumps'] = dill.dumps
+        header['loads'] = dill.loads
+    return header
@@ -3,18 +3,19 @@ from __future__ import print_function
 import socket
 import uuid
 import itertools
-import traceback
-import sys
+import logging
 import random
 from functools import partial
 from collections import defaultdict
 from multiprocessing.pool import ThreadPool
 from datetime import datetime
-from threading import Thread, Lock, Event
+from time import time, sleep
+from threading import Thread, Lock, RLock, Event
 from contextlib import contextmanager
 
 import dill
 import zmq
+from toolz import unique
 
 from ..compatibility import Queue, unicode, Empty
 try:
@@ -22,19 +23,19 @@ try:
 except ImportError:
     import pickle
 
-from ..core import get_dependencies, flatten
-from ..optimize import cull
+from ..core import get_dependencies, flatten, istask
+from ..optimize import cull, fuse
+from .utils import ipc_address, funcname
+from .protocol import dumps_header, loads_header
 from .. import core
 from ..async import (sortkey, finish_task,
         start_state_from_dask as dag_state_from_dask)
 
-with open('log.scheduler', 'w') as f:  # delete file
-    pass
+logger = logging.getLogger(__name__)
 
-
-def log(*args):
-    with open('log.scheduler', 'a') as f:
-        print('\n', *args, file=f)
+ALPHA = 0.2  # weight of new observations in running averages of durations
+SPECULATION_FACTOR = 4
+SPECULATION_INTERVAL = 0.05
 
 
 @contextmanager
@@ -42,12 +43,47 @@ def logerrors():
     try:
         yield
     except Exception as e:
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        tb = ''.join(traceback.format_tb(exc_traceback))
-        log('Error!', str(e))
-        log('Traceback', str(tb))
+        logger.error("Error: %s", e, exc_info=True)
         raise
 
+
+def persisted(ref):
+    """ Placeholder task for a partition of a persisted collection
+
+    Collections returned by ``Client.persist`` consist of tasks
+    ``(persisted, (key,))``.  The key is wrapped in a tuple so that it does not
+    read as a dependency.  Graph optimizations may inline these tasks into
+    others.  The scheduler turns them back into references to the data held
+    on the workers, see ``Scheduler._resolve_persisted``.  Running one means
+    the data is gone.
+    """
+    raise ValueError("Partition %s of a persisted collection is not available."
+                     " Compute it with the dask.distributed client that "
+                     "persisted it" % str(ref[0]))
+
+
+def _subs_persisted(task, found):
+    """ Replace ``(persisted, (key,))`` subtasks by ``key``, collect keys """
+    if istask(task):
+        if task[0] is persisted:
+            found.add(task[1][0])
+            return task[1][0]
+        return (task[0],) + tuple(_subs_persisted(t, found) for t in task[1:])
+    if isinstance(task, list):
+        return [_subs_persisted(t, found) for t in task]
+    return task
+
+
+def task_name(task):
+    """ Name of the function of a task, used to learn durations
+
+    >>> from operator import add
+    >>> task_name((add, 1, 2))
+    'add'
+    """
+    return funcname(task[0]) if istask(task) else None
+
+
 class Scheduler(object):
     """ Disitributed scheduler for dask computations
 
@@ -66,6 +102,17 @@ class Scheduler(object):
         Addresses from which we accept client connections, defaults to *
     block: bool
         Whether or not to block the process on creation
+    transport: string
+        'tcp' (default) or 'ipc' to listen on local inter-process sockets.
+        Ports, hostname and bind addresses are ignored for 'ipc'
+    max_replicas: int
+        Keep at most this many copies of each piece of data, defaults to 3
+    cull_interval: float
+        Seconds between culls of redundant copies of data, defaults to 1
+    prefetch: int
+        Number of tasks to send to each worker beyond its cores, defaults
+        to 1.  Workers fetch the data for these tasks from their peers while
+        they compute, so that communication and computation overlap
 
     State
     -----
@@ -76,6 +123,8 @@ class Scheduler(object):
         Maps data keys to sets of workers that own that data
     worker_has - dict
         Maps workers to data that they own
+    replicated - set
+        Keys held by more than one worker, candidates for culling
     data - dict
         Maps data keys to metadata about the computation that produced it
     to_workers - zmq.Socket (ROUTER)
@@ -84,29 +133,69 @@ class Scheduler(object):
         Socket to communicate with users
     collections - dict
         Dict holding shared collections like bags and arrays
+    jobs - dict
+        Maps the queue key of each running graph to its dispatch state
+    in_flight - dict
+        Maps keys currently running on some worker to the queue key of the
+        graph that triggered them
+    key_waiters - dict
+        Maps in-flight keys to queue keys of other graphs waiting on them
+    key_holders - dict
+        Maps keys to queue keys of the running graphs that still need them
+    kept_keys - set
+        Keys kept on the workers on request, e.g. the results of futures.
+        These are only removed by an explicit ``release_key``
+    durations - dict
+        Maps function names to their typical duration in seconds, learned
+        from finished tasks
+    slowness - dict
+        Maps workers to how much longer than typical their tasks take
+    occupancy - dict
+        Maps workers to the estimated seconds of work currently sent to them
+    processing - dict
+        Maps running keys to their worker, estimated duration and start time
+    speculated - dict
+        Maps running keys that we also sent to a second worker to that worker
+        and its estimated duration, see ``Scheduler._speculate``
+    late_copies - dict
+        Maps speculated keys that have finished once to the worker still
+        running the other copy
+    persisted - dict
+        Maps names of persisted collections to the keys of their partitions.
+        These stay on the workers, with all of their replicas, until the
+        collection is replaced or deleted
     """
     def __init__(self, port_to_workers=None, port_to_clients=None,
                  bind_to_workers='*', bind_to_clients='*',
-                 hostname=None, block=False, worker_timeout=20):
+                 hostname=None, block=False, worker_timeout=20,
+                 transport='tcp', max_replicas=3, cull_interval=1, prefetch=1):
         self.context = zmq.Context()
         hostname = hostname or socket.gethostname()
 
         # Bind routers to addresses (and create addresses if necessary)
         self.to_workers = self.context.socket(zmq.ROUTER)
-        if port_to_workers is None:
+        if transport == 'ipc':
+            self.address_to_workers = ipc_address('scheduler-workers').encode()
+            self.to_workers.bind(self.address_to_workers)
+        elif port_to_workers is None:
             port_to_workers = self.to_workers.bind_to_random_port('tcp://' + bind_to_workers)
         else:
             self.to_workers.bind('tcp://%s:%d' % (bind_to_workers, port_to_workers))
-        self.address_to_workers = ('tcp://%s:%d' % (hostname, port_to_workers)).encode()
+        if transport != 'ipc':
+            self.address_to_workers = ('tcp://%s:%d' % (hostname, port_to_workers)).encode()
         self.worker_poller = zmq.Poller()
         self.worker_poller.register(self.to_workers, zmq.POLLIN)
 
         self.to_clients = self.context.socket(zmq.ROUTER)
-        if port_to_clients is None:
-            port_to_clients = self.to_clients.bind_to_random_port('tcp://' + bind_to_clients)
+        if transport == 'ipc':
+            self.address_to_clients = ipc_address('scheduler-clients').encode()
+            self.to_clients.bind(self.address_to_clients)
         else:
-            self.to_clients.bind('tcp://%s:%d' % (bind_to_clients, port_to_clients))
-        self.address_to_clients = ('tcp://%s:%d' % (hostname, port_to_clients)).encode()
+            if port_to_clients is None:
+                port_to_clients = self.to_clients.bind_to_random_port('tcp://' + bind_to_clients)
+            else:
+                self.to_clients.bind('tcp://%s:%d' % (bind_to_clients, port_to_clients))
+            self.address_to_clients = ('tcp://%s:%d' % (hostname, port_to_clients)).encode()
 
         # Client state
         self.clients = dict()
@@ -115,9 +204,11 @@ class Scheduler(object):
         self.workers = dict()
         self.who_has = defaultdict(set)
         self.worker_has = defaultdict(set)
+        self.replicated = set()
         self.available_workers = Queue()
         self.data = defaultdict(dict)
         self.collections = dict()
+        self.prefetch = prefetch
 
         self.send_to_workers_queue = Queue()
         self.send_to_workers_recv = self.context.socket(zmq.PAIR)
@@ -131,7 +222,23 @@ class Scheduler(object):
         self.status = 'run'
         self.queues = dict()
 
-        self._schedule_lock = Lock()
+        # State shared between concurrently running graphs
+        self._state_lock = RLock()
+        self.jobs = dict()
+        self.in_flight = dict()
+        self.key_waiters = defaultdict(set)
+        self.key_holders = defaultdict(set)
+        self.pending_release = set()
+        self.kept_keys = set()
+        self.durations = dict()
+        self.slowness = defaultdict(lambda: 1.0)
+        self.occupancy = defaultdict(float)
+        self.processing = dict()
+        self.speculated = dict()
+        self.late_copies = dict()
+        self.persisted = dict()
+        self.persisted_keys = set()
+        self.broadcast_keys = set()
 
         # RPC functions that workers and clients can trigger
         self.worker_functions = {'heartbeat': self._heartbeat,
@@ -143,12 +250,18 @@ class Scheduler(object):
                                  'get_workers': self._get_workers,
                                  'register': self._client_registration,
                                  'schedule': self._schedule_from_client,
+                                 'submit': self._submit_from_client,
+                                 'gather': self._gather_from_client,
+                                 'who-has': self._who_has_from_client,
+                                 'release-keys': self._release_from_client,
                                  'set-collection': self._set_collection,
                                  'get-collection': self._get_collection,
+                                 'persist-collection': self._persist_collection,
+                                 'delete-collection': self._delete_collection,
                                  'close': self._close}
 
         # Away we go!
-        log(self.address_to_workers, 'Start')
+        logger.info('%s: Start', self.address_to_workers)
         self._listen_to_workers_thread = Thread(target=self._listen_to_workers)
         self._listen_to_workers_thread.start()
         self._listen_to_clients_thread = Thread(target=self._listen_to_clients)
@@ -157,6 +270,12 @@ class Scheduler(object):
         self._monitor_workers_thread = Thread(target=self._monitor_workers,
                                               kwargs={'timeout': worker_timeout})
         self._monitor_workers_thread.start()
+        self._cull_event = Event()
+        self._cull_thread = Thread(target=self._cull_periodically,
+                                   kwargs={'interval': cull_interval,
+                                           'k': max_replicas})
+        self._cull_thread.daemon = True
+        self._cull_thread.start()
 
         if block:
             self.block()
@@ -182,15 +301,15 @@ class Scheduler(object):
             if self.to_workers in socks:
                 address, header, payload = self.to_workers.recv_multipart()
 
-                header = pickle.loads(header)
+                header = loads_header(header)
                 if 'address' not in header:
                     header['address'] = address
-                log(self.address_to_workers, 'Receive job from worker', header)
+                logger.debug('%s: Receive job from worker: %s', self.address_to_workers, header)
 
                 try:
                     function = self.worker_functions[header['function']]
                 except KeyError:
-                    log(self.address_to_workers, 'Unknown function', header)
+                    logger.warning('%s: Unknown function: %s', self.address_to_workers, header)
                 else:
                     future = self.pool.apply_async(function, args=(header, payload))
 
@@ -204,15 +323,15 @@ class Scheduler(object):
                 break
             with self.lock:
                 address, header, payload = self.to_clients.recv_multipart()
-            header = pickle.loads(header)
+            header = loads_header(header)
             if 'address' not in header:
                 header['address'] = address
-            log(self.address_to_clients, 'Receive job from client', header)
+            logger.debug('%s: Receive job from client: %s', self.address_to_clients, header)
 
             try:
                 function = self.client_functions[header['function']]
             except KeyError:
-                log(self.address_to_clients, 'Unknown function', header)
+                logger.warning('%s: Unknown function: %s', self.address_to_clients, header)
             else:
                 self.pool.apply_async(function, args=(header, payload))
 
@@ -223,6 +342,15 @@ class Scheduler(object):
             self.prune_and_notify(timeout=timeout)
             self._monitor_workers_event.clear()
 
+    def _cull_periodically(self, interval=1, k=3):
+        """ Event loop: Remove redundant copies of data """
+        while self.status != 'closed':
+            self._cull_event.wait(interval)
+            if self.status == 'closed':
+                break
+            with self._state_lock:
+                self.cull_redundant_data(k)
+
     def block(self):
         """ Block until listener threads close
 
@@ -238,7 +366,7 @@ class Scheduler(object):
         payload = pickle.loads(payload)
         address = header['address']
         self.clients[address] = payload
-        out_header = {}
+        out_header = {'jobid': header.get('jobid')}
         out_payload = {'workers': self.workers}
         self.send_to_client(header['address'], out_header, out_payload)
 
@@ -257,60 +385,96 @@ class Scheduler(object):
             duration = payload['duration']
             dependencies = payload['dependencies']
 
-            log(self.address_to_workers, 'Finish task', payload)
-
-            for dep in dependencies:
-                self.who_has[dep].add(address)
-                self.worker_has[address].add(dep)
-            self.available_workers.put(address)
-
-            if isinstance(payload['status'], Exception):
-                self.queues[payload['queue']].put(payload)
-            else:
-                self.data[key]['duration'] = duration
-                self.who_has[key].add(address)
-                self.worker_has[address].add(key)
+            logger.debug('%s: Finish task: %s', self.address_to_workers, key)
+
+            with self._state_lock:
+                for dep in dependencies:
+                    self._add_replica(dep, address)
+                if address in self.workers:
+                    self.workers[address].update(payload.get('occupancy', {}))
+
+                # The slower of two copies of a speculated task, see _speculate
+                late = self.late_copies.get(key) == address
+                if late:
+                    del self.late_copies[key]
+                if self.speculated.get(key, (None,))[0] == address:
+                    _, _, estimate = self.speculated.pop(key)
+                    self.occupancy[address] = max(0, self.occupancy[address]
+                                                     - estimate)
+                    if not late and key in self.processing:
+                        self.late_copies[key] = self.processing[key][0]
+                else:
+                    if not late and key in self.speculated:
+                        self.late_copies[key] = self.speculated[key][0]
+                    self._record_duration(key, address, duration,
+                                          payload['status'])
+                self.available_workers.put(address)
 
-                self.queues[payload['queue']].put(payload)
+                if late:
+                    drop = (not isinstance(payload['status'], Exception) and
+                            address not in self.who_has.get(key, ()))
+                else:
+                    if not isinstance(payload['status'], Exception):
+                        self.data[key]['duration'] = duration
+                        self._add_replica(key, address)
+                    self.in_flight.pop(key, None)
+                    waiters = self.key_waiters.pop(key, set())
+
+            if late:
+                logger.debug('%s: Drop late copy of %s',
+                             self.address_to_workers, key)
+                if drop:
+                    self._delete_from_workers({address: [key]})
+                self._dispatch()
+                return
+
+            for qkey in set([payload['queue']]) | waiters:
+                queue = self.queues.get(qkey)
+                if queue is not None:
+                    queue.put(payload)
+
+            self._dispatch()
 
     def _status_to_client(self, header, payload):
         with logerrors():
             out_header = {'jobid': header.get('jobid')}
-            log(self.address_to_clients, 'Status')
+            logger.debug('%s: Status', self.address_to_clients)
             self.send_to_client(header['address'], out_header, 'OK')
 
     def _status_to_worker(self, header, payload):
         out_header = {'jobid': header.get('jobid')}
-        log(self.address_to_workers, 'Status sending')
+        logger.debug('%s: Status sending', self.address_to_workers)
         self.send_to_worker(header['address'], out_header, 'OK')
 
     def send_to_worker(self, address, header, payload):
         """ Send packet to worker """
-        log(self.address_to_workers, 'Send to worker', address, header)
+        logger.debug('%s: Send to worker %s: %s', self.address_to_workers,
+                     address, header)
         header['address'] = self.address_to_workers
         loads = header.get('loads', pickle.loads)
         dumps = header.get('dumps', pickle.dumps)
         if isinstance(address, unicode):
             address = address.encode()
-        header['timestamp'] = datetime.utcnow()
+        header['timestamp'] = time()
 
         self.send_to_workers_queue.put([address,
-                                        pickle.dumps(header),
+                                        dumps_header(header),
                                         dumps(payload)])
         self.send_to_workers_send.send(b'')
 
     def send_to_client(self, address, header, result):
         """ Send packet to client """
-        log(self.address_to_clients, 'Send to client', address, header)
+        logger.debug('%s: Send to client %s: %s', self.address_to_clients,
+                     address, header)
         header['address'] = self.address_to_clients
         loads = header.get('loads', pickle.loads)
         dumps = header.get('dumps', pickle.dumps)
         if isinstance(address, unicode):
             address = address.encode()
-        header['timestamp'] = datetime.utcnow()
+        header['timestamp'] = time()
         with self.lock:
             self.to_clients.send_multipart([address,
-                                            pickle.dumps(header),
+                                            dumps_header(header),
                                             dumps(result)])
 
     def trigger_task(self, key, task, deps, queue):
@@ -320,15 +484,118 @@ class Scheduler(object):
             Scheduler.schedule
             Scheduler.worker_finished_task
         """
-        worker = self.available_workers.get()
-        locations = dict((dep, self.who_has[dep]) for dep in deps)
+        worker = self._choose_worker(task, deps)
+
+        with self._state_lock:
+            estimate = self.estimate_duration(task, worker)
+            self.processing[key] = (worker, task_name(task), estimate, time())
+            self.occupancy[worker] += estimate
 
+        self._send_task(worker, key, task, deps, queue)
+
+    def _send_task(self, worker, key, task, deps, queue):
+        """ Send a 'compute' message for task to worker """
+        locations = dict((dep, set(self.who_has.get(dep, ()))) for dep in deps)
         header = {'function': 'compute', 'jobid': key,
                   'dumps': dill.dumps, 'loads': dill.loads}
         payload = {'key': key, 'task': task, 'locations': locations,
                    'queue': queue}
         self.send_to_worker(worker, header, payload)
 
+    def _choose_worker(self, task=None, deps=(), exclude=()):
+        """ Take an available worker, the one likely to finish task first
+
+        ``available_workers`` holds one entry per free slot of each worker.
+        Among the workers with a free slot we pick the one with the earliest
+        estimated completion time: the work already sent to it, spread over
+        its cores, plus the typical duration of this task's function scaled
+        by how slow the worker has been lately.  Ties go to the worker that
+        already holds most of the task's dependencies, then to the worker
+        with the fewest running and queued tasks per core and the lowest
+        utilization, as last reported by the workers, then to the worker
+        that has waited longest.  The reported load matters most before we
+        have learned any durations.
+
+        Workers report their memory use in heartbeats.  Workers that hold
+        more data than their memory limit are spilling to disk; we only give
+        them work if no other worker is available.
+
+        Workers in ``exclude`` are never chosen.  We return None if no other
+        worker is available.
+
+        See Also:
+            Scheduler.estimate_duration
+        """
+        slots = [self.available_workers.get()]
+        while not self.available_workers.empty():
+            slots.append(self.available_workers.get())
+        allowed = [w for w in unique(slots) if w not in exclude]
+        if not allowed:
+            for w in slots:
+                self.available_workers.put(w)
+            return None
+        candidates = [w for w in allowed if not self.saturated(w)]
+        if not candidates:
+            candidates = [allowed[0]]
+
+        def completion_time(worker):
+            info = self.workers.get(worker, {})
+            ncores = info.get('ncores') or 1
+            locality = sum(1 for dep in deps
+                           if worker in self.who_has.get(dep, ()))
+            tasks = info.get('active', 0) + info.get('queued', 0)
+            load = tasks / float(ncores)
+            return (self.occupancy[worker] / ncores +
+                    self.estimate_duration(task, worker), -locality,
+                    load, info.get('utilization', 0))
+
+        worker = min(candidates, key=completion_time)
+        slots.remove(worker)
+        for w in slots:
+            self.available_workers.put(w)
+        return worker
+
+    def estimate_duration(self, task, worker):
+        """ Expected seconds to run task on worker
+
+        Based on the durations observed for the task's function.  Functions
+        not seen before are assumed to take as long as the average function.
+        """
+        if not self.durations:
+            return 0.0
+        duration = self.durations.get(task_name(task))
+        if duration is None:
+            duration = sum(self.durations.values()) / len(self.durations)
+        return duration * self.slowness[worker]
+
+    def _record_duration(self, key, worker, duration, status):
+        """ Learn from a finished task, release its estimated occupancy
+
+        We track the typical duration of each function and the slowness of
+        each worker relative to it as exponentially weighted averages.
+        """
+        if key not in self.processing:
+            return
+        worker2, name, estimate, start = self.processing.pop(key)
+        self.occupancy[worker2] = max(0, self.occupancy[worker2] - estimate)
+        if isinstance(status, Exception) or worker2 != worker:
+            return
+        typical = self.durations.get(name)
+        if typical:
+            ratio = min(max(duration / typical, 0.1), 10)
+            self.slowness[worker] = (1 - ALPHA) * self.slowness[worker] + ALPHA * ratio
+        sample = duration / self.slowness[worker]
+        if typical is None:
+            self.durations[name] = sample
+        else:
+            self.durations[name] = (1 - ALPHA) * typical + ALPHA * sample
+
+    def saturated(self, worker):
+        """ Does this worker hold more data than fits in its memory """
+        info = self.workers.get(worker, {})
+        limit = info.get('memory_limit')
+        return bool(limit) and info.get('memory', 0) + info.get('spilled', 0) > limit
+
     def release_key(self, key):
         """ Release data from all workers
 
@@ -337,22 +604,65 @@ class Scheduler(object):
 
         >>> scheduler.release_key('x')  # doctest: +SKIP
 
+        See Also:
+            Scheduler.release_keys
+        """
+        self.release_keys([key])
+
+    def release_keys(self, keys):
+        """ Release data from all workers
+
+        Example
+        -------
+
+        >>> scheduler.release_keys(['x', 'y'])  # doctest: +SKIP
+
         Protocol
         --------
 
-        This sends a 'delitem' request to all workers known to have this key.
-        This operation is fire-and-forget.  Local indices will be updated
-        immediately.
+        This sends one 'delitem' request with {'keys': [...]} to each worker
+        known to have some of these keys.  This operation is fire-and-forget.
+        Local indices will be updated immediately.
         """
         with logerrors():
-            workers = list(self.who_has[key])
-            log(self.address_to_workers, 'Release data', key, workers)
-            header = {'function': 'delitem', 'jobid': key}
-            payload = {'key': key}
-            for worker in workers:
-                self.send_to_worker(worker, header, payload)
-                self.who_has[key].remove(worker)
-                self.worker_has[worker].remove(key)
+            with self._state_lock:
+                by_worker = defaultdict(list)
+                for key in keys:
+                    self.kept_keys.discard(key)
+                    self.pending_release.discard(key)
+                    self.broadcast_keys.discard(key)
+                    for worker in list(self.who_has.get(key, ())):
+                        by_worker[worker].append(key)
+                        self._remove_replica(key, worker)
+            self._delete_from_workers(by_worker)
+
+    def _delete_from_workers(self, by_worker):
+        """ Send one batched 'delitem' to each worker """
+        for worker, keys in by_worker.items():
+            logger.debug('%s: Release data %s from %s',
+                         self.address_to_workers, keys, worker)
+            header = {'function': 'delitem', 'jobid': keys[0]}
+            payload = {'keys': keys}
+            self.send_to_worker(worker, header, payload)
+
+    def _add_replica(self, key, worker):
+        """ Record that worker holds key """
+        workers = self.who_has[key]
+        workers.add(worker)
+        self.worker_has[worker].add(key)
+        if len(workers) > 1:
+            self.replicated.add(key)
+
+    def _remove_replica(self, key, worker):
+        """ Record that worker no longer holds key """
+        workers = self.who_has.get(key)
+        if workers is not None:
+            workers.discard(worker)
+            if len(workers) < 2:
+                self.replicated.discard(key)
+            if not workers:
+                del self.who_has[key]
+        self.worker_has[worker].discard(key)
 
     def send_data(self, key, value, address=None, reply=True):
         """ Send data up to some worker
@@ -397,7 +707,7 @@ class Scheduler(object):
             queue.get()
             del self.queues[qkey]
 
-    def scatter(self, key_value_pairs, block=True):
+    def scatter(self, key_value_pairs, block=True, broadcast=False):
         """ Scatter data to workers
 
         Parameters
@@ -407,33 +717,52 @@ class Scheduler(object):
             Data to send
         block: bool
             Block on completion or return immediately (defaults to True)
+        broadcast: bool or int
+            Replicate every value to all workers (True) or to this many
+            workers (int).  Defaults to False, sending each value to one
+            worker.
 
         Example
         -------
 
         >>> scheduler.scatter({'x': 1, 'y': 2})  # doctest: +SKIP
+        >>> scheduler.scatter({'model': model}, broadcast=True)  # doctest: +SKIP
 
         Protocol
         --------
 
         1.  Scheduler starts up a uniquely identified queue.
         2.  Scheduler sends 'setitem' requests to workers with
-            {'key': ..., 'value': ... 'queue': ...}
+            {'key': ..., 'value': ..., 'ack': True, 'queue': ...}
         3.  Scheduler waits on queue for all responses
         4.  Workers receive 'setitem' requests, send back on 'setitem-ack' with
             {'key': ..., 'queue': ...}
-        5.  Scheduler's 'setitem-ack' function pushes keys into the queue
+        5.  Scheduler's 'setitem-ack' function registers the data in
+            ``who_has`` and pushes keys into the queue
         6.  Once the same number of replies is heard scheduler scatter function
             returns
         7.  Scheduler cleans up queue
 
+        Without ``block`` we leave out the queue and return right away.
+        Workers still acknowledge, so the data is registered in ``who_has``
+        once it has arrived.
+
+        When broadcasting the scheduler sends each value to only one worker,
+        along with the list of other workers that should receive it under
+        {'broadcast': [...]}.  Workers pass the value on to their peers along
+        a tree, see ``Worker.setitem``.  Every worker acknowledges to the
+        scheduler directly so that all replicas are registered in
+        ``who_has``.  Broadcast keys are listed in ``broadcast_keys`` so that
+        ``cull_redundant_data`` keeps their replicas until they are released.
+
         See Also:
             Scheduler.setitem_ack
-            Worker.setitem_scheduler
+            Worker.setitem
         """
         workers = list(self.workers)
-        log(self.address_to_workers, 'Scatter', workers, key_value_pairs)
-        workers = itertools.cycle(workers)
+        logger.debug('%s: Scatter to %s', self.address_to_workers, workers)
+        if not workers:
+            raise ValueError("No workers available to scatter data to")
 
         if isinstance(key_value_pairs, dict):
             key_value_pairs = key_value_pairs.items()
@@ -441,19 +770,32 @@ class Scheduler(object):
         qkey = str(uuid.uuid1())
         self.queues[qkey] = queue
         counter = 0
-        for (k, v), w in zip(key_value_pairs, workers):
-            header = {'function': 'setitem', 'jobid': k}
-            payload = {'key': k, 'value': v}
-            if block:
-                payload['queue'] = qkey
-            self.send_to_worker(w, header, payload)
-            counter += 1
+        if broadcast:
+            n = len(workers) if broadcast is True else min(broadcast, len(workers))
+            for k, v in key_value_pairs:
+                self.broadcast_keys.add(k)
+                targets = random.sample(workers, n)
+                header = {'function': 'setitem', 'jobid': k}
+                payload = {'key': k, 'value': v, 'ack': True,
+                           'broadcast': targets[1:]}
+                if block:
+                    payload['queue'] = qkey
+                self.send_to_worker(targets[0], header, payload)
+                counter += n
+        else:
+            for (k, v), w in zip(key_value_pairs, itertools.cycle(workers)):
+                header = {'function': 'setitem', 'jobid': k}
+                payload = {'key': k, 'value': v, 'ack': True}
+                if block:
+                    payload['queue'] = qkey
+                self.send_to_worker(w, header, payload)
+                counter += 1
 
         if block:
             for i in range(counter):
                 queue.get()
 
-            del self.queues[qkey]
+        del self.queues[qkey]
 
     def gather(self, keys):
         """ Gather data from workers
@@ -524,8 +866,8 @@ class Scheduler(object):
             Worker.getitem
         """
         payload = pickle.loads(payload)
-        log(self.address_to_workers, 'Getitem ack', payload['key'],
-                                                    payload['queue'])
+        logger.debug('%s: Getitem ack %s %s', self.address_to_workers,
+                     payload['key'], payload['queue'])
         with logerrors():
             assert header['status'] == 'OK'
             self.queues[payload['queue']].put((payload['key'],
@@ -541,8 +883,8 @@ class Scheduler(object):
         address = header['address']
         payload = pickle.loads(payload)
         key = payload['key']
-        self.who_has[key].add(address)
-        self.worker_has[address].add(key)
+        with self._state_lock:
+            self._add_replica(key, address)
         queue = payload.get('queue')
         if queue:
             self.queues[queue].put(key)
@@ -562,6 +904,7 @@ class Scheduler(object):
         self.close_workers()
         self.status = 'closed'
         self._monitor_workers_event.set()
+        self._cull_event.set()
         self.to_workers.close(linger=1)
         self.to_clients.close(linger=1)
         self.send_to_workers_send.close(linger=1)
@@ -571,7 +914,9 @@ class Scheduler(object):
         self.block()
         self.context.destroy(linger=3)
 
-    def schedule(self, dsk, result, keep_results=False, **kwargs):
+    def schedule(self, dsk, result, keep_results=False, priority=0,
+                 gather=True, report=None, fuse_chains=True, speculative=False,
+                 created=None, **kwargs):
         """ Execute dask graph against workers
 
         Parameters
@@ -581,6 +926,26 @@ class Scheduler(object):
             Dask graph
         result: list
             keys to return (possibly nested)
+        keep_results: bool
+            Whether or not to leave the results on the workers
+        priority: int
+            Graphs with higher priority get free workers first.  Graphs of
+            equal priority share the workers fairly.
+        gather: bool
+            Whether or not to collect and return the results
+        report: callable, optional
+            Called with each result key as soon as it is available
+        fuse_chains: bool
+            Whether to send linear chains of tasks to a worker as one unit
+            (default True)
+        speculative: bool or number
+            Send a second copy of tasks that take this many times longer than
+            is typical for their function to another, idle, worker and use
+            whichever copy finishes first.  ``True`` means a factor of 4.
+            Only use this for graphs of pure tasks.  (default False)
+        created: set, optional
+            Filled with the result keys whose data this job put on the
+            workers, rather than found there or waited on from another job
 
         Example
         -------
@@ -593,94 +958,285 @@ class Scheduler(object):
 
         1.  Scheduler scatters precomputed data in graph to workers
             e.g. nodes like ``{'x': 1}``.  See Scheduler.scatter
-        2.
+        2.  Scheduler registers the graph as a job.  Workers are handed to
+            the ready tasks of all running jobs as they free up.
+            See Scheduler._dispatch
+        3.  Keys already being computed for another job are not computed
+            again, we wait on their 'finished-task' message instead.
+
+        Linear chains of tasks, like ``load -> parse -> filter``, are fused
+        into single tasks (see ``dask.optimize.fuse``).  A worker computes the
+        whole chain in one go and only reports and stores its final key.
+        This saves a round trip to the scheduler for every link of the chain.
+        Results and keys in flight for other graphs are never fused away.
+
+        Many graphs, e.g. from different clients, may be scheduled
+        concurrently.  They share the workers and the data on them.
         """
-        with self._schedule_lock:
-            log(self.address_to_workers, "Scheduling dask")
-            if isinstance(result, list):
-                result_flat = set(flatten(result))
-            else:
-                result_flat = set([result])
-            results = set(result_flat)
+        logger.debug('%s: Scheduling dask', self.address_to_workers)
+        if speculative is True:
+            speculative = SPECULATION_FACTOR
+        if isinstance(result, list):
+            result_flat = set(flatten(result))
+        else:
+            result_flat = set([result])
+        results = set(result_flat)
 
-            for k in self.who_has:  # remove keys that we already know about
-                if self.who_has[k]:
+        qkey = str(uuid.uuid1())
+        event_queue = Queue()
+        self.queues[qkey] = event_queue
+
+        with self._state_lock:
+            if self.persisted_keys:
+                dsk = self._resolve_persisted(dsk)
+            held = set()
+            for k in list(dsk):  # remove keys that we already know about
+                if self.who_has.get(k):
                     del dsk[k]
-                    if k in results:
-                        results.remove(k)
+                    held.add(k)
+                    results.discard(k)
 
             dsk = cull(dsk, results)
+            if fuse_chains:
+                dsk = fuse(dsk, keys=results | set(k for k in dsk
+                                                    if k in self.in_flight))
+
+            preexisting_data = held | self._known_dependencies(dsk)
+            held.update(dsk)
+            for k in held:
+                self.key_holders[k].add(qkey)
+
+        try:
+            if report:
+                for k in result_flat - results:
+                    report(k)
 
-            preexisting_data = set(k for k, v in self.who_has.items() if v)
             cache = dict((k, None) for k in preexisting_data)
             dag_state = dag_state_from_dask(dsk, cache=cache)
             del dag_state['cache']
 
             new_data = dict((k, v) for k, v in cache.items()
-                                   if not (k in self.who_has and
-                                           self.who_has[k]))
+                                   if k not in preexisting_data)
             if new_data:
                 self.scatter(new_data.items())  # send data in dask up to workers
 
-            tick = [0]
-
-            event_queue = Queue()
-            qkey = str(uuid.uuid1())
-            self.queues[qkey] = event_queue
+            triggered = set()
+            fired = set(new_data)
 
             def fire_task():
-                tick[0] += 1  # Update heartbeat
-
                 # Choose a good task to compute
                 key = dag_state['ready'].pop()
                 dag_state['ready-set'].remove(key)
                 dag_state['running'].add(key)
 
-                self.trigger_task(key, dsk[key],
-                        dag_state['dependencies'][key], qkey)  # Fire
-
-            try:
-                worker = self.available_workers.get(timeout=20)
-                self.available_workers.put(worker)  # put him back in
-            except Empty:
-                raise ValueError("Waited 20 seconds. No workers found")
+                if self.who_has.get(key):  # finished meanwhile by another job
+                    event_queue.put({'key': key, 'status': 'OK',
+                                     'queue': qkey})
+                elif key in self.in_flight:  # running for another job
+                    self.key_waiters[key].add(qkey)
+                else:
+                    self.in_flight[key] = qkey
+                    triggered.add(key)
+                    fired.add(key)
+                    self.trigger_task(key, dsk[key],
+                            dag_state['dependencies'][key], qkey)  # Fire
+
+            start = time()
+            while not self.workers:
+                if time() - start > 20:
+                    raise ValueError("Waited 20 seconds. No workers found")
+                sleep(0.01)
 
             # Seed initial tasks
-            while dag_state['ready'] and self.available_workers.qsize() > 0:
-                fire_task()
+            with self._state_lock:
+                self.jobs[qkey] = {'priority': priority,
+                                   'ready': dag_state['ready'],
+                                   'running': triggered,
+                                   'fire': fire_task}
+            self._dispatch()
 
             # Main loop, wait on tasks to finish, insert new ones
-            release_data = partial(self._release_data, protected=preexisting_data)
+            to_release = []
+            release_data = partial(self._release_data, qkey=qkey,
+                                   protected=preexisting_data,
+                                   out=to_release)
             while dag_state['waiting'] or dag_state['ready'] or dag_state['running']:
-                payload = event_queue.get()
+                if speculative:
+                    try:
+                        payload = event_queue.get(timeout=SPECULATION_INTERVAL)
+                    except Empty:
+                        self._speculate(triggered, dsk, dag_state['dependencies'],
+                                        qkey, speculative)
+                        continue
+                else:
+                    payload = event_queue.get()
 
                 if isinstance(payload['status'], Exception):
                     raise payload['status']
 
                 key = payload['key']
-                finish_task(dsk, key, dag_state, results, sortkey,
-                            release_data=release_data,
-                            delete=key not in preexisting_data)
+                with self._state_lock:
+                    triggered.discard(key)
+                    if keep_results and key in results:
+                        self.kept_keys.add(key)
+                    finish_task(dsk, key, dag_state, results, sortkey,
+                                release_data=release_data,
+                                delete=key not in preexisting_data)
+                if to_release:
+                    self.release_keys(to_release)
+                    del to_release[:]
+
+                if report and key in results:
+                    report(key)
+                self._dispatch()
+
+            if created is not None:
+                created.update(results & fired)
+            result2 = self.gather(result) if gather else None
+            if not keep_results:  # release result data from workers
+                with self._state_lock:
+                    self.release_keys([key for key in flatten(result)
+                                       if key not in preexisting_data and
+                                       self._release_held_key(key, qkey)])
+        finally:
+            with self._state_lock:
+                self.jobs.pop(qkey, None)
+                self.release_keys([key for key in held if
+                                   self._release_held_key(key, qkey,
+                                                          release=False)])
+            del self.queues[qkey]
 
-                while dag_state['ready'] and self.available_workers.qsize() > 0:
-                    fire_task()
+        return result2
 
-            result2 = self.gather(result)
-            if not keep_results:  # release result data from workers
-                for key in flatten(result):
-                    if key not in preexisting_data:
-                        self.release_key(key)
+    def _speculate(self, keys, dsk, dependencies, qkey, factor):
+        """ Send copies of straggling tasks to idle workers
 
-            self.cull_redundant_data(3)
+        A task straggles when it has run ``factor`` times longer than is
+        typical for its function, e.g. because its worker is swapping or its
+        disk is slow.  Each task gets at most one copy, on a worker other
+        than the original.  Whichever copy finishes first is used.  The
+        result of the other is deleted when it arrives.
 
-        return result2
+        See Also:
+            Scheduler.schedule
+            Scheduler._worker_finished_task
+        """
+        now = time()
+        with self._state_lock:
+            for key in list(keys):
+                if self.available_workers.empty():
+                    break
+                if (key in self.speculated or key in self.late_copies or
+                        key not in self.processing):
+                    continue
+                worker, name, estimate, start = self.processing[key]
+                typical = self.durations.get(name)
+                if not typical or now - start < factor * typical:
+                    continue
+                deps = dependencies[key]
+                worker2 = self._choose_worker(dsk[key], deps, exclude=[worker])
+                if worker2 is None:
+                    break
+                logger.info('%s: Speculate %s on %s, running %.2fs on %s',
+                            self.address_to_workers, key, worker2,
+                            now - start, worker)
+                estimate2 = self.estimate_duration(dsk[key], worker2)
+                self.speculated[key] = (worker2, name, estimate2)
+                self.occupancy[worker2] += estimate2
+                self._send_task(worker2, key, dsk[key], deps, qkey)
+
+    def _known_dependencies(self, dsk):
+        """ Keys referenced by tasks in dsk whose data is on the workers
+
+        Cost depends on the size of the graph, not on the amount of data on
+        the cluster.
+        """
+        known = set()
+        stack = list(dsk.values())
+        while stack:
+            arg = stack.pop()
+            if istask(arg):
+                stack.extend(arg[1:])
+            elif isinstance(arg, list):
+                stack.extend(arg)
+            else:
+                try:
+                    if self.who_has.get(arg):
+                        known.add(arg)
+                except TypeError:  # not hashable
+                    pass
+        return known
+
+    def _resolve_persisted(self, dsk):
+        """ Point tasks at partitions of persisted collections
+
+        >>> s._resolve_persisted({'y': (inc, (persisted, ('x',)))})  # doctest: +SKIP
+        {'x': (persisted, ('x',)), 'y': (inc, 'x')}
+
+        The keys so referenced are found in ``who_has`` and used directly.
+        """
+        found = set()
+        dsk2 = dict()
+        for k, v in dsk.items():
+            if istask(v) and v[0] is persisted and v[1][0] == k:
+                dsk2[k] = v
+            else:
+                dsk2[k] = _subs_persisted(v, found)
+        for k in found:
+            if k not in dsk2:
+                dsk2[k] = (persisted, (k,))
+        return dsk2
+
+    def _dispatch(self):
+        """ Hand available workers to ready tasks of running jobs
+
+        Jobs of higher priority go first.  Among jobs of equal priority we
+        favor the job with the fewest tasks currently running, so that a small
+        job is not starved by a large one.
+
+        See Also
+            Scheduler.schedule
+        """
+        with self._state_lock:
+            while not self.available_workers.empty():
+                jobs = [job for job in self.jobs.values() if job['ready']]
+                if not jobs:
+                    break
+                job = min(jobs, key=lambda j: (-j['priority'], len(j['running'])))
+                job['fire']()
+
+    def _release_held_key(self, key, qkey, release=True):
+        """ Drop a job's hold on a key, return whether to release the data
+
+        Keys shared by several running jobs stay on the workers until the last
+        job holding them lets go.  A release requested while other jobs still
+        hold the key is deferred until then.  Callers collect the keys to
+        release and pass them to ``release_keys`` together.
+        """
+        holders = self.key_holders.get(key, set())
+        holders.discard(qkey)
+        if not holders:
+            self.key_holders.pop(key, None)
+        if key in self.kept_keys or key in self.persisted_keys:
+            return False
+        if holders:
+            if release:
+                self.pending_release.add(key)
+            return False
+        return release or key in self.pending_release
 
     def _schedule_from_client(self, header, payload):
         """
 
-        Input Payload: keys, dask
-        Output Payload: keys, result
+        Input Payload: keys, dask, keep_results, priority, gather, speculative
+        Output Payload: keys, result, locations and created (if not gather)
         Sent to client on 'schedule-ack'
+
+        With ``gather=False`` we don't collect the results.  Instead we send
+        the client their locations so that it can fetch them directly from
+        the workers, see ``Client.gather_from_workers``.  ``created`` lists
+        the result keys that this job computed.  Only these are the client's
+        to release, the others may belong to futures or other jobs.
         """
         with logerrors():
             loads = header.get('loads', dill.loads)
@@ -689,22 +1245,136 @@ class Scheduler(object):
             dsk = payload['dask']
             keys = payload['keys']
             keep_results = payload.get('keep_results', False)
+            priority = payload.get('priority', 0)
+            gather = payload.get('gather', True)
+            speculative = payload.get('speculative', False)
 
             header2 = {'jobid': header.get('jobid'),
                        'function': 'schedule-ack'}
+            payload2 = {'keys': keys}
             try:
-                result = self.schedule(dsk, keys, keep_results)
+                created = set()
+                result = self.schedule(dsk, keys, keep_results, priority,
+                                       gather=gather, speculative=speculative,
+                                       created=created)
+                if not gather:
+                    payload2['locations'] = self.locations(flatten(keys))
+                    payload2['created'] = list(created)
                 header2['status'] = 'OK'
             except Exception as e:
                 result = e
                 header2['status'] = 'Error'
 
-            payload2 = {'keys': keys, 'result': result}
+            payload2['result'] = result
             self.send_to_client(address, header2, payload2)
 
-    def _release_data(self, key, state, delete=True, protected=()):
+    def _submit_from_client(self, header, payload):
+        """ Compute keys for a client's futures and keep them on the workers
+
+        Input Payload: keys, dask
+        Sends one 'task-finished' message to the client per key as soon as
+        that key is available, or when computation fails.
+
+        See Also:
+            Client.submit
+            Scheduler._gather_from_client
+        """
+        with logerrors():
+            loads = header.get('loads', dill.loads)
+            payload = loads(payload)
+            address = header['address']
+            keys = payload['keys']
+            reported = set()
+
+            def report(key, status='OK'):
+                reported.add(key)
+                self.send_to_client(address, {'function': 'task-finished'},
+                                    {'key': key, 'status': status})
+
+            try:
+                self.schedule(payload['dask'], list(keys), keep_results=True,
+                              gather=False, report=report)
+            except Exception as e:
+                for key in keys:
+                    if key not in reported:
+                        report(key, e)
+
+    def _gather_from_client(self, header, payload):
+        """ Collect data for a client
+
+        Input Payload: keys
+        Output Payload: result
+        """
+        with logerrors():
+            payload = header.get('loads', dill.loads)(payload)
+            header2 = {'jobid': header.get('jobid'),
+                       'function': 'gather-ack'}
+            try:
+                result = self.gather(payload['keys'])
+                header2['status'] = 'OK'
+            except Exception as e:
+                result = e
+                header2['status'] = 'Error'
+            self.send_to_client(header['address'], header2, {'result': result})
+
+    def _who_has_from_client(self, header, payload):
+        """ Tell a client where data lives
+
+        Input Payload: keys
+        Output Payload: locations (or result, an Exception)
+        """
+        with logerrors():
+            payload = header.get('loads', dill.loads)(payload)
+            header2 = {'jobid': header.get('jobid'),
+                       'function': 'who-has-ack'}
+            try:
+                payload2 = {'locations': self.locations(payload['keys'])}
+                header2['status'] = 'OK'
+            except KeyError as e:
+                payload2 = {'result': e}
+                header2['status'] = 'Error'
+            self.send_to_client(header['address'], header2, payload2)
+
+    def locations(self, keys):
+        """ Map keys to lists of workers that hold them
+
+        >>> scheduler.locations(['x'])  # doctest: +SKIP
+        {'x': ['tcp://alice:5000', 'tcp://bob:5000']}
+        """
+        with self._state_lock:
+            result = dict()
+            for key in keys:
+                workers = self.who_has.get(key)
+                if not workers:
+                    raise KeyError("No worker holds %s" % str(key))
+                result[key] = list(workers)
+            return result
+
+    def _release_from_client(self, header, payload):
+        """ Client no longer needs these keys, e.g. its futures were deleted
+
+        Input Payload: keys
+        """
+        with logerrors():
+            payload = header.get('loads', dill.loads)(payload)
+            with self._state_lock:
+                release = []
+                for key in payload['keys']:
+                    self.kept_keys.discard(key)
+                    if key in self.persisted_keys:
+                        continue
+                    if self.key_holders.get(key):
+                        self.pending_release.add(key)
+                    else:
+                        release.append(key)
+                self.release_keys(release)
+
+    def _release_data(self, key, state, delete=True, protected=(), qkey=None,
+                      out=None):
         """ Remove data from temporary storage during scheduling run
 
+        Keys to release from the workers are appended to ``out``.
+
         See Also
             Scheduler.schedule
             dask.async.finish_task
@@ -715,24 +1385,107 @@ class Scheduler(object):
 
         state['released'].add(key)
 
-        if delete and key not in protected:
-            self.release_key(key)
+        if (delete and key not in protected and
+                self._release_held_key(key, qkey)):
+            if out is None:
+                self.release_keys([key])
+            else:
+                out.append(key)
 
     def _set_collection(self, header, payload):
         with logerrors():
-            log(self.address_to_clients, "Set collection", header)
+            logger.debug('%s: Set collection: %s', self.address_to_clients, header)
             payload = header.get('loads', dill.loads)(payload)
-            self.collections[payload['name']] = payload
+            with self._state_lock:
+                self._unpersist(payload['name'])
+                self.collections[payload['name']] = payload
+
+            self.send_to_client(header['address'],
+                                {'status': 'OK', 'jobid': header.get('jobid')},
+                                {})
+
+    def _persist_collection(self, header, payload):
+        """ Compute a collection, keep its partitions and share it
+
+        Input Payload: name, type, args, keys, dask
+        Output Payload: result (Exception on failure)
 
-            self.send_to_client(header['address'], {'status': 'OK'}, {})
+        The partitions are computed like the results of futures and then
+        held under the collection's name.  Graphs that use the collection
+        later find its keys in ``who_has`` and so read them from the workers
+        rather than recomputing them.
+
+        See Also:
+            Client.persist
+        """
+        with logerrors():
+            payload = header.get('loads', dill.loads)(payload)
+            name = payload['name']
+            keys = payload['keys']
+            dsk = payload.pop('dask')
+            header2 = {'jobid': header.get('jobid'),
+                       'function': 'persist-ack'}
+            try:
+                with self._state_lock:
+                    kept = self.kept_keys.intersection(keys)
+                self.schedule(dsk, list(keys),
+                              keep_results=True, gather=False)
+                with self._state_lock:
+                    self.kept_keys.difference_update(set(keys) - kept)
+                    self._unpersist(name, keep=keys)
+                    self.persisted[name] = set(keys)
+                    self.persisted_keys.update(keys)
+                    self.collections[name] = payload
+                header2['status'] = 'OK'
+                result = None
+            except Exception as e:
+                header2['status'] = 'Error'
+                result = e
+            self.send_to_client(header['address'], header2, {'result': result})
+
+    def _delete_collection(self, header, payload):
+        """ Forget a shared collection, release its persisted partitions
+
+        Input Payload: name
+        """
+        with logerrors():
+            payload = header.get('loads', dill.loads)(payload)
+            with self._state_lock:
+                self._unpersist(payload['name'])
+                self.collections.pop(payload['name'], None)
+            self.send_to_client(header['address'],
+                                {'status': 'OK', 'jobid': header.get('jobid')},
+                                {})
+
+    def _unpersist(self, name, keep=()):
+        """ Stop holding the partitions of a persisted collection
+
+        Keys shared with other persisted collections, kept for futures, listed
+        in ``keep`` or still needed by running graphs stay on the workers.
+        """
+        keys = self.persisted.pop(name, set())
+        if not keys:
+            return
+        self.persisted_keys = set().union(*self.persisted.values())
+        release = []
+        for key in keys:
+            if (key in self.persisted_keys or key in self.kept_keys or
+                    key in keep):
+                continue
+            if self.key_holders.get(key):
+                self.pending_release.add(key)
+            else:
+                release.append(key)
+        self.release_keys(release)
 
     def _get_collection(self, header, payload):
         with logerrors():
-            log(self.address_to_clients, "Get collection", header)
+            logger.debug('%s: Get collection: %s', self.address_to_clients, header)
             payload = header.get('loads', pickle.loads)(payload)
             payload2 = self.collections[payload['name']]
 
             header2 = {'status': 'OK',
+                       'jobid': header.get('jobid'),
                        'loads': dill.loads,
                        'dumps': dill.dumps}
 
@@ -740,23 +1493,28 @@ class Scheduler(object):
 
     def _get_workers(self, header, payload):
         with logerrors():
-            log(self.address_to_clients, "Get workers", header)
+            logger.debug('%s: Get workers: %s', self.address_to_clients, header)
             self.send_to_client(header['address'],
-                                {'status': 'OK'},
+                                {'status': 'OK', 'jobid': header.get('jobid')},
                                 {'workers': self.workers})
 
     def _heartbeat(self, header, payload):
         with logerrors():
-            # log(self.address_to_workers, "Heartbeat", header)
             payload = pickle.loads(payload)
             address = header['address']
 
             if address not in self.workers:
-                log(self.address_to_workers, "New Worker", header)
-                self.available_workers.put(address)
+                logger.info('%s: New worker: %s', self.address_to_workers, header)
+                for i in range(payload.get('ncores', 1) + self.prefetch):
+                    self.available_workers.put(address)
+                new = True
+            else:
+                new = False
 
             self.workers[address] = payload
             self.workers[address]['last-seen'] = datetime.utcnow()
+            if new:
+                self._dispatch()
 
     def prune_workers(self, timeout=20):
         """
@@ -785,17 +1543,26 @@ class Scheduler(object):
 
         Finds all keys that are replicated more than k times across all workers
         and releases data from a randomly chosen subset until there are only k
-        workers left holding this data.
+        workers left holding this data.  Only keys in ``replicated`` are
+        considered, so this is cheap when little data is replicated.  Each
+        worker receives at most one batched 'delitem' message.
 
         Operates asynchronously and returns quickly.  Scheduler metadata is
-        updated synchronously.
+        updated synchronously.  The scheduler calls this every
+        ``cull_interval`` seconds.
+
+        Partitions of persisted collections and broadcast data keep all of
+        their replicas.
         """
         with logerrors():
-            for key, v in self.who_has.items():
-                while len(v) > k:
-                    worker = random.choice(list(v))
-                    header = {'function': 'delitem', 'jobid': key}
-                    payload = {'key': key}
-                    self.send_to_worker(worker, header, payload)
-                    self.who_has[key].remove(worker)
-                    self.worker_has[worker].remove(key)
+            with self._state_lock:
+                by_worker = defaultdict(list)
+                for key in list(self.replicated):
+                    if key in self.persisted_keys or key in self.broadcast_keys:
+                        continue
+                    v = self.who_has[key]
+                    while len(v) > k:
+                        worker = random.choice(list(v))
+                        by_worker[worker].append(key)
+                        self._remove_replica(key, worker)
+            self._delete_from_workers(by_worker)
@@ -0,0 +1,208 @@
+from __future__ import print_function
+
+import heapq
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from collections import MutableMapping
+from threading import RLock
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from ..utils import Dispatch, ignoring
+
+
+sizeof = Dispatch()
+sizeof.register(object, sys.getsizeof)
+
+
+def _sizeof_sequence(seq):
+    return sys.getsizeof(seq) + sum(map(sizeof, seq))
+
+sizeof.register((list, tuple, set, frozenset), _sizeof_sequence)
+
+with ignoring(ImportError):
+    import numpy as np
+    sizeof.register(np.ndarray, lambda x: int(x.nbytes))
+
+with ignoring(ImportError):
+    import pandas as pd
+    sizeof.register(pd.DataFrame,
+                    lambda df: int(df.memory_usage(index=True).sum()))
+    sizeof.register(pd.Series,
+                    lambda s: int(s.memory_usage(index=True)))
+
+
+class SpillDict(MutableMapping):
+    """ Byte-budgeted mapping that spills least recently used values to disk
+
+    Values are held in memory while their total size stays under
+    ``memory_limit``.  Beyond that the least recently used values are pickled
+    to files in ``directory``.  Spilled values are read back transparently
+    when accessed.
+
+    Parameters
+    ----------
+
+    memory_limit: int
+        Number of bytes to hold in memory
+    directory: string, optional
+        Where to write spilled values, defaults to a new temporary directory
+        that is removed on ``close``
+
+    Example
+    -------
+
+    >>> d = SpillDict(memory_limit=100)
+    >>> d['x'] = 1
+    >>> d['y'] = list(range(1000))  # too big, goes straight to disk
+    >>> d.fast.keys(), d.slow.keys()  # doctest: +SKIP
+    (['x'], ['y'])
+    >>> d['y'][:3]
+    [0, 1, 2]
+    >>> d.close()
+
+    State
+    -----
+
+    fast: dict
+        Values held in memory
+    slow: dict
+        Maps spilled keys to their files
+    nbytes: dict
+        Size of each value in bytes
+    memory: int
+        Total size of values in memory
+    spilled: int
+        Total size of values on disk
+    """
+    def __init__(self, memory_limit, directory=None):
+        self.memory_limit = memory_limit
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='dask-spill-')
+            self._remove_directory = True
+        else:
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            self._remove_directory = False
+        self.directory = directory
+        self.fast = dict()
+        self._last_use = dict()  # key of fast -> tick of last access
+        self._heap = []  # (tick, key), some outdated by later accesses
+        self._ticks = itertools.count()
+        self.slow = dict()
+        self.nbytes = dict()
+        self.memory = 0
+        self.spilled = 0
+        self.lock = RLock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            if key in self.fast:
+                self._touch(key)
+                return self.fast[key]
+            if key not in self.slow:
+                raise KeyError(key)
+            if self.nbytes[key] > self.memory_limit:
+                return self._read(self.slow[key])  # never fits, stays on disk
+            value = self._load(key)
+            self.fast[key] = value
+            self._touch(key)
+            self.memory += self.nbytes[key]
+            self._evict()
+            return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            if key in self:
+                del self[key]
+            nbytes = sizeof(value)
+            self.nbytes[key] = nbytes
+            if nbytes > self.memory_limit:
+                self._dump(key, value)
+            else:
+                self.fast[key] = value
+                self._touch(key)
+                self.memory += nbytes
+                self._evict()
+
+    def __delitem__(self, key):
+        with self.lock:
+            if key in self.fast:
+                del self.fast[key]
+                del self._last_use[key]
+                self.memory -= self.nbytes.pop(key)
+            elif key in self.slow:
+                os.remove(self.slow.pop(key))
+                self.spilled -= self.nbytes.pop(key)
+            else:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.fast or key in self.slow
+
+    def __iter__(self):
+        return iter(list(self.fast) + list(self.slow))
+
+    def __len__(self):
+        return len(self.fast) + len(self.slow)
+
+    def _touch(self, key):
+        """ Record an access to key in fast """
+        tick = next(self._ticks)
+        self._last_use[key] = tick
+        heapq.heappush(self._heap, (tick, key))
+        if len(self._heap) > 2 * len(self._last_use) + 100:
+            self._heap = [(t, k) for k, t in self._last_use.items()]
+            heapq.heapify(self._heap)
+
+    def _evict(self):
+        """ Spill least recently used values until we are within budget """
+        while self.memory > self.memory_limit:
+            tick, key = heapq.heappop(self._heap)
+            if self._last_use.get(key) != tick:
+                continue  # accessed again or removed since
+            del self._last_use[key]
+            value = self.fast.pop(key)
+            self.memory -= self.nbytes[key]
+            self._dump(key, value)
+
+    def _dump(self, key, value):
+        fn = os.path.join(self.directory, str(uuid.uuid4()))
+        with open(fn, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.slow[key] = fn
+        self.spilled += self.nbytes[key]
+
+    def _read(self, fn):
+        with open(fn, 'rb') as f:
+            return pickle.load(f)
+
+    def _load(self, key):
+        fn = self.slow.pop(key)
+        self.spilled -= self.nbytes[key]
+        value = self._read(fn)
+        os.remove(fn)
+        return value
+
+    def close(self):
+        """ Drop all data, remove the spill directory if we created it """
+        with self.lock:
+            self.fast.clear()
+            self._last_use.clear()
+            del self._heap[:]
+            self.slow.clear()
+            self.nbytes.clear()
+            self.memory = self.spilled = 0
+            if self._remove_directory and os.path.exists(self.directory):
+                shutil.rmtree(self.directory)
+
+    def __repr__(self):
+        return ('<SpillDict: %d in memory (%d bytes), %d on disk (%d bytes)>'
+                % (len(self.fast), self.memory, len(self.slow), self.spilled))
@@ -5,6 +5,7 @@ pytest.importorskip('zmq')
 pytest.importorskip('dill')
 
 from dask.distributed import Worker, Scheduler, Client
+from dask.distributed.client import Future, as_completed
 from dask.utils import raises
 from contextlib import contextmanager
 from operator import add
@@ -115,6 +116,47 @@ def test_register_collections():
         d.close()
 
 
+calls = []
+
+def counting_inc(x):
+    calls.append(x)
+    return x + 1
+
+
+def test_persist_collections():
+    try:
+        import dask.bag as db
+    except ImportError:
+        return
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+
+        del calls[:]
+        bag = db.from_sequence(range(5), npartitions=2).map(counting_inc)
+        bag2 = c.persist(bag, 'mybag')
+        assert len(calls) == 5
+        keys = list(bag2._keys())
+        assert all(s.who_has[k] for k in keys)
+        assert set(keys) <= set(a.data) | set(b.data)
+
+        d = Client(s.address_to_clients)
+        bag3 = d.get_collection('mybag')
+        assert bag3.sum().compute(get=d.get) == 15
+        assert bag3.compute(get=d.get) == [1, 2, 3, 4, 5]
+        assert bag2.map(inc).compute(get=c.get) == [2, 3, 4, 5, 6]
+        assert len(calls) == 5  # served from memory
+
+        s.cull_redundant_data(0)
+        assert all(s.who_has[k] for k in keys)
+
+        d.delete_collection('mybag')
+        assert 'mybag' not in s.collections
+        assert not any(s.who_has[k] for k in keys)
+
+        c.close()
+        d.close()
+
+
 def test_register_with_scheduler():
     with scheduler_and_workers() as (s, (a, b)):
         c = Client(s.address_to_clients)
@@ -147,3 +189,133 @@ def test_keep_results():
         assert c.get({'x': (inc, 1)}, 'x', keep_results=True) == 2
 
         assert 'x' in a.data or 'x' in b.data
+
+
+def test_submit():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+
+        x = c.submit(inc, 1)
+        assert isinstance(x, Future)
+        assert x.key.startswith('inc')
+        assert x.result() == 2
+        assert x.done() and x.status == 'finished'
+
+        y = c.submit(add, x, 10)
+        assert y.result() == 12
+        assert x.key in s.kept_keys and y.key in s.kept_keys
+
+        c.close()
+
+
+def test_submit_errors():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+
+        x = c.submit(inc, 'a')
+        assert isinstance(x.exception(), TypeError)
+        assert x.status == 'error'
+        assert raises(TypeError, lambda: x.result())
+
+        y = c.submit(inc, x)
+        assert isinstance(y.exception(), TypeError)
+
+        c.close()
+
+
+def test_map_and_as_completed():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+
+        futures = c.map(add, range(5), range(5))
+        assert len(set(f.key for f in futures)) == 5
+        assert set(f.result() for f in as_completed(futures)) == \
+                set([0, 2, 4, 6, 8])
+        assert c.gather(futures) == [0, 2, 4, 6, 8]
+
+        result = c.gather(futures, block=False)
+        assert result.get() == [0, 2, 4, 6, 8]
+
+        c.close()
+
+
+def test_release_futures():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+
+        x = c.submit(inc, 1)
+        assert x.result() == 2
+        key = x.key
+        del x
+        for i in range(100):
+            if key in a.data or key in b.data:
+                sleep(0.01)
+        assert key not in a.data and key not in b.data
+        assert key not in s.kept_keys
+
+        c.close()
+
+
+def test_direct_gather():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients, hostname='127.0.0.1')
+
+        dsk = {'x': 1, 'y': (inc, 'x'), 'z': (add, 'y', 'x')}
+        assert c.get(dsk, ['y', ['z']], direct=True) == [2, [3]]
+        while a.data or b.data:  # results are released afterwards
+            sleep(0.01)
+
+        assert c.get({'w': (inc, 10)}, 'w', keep_results=True,
+                     direct=True) == 11
+        assert 'w' in a.data or 'w' in b.data
+
+        futures = c.map(inc, range(10))
+        assert c.gather(futures, direct=True) == list(range(1, 11))
+        assert c.gather(futures, block=False, direct=True).get() == \
+                list(range(1, 11))
+        assert sorted(v for k, v in c.iter_gather(futures)) == \
+                list(range(1, 11))
+
+        c.close()
+
+
+def test_abandoned_iter_gather():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients, hostname='127.0.0.1')
+        pool = ThreadPool(1)
+
+        futures = c.map(inc, range(10))
+        seq = c.iter_gather(futures)
+        next(seq)  # stop part-way, the iterator stays alive
+
+        result = pool.apply_async(c.gather, args=(futures,),
+                                  kwds={'direct': True})
+        assert result.get(timeout=5) == list(range(1, 11))
+        assert len(list(seq)) == 9
+
+        seq = c.iter_gather(futures)
+        next(seq)
+        pool.apply_async(c.close).get(timeout=5)
+        pool.close()
+
+
+def test_direct_get_keeps_shared_keys():
+    with scheduler_and_workers() as (s, (a, b)):
+        c = Client(s.address_to_clients)
+        d = Client(s.address_to_clients, hostname='127.0.0.1')
+
+        x = c.submit(inc, 1)
+        assert x.result() == 2
+
+        dsk = {x.key: (inc, 1), 'w': (inc, x.key)}
+        assert d.get(dsk, [x.key, 'w'], direct=True) == [2, 3]
+        for i in range(100):  # 'w' is released, x stays with its future
+            if 'w' in a.data or 'w' in b.data:
+                sleep(0.01)
+        assert 'w' not in a.data and 'w' not in b.data
+        assert s.who_has[x.key]
+        assert x.key in s.kept_keys
+        assert c.submit(inc, x).result() == 3
+
+        c.close()
+        d.close()
@@ -0,0 +1,54 @@
+import pytest
+pytest.importorskip('zmq')
+pytest.importorskip('dill')
+
+from operator import add
+
+from dask.distributed import LocalCluster, Worker
+from dask.distributed.benchmarks import run_benchmarks
+
+
+def inc(x):
+    return x + 1
+
+
+def test_local_cluster_threads():
+    with LocalCluster(nworkers=2) as cluster:
+        assert len(cluster.scheduler.workers) == 2
+        assert all(isinstance(w, Worker) for w in cluster.workers)
+        assert cluster.address_to_clients.startswith(b'tcp://127.0.0.1')
+
+        c = cluster.client()
+        assert c.get({'x': 1, 'y': (inc, 'x'), 'z': (add, 'x', 'y')}, 'z') == 3
+        c.close()
+    assert cluster.scheduler.status == 'closed'
+    assert all(w.status == 'closed' for w in cluster.workers)
+
+
+def test_local_cluster_ipc():
+    with LocalCluster(nworkers=2, transport='ipc') as cluster:
+        assert cluster.address_to_clients.startswith(b'ipc://')
+        assert all(w.address.startswith(b'ipc://') for w in cluster.workers)
+
+        c = cluster.client()
+        dsk = {'x': (inc, 1), 'y': (inc, 2), 'z': (add, 'x', 'y')}
+        assert c.get(dsk, 'z') == 5
+        c.close()
+
+
+def test_local_cluster_processes():
+    with LocalCluster(nworkers=2, processes=True) as cluster:
+        c = cluster.client()
+        assert c.get({'x': (inc, 1), 'y': (inc, 'x')}, 'y') == 3
+        c.close()
+    for p in cluster.workers:
+        assert not p.is_alive()
+
+
+def test_benchmarks():
+    with LocalCluster(nworkers=2) as cluster:
+        results = run_benchmarks(cluster, ntasks=20, nrounds=3, nbytes=1000,
+                                 nmessages=100)
+    assert set(results) == set(['throughput', 'latency', 'bandwidth',
+                                'messages'])
+    assert all(v > 0 for v in results.values())
@@ -0,0 +1,64 @@
+import logging
+
+import pytest
+pytest.importorskip('zmq')
+pytest.importorskip('dill')
+
+from dask.distributed.logs import BackgroundHandler, log_to_file
+from dask.utils import tmpfile
+
+
+def test_debug_disabled_by_default():
+    import dask.distributed.scheduler
+    for name in ['dask.distributed.scheduler', 'dask.distributed.worker',
+                 'dask.distributed.client']:
+        assert not logging.getLogger(name).isEnabledFor(logging.DEBUG)
+
+
+class Unrepresentable(object):
+    def __repr__(self):
+        raise AssertionError("Should not be formatted")
+
+
+def test_lazy_formatting():
+    logger = logging.getLogger('dask.distributed.scheduler')
+    logger.debug('%s', Unrepresentable())
+
+
+def test_background_handler():
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handler = BackgroundHandler(ListHandler())
+    logger = logging.getLogger('dask.distributed.test-background')
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        data = {'x': 1}
+        logger.debug('data: %s', data)
+        data['x'] = 2  # mutation after the call does not change the message
+        handler.flush()
+        assert records == ["data: {'x': 1}"]
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    assert not handler._thread.is_alive()
+
+
+def test_log_to_file():
+    with tmpfile('log') as fn:
+        handler = log_to_file(fn, name='dask.distributed.test-file')
+        logger = logging.getLogger('dask.distributed.test-file')
+        try:
+            logger.debug('Hello %s', 'world')
+            handler.flush()
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        with open(fn) as f:
+            text = f.read()
+        assert 'Hello world' in text
+        assert 'DEBUG' in text
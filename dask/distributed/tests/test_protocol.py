@@ -0,0 +1,46 @@
+import pytest
+pytest.importorskip('dill')
+
+import pickle
+
+import dill
+
+from dask.distributed.protocol import dumps_header, loads_header, MAGIC
+from dask.utils import raises
+
+
+def test_compact_roundtrip():
+    for jobid in [None, 1, -5, 'client-job-1', b'key', ('x', 1, 2), 2**70]:
+        header = {'function': 'finished-task', 'address': b'tcp://alice:5000',
+                  'timestamp': 1443000000.5, 'jobid': jobid, 'status': 'OK'}
+        frame = dumps_header(header)
+        assert frame.startswith(MAGIC)
+        assert len(frame) < len(pickle.dumps(header, protocol=2))
+        assert loads_header(frame) == header
+
+
+def test_dill_flag():
+    header = {'function': 'compute', 'jobid': 'x',
+              'dumps': dill.dumps, 'loads': dill.loads}
+    frame = dumps_header(header)
+    assert frame.startswith(MAGIC)
+    assert loads_header(frame) == header
+
+
+def test_fallback_to_pickle():
+    for header in [{'function': 'new-function'},
+                   {'function': 'status', 'extra': 1},
+                   {'function': 'status', 'loads': pickle.loads},
+                   {'function': 'status', 'status': 'Unusual'}]:
+        frame = dumps_header(header)
+        assert not frame.startswith(MAGIC)
+        assert loads_header(frame) == header
+
+    header = {'function': 'status', 'jobid': 1}
+    assert loads_header(pickle.dumps(header)) == header
+
+
+def test_unknown_version():
+    frame = dumps_header({'function': 'status'})
+    frame = frame[:2] + b'\x63' + frame[3:]
+    assert raises(ValueError, lambda: loads_header(frame))
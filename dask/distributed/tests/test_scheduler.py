@@ -7,13 +7,17 @@ import pickle
 import re
 from datetime import datetime
 from contextlib import contextmanager
-from time import sleep
+from functools import partial
+from time import sleep, time
+from multiprocessing.pool import ThreadPool
+from threading import Event
 
 import zmq
 import dill
 
 from dask.distributed.scheduler import Scheduler
 from dask.distributed.worker import Worker
+from dask.distributed.protocol import loads_header
 
 context = zmq.Context()
 
@@ -54,10 +58,10 @@ def test_status_worker():
             sock.send_multipart([pickle.dumps(header), pickle.dumps(payload)])
 
             header2, payload2 = sock.recv_multipart()
-            header2 = pickle.loads(header2)
+            header2 = loads_header(header2)
             assert header2['address'] == s.address_to_workers
             assert header2['jobid'] == header.get('jobid')
-            assert isinstance(header2['timestamp'], (datetime, str))
+            assert isinstance(header2['timestamp'], float)
             assert pickle.loads(payload2) == 'OK'
         finally:
             sock.close(1)
@@ -75,10 +79,10 @@ def test_status_client():
             sock.send_multipart([pickle.dumps(header), pickle.dumps(payload)])
 
             header2, payload2 = sock.recv_multipart()
-            header2 = pickle.loads(header2)
+            header2 = loads_header(header2)
             assert header2['address'] == s.address_to_clients
             assert header2['jobid'] == header.get('jobid')
-            assert isinstance(header2['timestamp'], (datetime, str))
+            assert isinstance(header2['timestamp'], float)
             assert pickle.loads(payload2) == 'OK'
         finally:
             sock.close(1)
@@ -107,7 +111,7 @@ def add(x, y):
 
 def test_compute_cycle():
     with scheduler_and_workers() as (s, (a, b)):
-        assert s.available_workers.qsize() == 2
+        assert s.available_workers.qsize() == 2 * (1 + s.prefetch)
 
         dsk = {'a': (add, 1, 2), 'b': (inc, 'a')}
         s.trigger_task('a', dsk['a'], set([]), 'queue-key')
@@ -117,7 +121,7 @@ def test_compute_cycle():
         assert 'a' in a.data or 'a' in b.data
         assert a.data.get('a') == 3 or b.data.get('a') == 3
         assert a.address in s.worker_has or b.address in s.worker_has
-        assert s.available_workers.qsize() == 2
+        assert s.available_workers.qsize() == 2 * (1 + s.prefetch)
 
         s.trigger_task('b', dsk['b'], set(['a']), 'queue-key')
         sleep(0.1)
@@ -125,7 +129,7 @@ def test_compute_cycle():
         assert 'b' in s.who_has
         assert 'b' in a.data or 'b' in b.data
         assert a.data.get('b') == 4 or b.data.get('b') == 4
-        assert s.available_workers.qsize() == 2
+        assert s.available_workers.qsize() == 2 * (1 + s.prefetch)
 
 
 def test_send_release_data():
@@ -152,6 +156,46 @@ def test_scatter():
         assert set([len(a.data), len(b.data)]) == set([1, 2])  # fair
 
 
+def test_scatter_broadcast():
+    with scheduler_and_workers(n=5) as (s, workers):
+        s.scatter({'x': 1, 'y': 2}, broadcast=True)
+
+        assert all(w.data == {'x': 1, 'y': 2} for w in workers)
+        assert len(s.who_has['x']) == len(s.who_has['y']) == 5
+
+        s.scatter({'z': 3}, broadcast=3)
+        assert sum('z' in w.data for w in workers) == 3
+        assert len(s.who_has['z']) == 3
+
+        # Replicas outlive the periodic culler (max_replicas=3)
+        sleep(1.5)
+        assert all(w.data['x'] == 1 and w.data['y'] == 2 for w in workers)
+        assert len(s.who_has['x']) == 5
+
+        s.release_keys(['x'])
+        assert 'x' not in s.broadcast_keys
+        assert not s.who_has['x']
+
+
+def test_scatter_broadcast_without_blocking():
+    with scheduler_and_workers(n=5) as (s, workers):
+        s.scatter({'x': 1}, broadcast=True, block=False)
+        s.scatter({'y': 2}, block=False)
+        for i in range(100):
+            if len(s.who_has['x']) < 5 or not s.who_has['y']:
+                sleep(0.01)
+        assert all(w.data['x'] == 1 for w in workers)
+        assert len(s.who_has['x']) == 5
+        assert len(s.who_has['y']) == 1
+        assert 'x' in s.broadcast_keys
+
+
+def test_scatter_without_workers():
+    with scheduler() as s:
+        with pytest.raises(ValueError):
+            s.scatter({'x': 1}, broadcast=True)
+
+
 def test_schedule():
     with scheduler_and_workers() as (s, (a, b)):
         dsk = {'x': (add, 1, 2), 'y': (inc, 'x'), 'z': (add, 'y', 'x')}
@@ -346,3 +390,217 @@ def test_cull_redundant_data():
 
         assert ('x' in a.data and 'x' not in b.data or
                 'x' in b.data and 'x' not in a.data)
+
+
+def test_replicated_index_and_batched_release():
+    with scheduler_and_workers() as (s, (a, b)):
+        s.send_data('x', 1, address=a.address)
+        s.send_data('y', 2, address=a.address)
+        s.send_data('y', 2, address=b.address)
+        assert s.replicated == set(['y'])
+
+        s.release_keys(['x', 'y'])
+        assert not s.replicated
+        assert not s.who_has.get('x') and not s.who_has.get('y')
+        while a.data or b.data:
+            sleep(0.01)
+
+
+def test_periodic_culling():
+    kwargs = {'max_replicas': 1, 'cull_interval': 0.02}
+    with scheduler_and_workers(scheduler_kwargs=kwargs) as (s, (a, b)):
+        s.send_data('x', 10, address=a.address)
+        s.send_data('x', 10, address=b.address)
+
+        while len(s.who_has['x']) > 1 or ('x' in a.data and 'x' in b.data):
+            sleep(0.01)
+        assert 'x' in a.data or 'x' in b.data
+        assert not s.replicated
+
+
+def test_known_dependencies_only_looks_at_graph():
+    with scheduler_and_workers() as (s, (a, b)):
+        s.send_data('x', 1, address=a.address)
+        s.send_data('z', 3, address=a.address)
+        dsk = {'y': (inc, 'x'), 'w': (add, 'y', [('inc', 1), 'x'])}
+        assert s._known_dependencies(dsk) == set(['x'])
+
+
+def slowinc(x, delay=0.02):
+    sleep(delay)
+    return x + 1
+
+
+def test_concurrent_schedules_interleave():
+    with scheduler_and_workers() as (s, (a, b)):
+        pool = ThreadPool(2)
+        big = dict((('x', i), (slowinc, i)) for i in range(50))
+        big['total'] = (sum, [('x', i) for i in range(50)])
+
+        future = pool.apply_async(s.schedule, args=(big, 'total'))
+        while not s.jobs:
+            sleep(0.001)
+
+        start = time()
+        assert s.schedule({'y': (inc, 1)}, 'y') == 2
+        assert not future.ready()  # small graph didn't wait on the big one
+        assert time() - start < 0.5
+
+        assert future.get() == sum(range(1, 51))
+        assert not s.jobs
+
+
+counter = [0]
+
+def counting_slowinc(x):
+    counter[0] += 1
+    sleep(0.1)
+    return x + 1
+
+
+def test_concurrent_schedules_share_keys():
+    counter[0] = 0
+    with scheduler_and_workers() as (s, (a, b)):
+        pool = ThreadPool(2)
+        dsk1 = {'x': (counting_slowinc, 1), 'y': (inc, 'x')}
+        dsk2 = {'x': (counting_slowinc, 1), 'z': (add, 'x', 10)}
+
+        # fusing would fold x into y and z, don't share it
+        kwargs = {'fuse_chains': False}
+        f1 = pool.apply_async(s.schedule, args=(dsk1, 'y'), kwds=kwargs)
+        f2 = pool.apply_async(s.schedule, args=(dsk2, 'z'), kwds=kwargs)
+
+        assert f1.get() == 3
+        assert f2.get() == 12
+        assert counter[0] == 1
+        assert not s.key_holders
+
+
+def test_schedule_fuses_linear_chains():
+    with scheduler_and_workers() as (s, (a, b)):
+        dsk = dict(('x%d' % i, (inc, 'x%d' % (i - 1))) for i in range(1, 10))
+        dsk['x0'] = (inc, 0)
+        dsk['y'] = (add, 'x4', 'x9')
+
+        assert s.schedule(dsk, ['x4', 'y']) == [5, 15]
+        assert set(s.data) == set(['x4', 'x9', 'y'])  # one message per chain
+
+
+def test_dispatch_prefers_priority():
+    with scheduler_and_workers(n=1, scheduler_kwargs={'prefetch': 0}) as (s, (a,)):
+        fired = []
+
+        def fire(name):
+            fired.append(s.jobs[name]['ready'].pop())
+            s.available_workers.get()
+
+        s.available_workers.get()  # occupy the only worker
+        with s._state_lock:
+            s.jobs['low'] = {'priority': 0, 'ready': ['l'], 'running': set(),
+                             'fire': partial(fire, 'low')}
+            s.jobs['high'] = {'priority': 1, 'ready': ['h'], 'running': set(),
+                              'fire': partial(fire, 'high')}
+        s.available_workers.put(a.address)
+        s._dispatch()
+        assert fired == ['h']
+        s.jobs.clear()
+
+
+def test_avoid_saturated_workers():
+    with scheduler_and_workers(scheduler_kwargs={'prefetch': 0}) as (s, (a, b)):
+        s.workers[a.address].update({'memory': 90, 'spilled': 20,
+                                     'memory_limit': 100})
+        s.workers[b.address].update({'memory': 50, 'spilled': 0,
+                                     'memory_limit': 100})
+        assert s.saturated(a.address)
+        assert not s.saturated(b.address)
+
+        assert s._choose_worker() == b.address
+        assert s._choose_worker() == a.address  # nothing else left
+        s.available_workers.put(a.address)
+        s.available_workers.put(b.address)
+
+
+def test_choose_worker_by_estimated_completion_time():
+    with scheduler_and_workers() as (s, (a, b)):
+        s.durations['inc'] = 1.0
+        s.slowness[a.address] = 5.0  # a has been slow lately
+        assert s._choose_worker((inc, 1)) == b.address
+        s.available_workers.put(b.address)
+
+        s.slowness[a.address] = 1.0
+        s.occupancy[b.address] = 10.0  # b is still busy with other work
+        assert s._choose_worker((inc, 1)) == a.address
+        s.available_workers.put(a.address)
+
+        s.occupancy[b.address] = 0.0
+        s.who_has['x'].add(b.address)  # b holds the dependency
+        assert s._choose_worker((inc, 'x'), ['x']) == b.address
+        s.available_workers.put(b.address)
+
+
+def test_choose_worker_by_reported_load():
+    with scheduler_and_workers() as (s, (a, b)):
+        # Nothing learned yet, the load reported by the workers decides
+        s.workers[a.address].update({'active': 1, 'queued': 2})
+        s.workers[b.address].update({'active': 1, 'queued': 0})
+        assert s._choose_worker((inc, 1)) == b.address
+        s.available_workers.put(b.address)
+
+        s.workers[b.address].update({'queued': 2, 'utilization': 0.9})
+        s.workers[a.address].update({'utilization': 0.2})
+        assert s._choose_worker((inc, 1)) == a.address
+        s.available_workers.put(a.address)
+
+
+def test_learn_durations_and_occupancy():
+    with scheduler_and_workers(n=1, worker_kwargs={'ncores': 3}) as (s, (a,)):
+        assert s.available_workers.qsize() == 3 + s.prefetch
+        assert s.workers[a.address]['ncores'] == 3
+
+        dsk = dict(('x%d' % i, (inc, i)) for i in range(6))
+        s.schedule(dsk, list(dsk))
+
+        assert s.durations['inc'] > 0
+        assert not s.processing
+        assert s.occupancy[a.address] < 1e-9
+        assert s.workers[a.address]['active'] == 0
+        assert s.workers[a.address]['queued'] == 0
+        assert 0 <= s.workers[a.address]['utilization'] <= 1
+        assert s.available_workers.qsize() == 3 + s.prefetch
+
+
+calls = []
+stuck = Event()
+
+def straggle_once(i):
+    calls.append(i)
+    if i == -1 and calls.count(-1) == 1:
+        stuck.wait(10)  # the first attempt hangs, e.g. on a slow disk
+    sleep(0.01)
+    return i
+
+
+def test_speculative_execution():
+    with scheduler_and_workers() as (s, (a, b)):
+        del calls[:]
+        stuck.clear()
+        try:
+            dsk = dict(('a%d' % i, (straggle_once, i)) for i in range(4))
+            s.schedule(dsk, list(dsk))
+            assert s.durations['straggle_once'] > 0
+
+            start = time()
+            assert s.schedule({'x': (straggle_once, -1)}, 'x',
+                              speculative=True) == -1
+            assert time() - start < 5
+            assert calls.count(-1) == 2
+        finally:
+            stuck.set()
+
+        start = time()
+        while s.processing or 'x' in a.data or 'x' in b.data:
+            sleep(0.01)  # the late copy is dropped
+            assert time() - start < 5
+        assert not s.speculated and not s.late_copies
+        assert not s.who_has.get('x')
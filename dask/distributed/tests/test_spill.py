@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from dask.distributed.spill import SpillDict, sizeof
+from dask.utils import raises
+
+
+def test_sizeof():
+    assert sizeof(1) > 0
+    assert sizeof(list(range(1000))) > sizeof(list(range(10)))
+    np = pytest.importorskip('numpy')
+    assert sizeof(np.ones(1000, dtype='f8')) == 8000
+
+
+def test_spill_least_recently_used():
+    d = SpillDict(memory_limit=3 * sizeof(1))
+    try:
+        d['x'] = 1
+        d['y'] = 2
+        d['z'] = 3
+        assert set(d.fast) == set('xyz') and not d.slow
+
+        d['x']  # touch x, y is now least recently used
+        d['w'] = 4
+        assert set(d.slow) == set(['y'])
+        assert d.memory <= d.memory_limit
+        assert d.spilled == sizeof(2)
+        assert os.path.exists(d.slow['y'])
+
+        assert d['y'] == 2  # transparently reload
+        assert 'y' in d.fast and 'y' not in d.slow
+        assert len(d) == 4 and set(d) == set('wxyz')
+    finally:
+        d.close()
+
+
+def test_spill_large_values_and_delete():
+    d = SpillDict(memory_limit=100)
+    try:
+        d['big'] = list(range(1000))
+        d['small'] = 1
+        assert 'big' in d.slow and 'small' in d.fast
+        fn = d.slow['big']
+
+        mtime = os.path.getmtime(fn)
+        assert d['big'] == list(range(1000))
+        assert d['big'] == list(range(1000))
+        assert d.slow['big'] == fn  # still too big for memory, read in place
+        assert os.path.getmtime(fn) == mtime
+        assert d.spilled == sizeof(list(range(1000)))
+
+        del d['big']
+        assert 'big' not in d
+        assert not os.path.exists(fn)
+        assert d.spilled == 0
+        assert raises(KeyError, lambda: d['big'])
+
+        d['small'] = 2  # overwrite
+        assert d['small'] == 2
+        assert d.memory == sizeof(2)
+    finally:
+        d.close()
+    assert not os.path.exists(d.directory)
+
+
+def test_spill_least_recently_used_after_many_accesses():
+    d = SpillDict(memory_limit=5 * sizeof(1))
+    order = []  # reference, least recently used first
+    try:
+        for i in range(1000):
+            key = 'x%d' % ((i * 7) % 13)
+            if key in d:
+                assert d[key] == 1
+                order.remove(key)
+            else:
+                d[key] = 1
+            order.append(key)
+            assert set(d.fast) == set(order[-5:])
+        assert len(d) == 13
+        assert len(d._heap) <= 2 * len(d.fast) + 100
+    finally:
+        d.close()
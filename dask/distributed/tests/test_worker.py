@@ -4,8 +4,11 @@ pytest.importorskip('dill')
 
 from dask.utils import raises
 from dask.distributed.worker import Worker
+from dask.distributed.protocol import loads_header
+from dask.distributed.spill import SpillDict
 from contextlib import contextmanager
 import multiprocessing
+import os
 import itertools
 import zmq
 from time import sleep
@@ -21,13 +24,17 @@ def inc(x):
 def add(x, y):
     return x + y
 
+def slow_inc(x):
+    sleep(0.5)
+    return x + 1
+
 
 @contextmanager
-def worker(data=None, scheduler='tcp://127.0.0.1:5555'):
+def worker(data=None, scheduler='tcp://127.0.0.1:5555', **kwargs):
     if data is None:
         data = dict()
 
-    a = Worker(scheduler, data, hostname='127.0.0.1', nthreads=50)
+    a = Worker(scheduler, data, hostname='127.0.0.1', **kwargs)
 
     try:
         yield a
@@ -62,7 +69,7 @@ def test_status():
         address, header, result = r.recv_multipart()
         assert address == w.address
         result = pickle.loads(result)
-        header = pickle.loads(header)
+        header = loads_header(header)
         assert result == 'OK'
         assert header['address'] == w.address
         assert header['jobid'] == 3
@@ -79,7 +86,7 @@ def test_getitem():
         payload = pickle.loads(payload)
         assert payload['value'] == 10
         assert payload['queue'] == 'some-key'
-        header = pickle.loads(header)
+        header = loads_header(header)
         assert header['function'] == 'getitem-ack'
 
 
@@ -110,7 +117,7 @@ def test_error():
 
         address, header, result = r.recv_multipart()
         result = pickle.loads(result)
-        header = pickle.loads(header)
+        header = loads_header(header)
         assert isinstance(result['value'], KeyError)
         assert header['status'] != 'OK'
 
@@ -159,7 +166,7 @@ def test_compute():
             r.send_multipart([b.address, pickle.dumps(header), pickle.dumps(payload)])
             # Worker b does stuff, sends back ack
             address, header, result = r.recv_multipart()
-            header = pickle.loads(header)
+            header = loads_header(header)
             result = header.get('loads', pickle.loads)(result)
             assert header['address'] == b.address
             assert b.data['c'] == 11
@@ -174,11 +181,13 @@ def test_worker_death():
         with worker(scheduler=w1.scheduler) as w2:
             r.recv_multipart()  # burn handshake
 
-            # setup worker
+            # w1 waits on data from w2
             qkey = 'queue_key'
             dkey = 'data_key'
-            w1.queues[qkey] = Queue()
-            w1.queues_by_worker[w2.address] = {qkey: [dkey]}
+            done = Queue()
+            w1.fetches[qkey] = {'locations': {dkey: set([w2.address])},
+                                'callback': done.put, 'start': 0}
+            w1.queues_by_worker[w2.address][qkey].add(dkey)
 
             # mock message
             header = {}
@@ -188,7 +197,95 @@ def test_worker_death():
             w1.worker_death(header, payload)
 
             # assertions
-            msg = w1.queues[qkey].get()
-            assert msg['status'] == 'failed'
-            assert msg['key'] == dkey
-            assert msg['worker'] == w2.address
+            assert isinstance(done.get(timeout=5), ValueError)
+            assert qkey not in w1.fetches
+            assert w2.address not in w1.queues_by_worker
+
+
+def test_compute_does_not_block_communication():
+    with worker_and_router(data={'a': 1}) as (b, r):
+        with worker(data=dict(('x%d' % i, i) for i in range(20)),
+                    scheduler=b.scheduler) as a:
+            r.recv_multipart()  # burn handshake
+            assert b.pool._processes == 1
+
+            # Many tasks wait on data from a peer at once
+            for i in range(20):
+                header = {'function': 'compute'}
+                payload = {'key': 'y%d' % i,
+                           'task': (add, 'a', 'x%d' % i),
+                           'locations': {'x%d' % i: [a.address]},
+                           'queue': 'q-key'}
+                r.send_multipart([b.address, pickle.dumps(header),
+                                  pickle.dumps(payload)])
+
+            for i in range(20):
+                address, header, result = r.recv_multipart()
+                result = pickle.loads(result)
+                assert result['status'] == 'OK'
+            assert all(b.data['y%d' % i] == i + 1 for i in range(20))
+
+
+def test_fetch_data_of_queued_task_while_computing():
+    with worker_and_router(data={'a': 1}) as (b, r):
+        with worker(data={'x': 10}, scheduler=b.scheduler) as a:
+            r.recv_multipart()  # burn handshake
+
+            for key, task, locations in [('y', (slow_inc, 'a'), {}),
+                                         ('z', (inc, 'x'), {'x': [a.address]})]:
+                header = {'function': 'compute'}
+                payload = {'key': key, 'task': task, 'locations': locations,
+                           'queue': 'q-key'}
+                r.send_multipart([b.address, pickle.dumps(header),
+                                  pickle.dumps(payload)])
+
+            sleep(0.2)
+            assert b.active == 1  # computing y
+            assert b.queued == 1  # z waits for a thread
+            assert b.data['x'] == 10  # data for z arrived meanwhile
+
+            keys = []
+            for i in range(2):
+                address, header, result = r.recv_multipart()
+                keys.append(pickle.loads(result)['key'])
+            assert keys == ['y', 'z']
+            assert b.data['z'] == 11
+
+
+def test_utilization():
+    with worker_and_router(data={'a': 1}, heartbeat=1000) as (w, r):
+        header = {'function': 'compute'}
+        payload = {'key': 'y', 'task': (slow_inc, 'a'), 'locations': {},
+                   'queue': 'q-key'}
+        r.send_multipart([w.address, pickle.dumps(header),
+                          pickle.dumps(payload)])
+        sleep(0.2)
+
+        # Reports do not reset the measurement
+        assert w.occupancy()['utilization'] == 0
+        w.update_utilization()
+        u = w.occupancy()['utilization']
+        assert 0.3 < u <= 0.5  # running tasks count, decayed from 0
+        assert w.occupancy()['utilization'] == u
+        assert w.occupancy()['active'] == 1
+
+        r.recv_multipart()
+        w.update_utilization()
+        assert w.utilization > u
+        assert w.occupancy()['queued'] == w.occupancy()['active'] == 0
+
+
+def test_memory_limit_spills():
+    a = Worker('tcp://127.0.0.1:5555', hostname='127.0.0.1', heartbeat=False,
+               memory_limit=100)
+    try:
+        assert isinstance(a.data, SpillDict)
+        a.data['x'] = list(range(100))
+        assert 'x' in a.data.slow
+        usage = a.memory_usage()
+        assert usage['memory_limit'] == 100
+        assert usage['spilled'] > 100
+        directory = a.data.directory
+    finally:
+        a.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,27 @@
+from __future__ import print_function
+
+import os
+import tempfile
+import uuid
+
+
+def ipc_address(name='dask'):
+    """ A fresh address for an inter-process socket on this machine
+
+    >>> ipc_address('scheduler')  # doctest: +SKIP
+    'ipc:///tmp/scheduler-5b9d4a5e-...'
+    """
+    return 'ipc://' + os.path.join(tempfile.gettempdir(),
+                                   '%s-%s' % (name, uuid.uuid4()))
+
+
+def funcname(func):
+    """ Name of a function, used to build readable keys
+
+    >>> from operator import add
+    >>> funcname(add)
+    'add'
+    """
+    while hasattr(func, 'func'):
+        func = func.func
+    return getattr(func, '__name__', type(func).__name__)
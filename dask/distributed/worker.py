@@ -1,16 +1,15 @@
-from __future__ import print_function
+from __future__ import print_function, division
 
 import uuid
 import random
 import socket
-import sys
 import os
-import traceback
-from threading import Thread, Lock, Event
+import logging
+from threading import Thread, Lock, current_thread
 from multiprocessing.pool import ThreadPool
 from contextlib import contextmanager
-from datetime import datetime
 from time import time
+from math import ceil
 from collections import defaultdict
 
 try:
@@ -19,36 +18,30 @@ except ImportError:
     import pickle
 
 import zmq
+from toolz import partition_all
 
-from ..compatibility import Queue, unicode
+from ..compatibility import Queue, unicode, Empty
 from .. import core
+from .spill import SpillDict
+from .utils import ipc_address
+from .protocol import dumps_header, loads_header
 
 
 def pickle_dumps(obj):
     return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
 
 MAX_DEALERS = 100
+BROADCAST_FANOUT = 2
 
-with open('log.workers', 'w') as f:  # delete file
-    pass
+logger = logging.getLogger(__name__)
 
 
-def log(*args):
-    with open('log.workers', 'a') as f:
-        print('\n', *args, file=f)
-
-
-log('Hello from worker.py')
-
 @contextmanager
 def logerrors():
     try:
         yield
     except Exception as e:
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        tb = ''.join(traceback.format_tb(exc_traceback))
-        log('Error!', str(e))
-        log('Traceback', str(tb))
+        logger.error("Error: %s", e, exc_info=True)
         raise
 
 
@@ -70,6 +63,18 @@ class Worker(object):
     heartbeat: int, bool
         The time between heartbeats in seconds, or False to turn off
         heartbeats, defaults to 5
+    ncores: int
+        Number of tasks to run at once, defaults to 1
+    nthreads: int
+        Number of threads that run tasks, defaults to ``ncores``
+    memory_limit: int, optional
+        Number of bytes of data to hold in memory.  Beyond this the least
+        recently used data spills to disk.  Only used if ``data`` is not given
+    spill_directory: string, optional
+        Where to spill data, defaults to a temporary directory
+    transport: string
+        'tcp' (default) or 'ipc' to listen for peers on a local inter-process
+        socket.  Port and bind address are ignored for 'ipc'
 
     State
     -----
@@ -80,19 +85,41 @@ class Worker(object):
         Router socket to serve requests from other workers
     to_scheduler: zmq.Socket
         Dealer socket to communicate with scheduler
+    pool: ThreadPool
+        Bounded pool of threads that run tasks.  All communication happens on
+        a single event loop thread, see ``Worker.loop``
+    fetches: dict
+        Maps identifiers of ongoing transfers of data from peers to their
+        state, see ``Worker.fetch``
+    queues_by_worker: dict
+        Maps peers to the identifiers of fetches waiting on them and the keys
+        they wait for
 
     See Also
     --------
 
         dask.distributed.scheduler.Scheduler
     """
-    def __init__(self, scheduler, data=None, nthreads=100,
+    def __init__(self, scheduler, data=None, nthreads=None,
                  hostname=None, port_to_workers=None, bind_to_workers='*',
-                 block=False, heartbeat=5):
+                 block=False, heartbeat=5, memory_limit=None,
+                 spill_directory=None, transport='tcp', ncores=1):
         if isinstance(scheduler, unicode):
             scheduler = scheduler.encode()
-        self.data = data if data is not None else dict()
-        self.pool = ThreadPool(nthreads)
+        if data is None:
+            if memory_limit:
+                data = SpillDict(memory_limit, spill_directory)
+            else:
+                data = dict()
+        self.data = data
+        self.pool = ThreadPool(nthreads or ncores)
+        self.ncores = ncores
+        self.active = 0
+        self.queued = 0
+        self.utilization = 0.0
+        self._busy = 0.0
+        self._running = dict()
+        self._window_start = time()
         self.scheduler = scheduler
         self.heartbeat = heartbeat
         self.status = 'run'
@@ -101,17 +128,21 @@ class Worker(object):
         self.hostname = hostname or socket.gethostname()
 
         self.to_workers = self.context.socket(zmq.ROUTER)
-        if port_to_workers is None:
-            port_to_workers = self.to_workers.bind_to_random_port('tcp://' + bind_to_workers)
+        if transport == 'ipc':
+            self.address = ipc_address('worker').encode()
+            self.to_workers.bind(self.address)
         else:
-            self.to_workers.bind('tcp://%s:%d' % (bind_to_workers, port_to_workers))
-        self.address = ('tcp://%s:%s' % (self.hostname, port_to_workers)).encode()
+            if port_to_workers is None:
+                port_to_workers = self.to_workers.bind_to_random_port('tcp://' + bind_to_workers)
+            else:
+                self.to_workers.bind('tcp://%s:%d' % (bind_to_workers, port_to_workers))
+            self.address = ('tcp://%s:%s' % (self.hostname, port_to_workers)).encode()
 
         self.dealers = dict()
 
         self.lock = Lock()
 
-        self.queues = dict()
+        self.fetches = dict()
         self.queues_by_worker = defaultdict(lambda: defaultdict(set))
 
         self.pid = os.getpid()
@@ -121,9 +152,21 @@ class Worker(object):
         self.to_scheduler.setsockopt(zmq.IDENTITY, self.address)
         self.to_scheduler.connect(scheduler)
 
-        self.immediate_functions = {'close': self.close_from_scheduler}
+        # Other threads hand work to the event loop through the inbox
+        self.inbox = Queue()
+        wakeup = 'inproc://wakeup-%s' % uuid.uuid4()
+        self._wakeup_recv = self.context.socket(zmq.PAIR)
+        self._wakeup_recv.bind(wakeup)
+        self._wakeup_send = self.context.socket(zmq.PAIR)
+        self._wakeup_send.connect(wakeup)
+
+        self.poller = zmq.Poller()
+        self.poller.register(self.to_scheduler, zmq.POLLIN)
+        self.poller.register(self.to_workers, zmq.POLLIN)
+        self.poller.register(self._wakeup_recv, zmq.POLLIN)
 
         self.scheduler_functions = {'status': self.status_to_scheduler,
+                                    'close': self.close_from_scheduler,
                                     'compute': self.compute,
                                     'getitem': self.getitem_scheduler,
                                     'delitem': self.delitem,
@@ -132,31 +175,25 @@ class Worker(object):
 
         self.worker_functions = {'getitem': self.getitem_worker,
                                  'getitem-ack': self.getitem_ack,
+                                 'setitem': self.setitem,
                                  'status': self.status_to_worker}
 
-        log(self.address, 'Start up', self.scheduler)
+        logger.info('%s: Start up, scheduler %s', self.address, self.scheduler)
 
-        self._listen_scheduler_thread = Thread(target=self.listen_to_scheduler)
-        self._listen_scheduler_thread.start()
-        self._listen_workers_thread = Thread(target=self.listen_to_workers)
-        self._listen_workers_thread.start()
-        if self.heartbeat:
-            self._heartbeat_thread = Thread(target=self.heart,
-                                            kwargs={'pulse': heartbeat})
-            self._heartbeat_thread.event = Event()
-            self._heartbeat_thread.start()
+        self._loop_thread = Thread(target=self.loop)
+        self._loop_thread.start()
 
         if block:
             self.block()
 
     def status_to_scheduler(self, header, payload):
         out_header = {'jobid': header.get('jobid')}
-        log(self.address, 'Status check', header['address'])
+        logger.debug('%s: Status check from %s', self.address, header['address'])
         self.send_to_scheduler(out_header, 'OK')
 
     def status_to_worker(self, header, payload):
         out_header = {'jobid': header.get('jobid')}
-        log(self.address, 'Status check', header['address'])
+        logger.debug('%s: Status check from %s', self.address, header['address'])
         self.send_to_worker(header['address'], out_header, 'OK')
 
     def getitem_worker(self, header, payload):
@@ -167,7 +204,8 @@ class Worker(object):
         """
         loads = header.get('loads', pickle.loads)
         payload = loads(payload)
-        log(self.address, "Getitem for worker", header, payload)
+        logger.debug('%s: Getitem for worker %s: %s', self.address,
+                     header['address'], payload['key'])
         header2 = {'function': 'getitem-ack',
                    'jobid': header.get('jobid')}
         try:
@@ -186,24 +224,17 @@ class Worker(object):
 
         See also:
             Worker.getitem_worker
-            Worker.collect
+            Worker.fetch
         """
         with logerrors():
             loads = header.get('loads', pickle.loads)
             payload = loads(payload)
-            log(self.address, 'Getitem ack', payload)
-            if header['status'] == 'Bad key':
-                msg = {'status': 'failed',
-                       'key': payload['key'],
-                       'worker': header['address']}
-
-            elif header['status'] == 'OK':
+            logger.debug('%s: Getitem ack %s', self.address, payload['key'])
+            ok = header['status'] == 'OK'
+            if ok:
                 self.data[payload['key']] = payload['value']
-                msg = {'status': 'success',
-                       'key': payload['key'],
-                       'worker': header['address']}
-
-            self.queues[payload['queue']].put(msg)
+            self._received(payload['queue'], payload['key'],
+                           header['address'], ok)
 
     def getitem_scheduler(self, header, payload):
         """ Send local data to scheduler
@@ -214,7 +245,7 @@ class Worker(object):
         """
         loads = header.get('loads', pickle.loads)
         payload = loads(payload)
-        log(self.address, 'Get from scheduler', payload)
+        logger.debug('%s: Get from scheduler %s', self.address, payload['key'])
         key = payload['key']
         header2 = {'jobid': header.get('jobid')}
         try:
@@ -230,6 +261,16 @@ class Worker(object):
     def setitem(self, header, payload):
         """ Assign incoming data to local dictionary
 
+        We acknowledge to the scheduler if the payload holds a ``'queue'`` on
+        which the scheduler waits, or asks for an ``'ack'``.
+
+        If the payload lists further workers under ``'broadcast'`` we first
+        pass the value on to them along a tree.  We split that list among
+        ``BROADCAST_FANOUT`` peers, each of which is responsible for
+        forwarding to its own part of the list.  A value so reaches n workers
+        in about log(n) steps without any one node sending it more than a few
+        times.
+
         See also:
             Scheduler.scatter
             Scheduler.send_data
@@ -237,27 +278,43 @@ class Worker(object):
         """
         loads = header.get('loads', pickle.loads)
         payload = loads(payload)
-        log(self.address, 'Setitem', payload['key'])
+        logger.debug('%s: Setitem %s', self.address, payload['key'])
         key = payload['key']
         value = payload['value']
+        queue = payload.get('queue', False)
+        ack = payload.get('ack', False)
+
+        targets = payload.get('broadcast')
+        if targets:
+            for part in partition_all(int(ceil(len(targets) /
+                                               BROADCAST_FANOUT)), targets):
+                header2 = {'function': 'setitem', 'jobid': header.get('jobid')}
+                payload2 = {'key': key, 'value': value, 'queue': queue,
+                            'ack': ack, 'broadcast': list(part[1:])}
+                self.send_to_worker(part[0], header2, payload2)
+
         self.data[key] = value
 
-        queue = payload.get('queue', False)
-        if queue:
+        if queue or ack:
             header2 = {'jobid': header.get('jobid'),
                        'function': 'setitem-ack'}
             payload2 = {'key': key, 'queue': queue}
-            log(self.address, 'Setitem send ack to scheduler',
-                header2, payload2)
+            logger.debug('%s: Setitem send ack to scheduler %s', self.address,
+                         key)
             self.send_to_scheduler(header2, payload2)
 
     def delitem(self, header, payload):
-        """ Remove item from local data """
+        """ Remove items from local data
+
+        The payload holds either one ``'key'`` or a batch of ``'keys'``.
+        """
         loads = header.get('loads', pickle.loads)
         payload = loads(payload)
-        log(self.address, 'Delitem', payload)
-        key = payload['key']
-        del self.data[key]
+        keys = payload['keys'] if 'keys' in payload else [payload['key']]
+        logger.debug('%s: Delitem %s', self.address, keys)
+        for key in keys:
+            if key in self.data:
+                del self.data[key]
 
         # TODO: this should be replaced with a delitem-ack call
         if payload.get('reply', False):
@@ -265,18 +322,42 @@ class Worker(object):
 
 
     def send_to_scheduler(self, header, payload):
-        """ Send data to scheduler """
-        log(self.address, 'Send to scheduler', header)
+        """ Send data to scheduler
+
+        Safe to call from any thread.  We serialize here and leave the sending
+        to the event loop.
+        """
+        logger.debug('%s: Send to scheduler: %s', self.address, header)
         header['address'] = self.address
-        header['timestamp'] = datetime.utcnow()
+        header['timestamp'] = time()
         dumps = header.get('dumps', pickle_dumps)
-        with self.lock:
-            self.to_scheduler.send_multipart([pickle_dumps(header),
-                                              dumps(payload)])
+        frames = [dumps_header(header), dumps(payload)]
+        if current_thread() is self._loop_thread:
+            self.to_scheduler.send_multipart(frames)
+        else:
+            self.call_soon(self.to_scheduler.send_multipart, frames)
 
     def send_to_worker(self, address, header, payload):
         """ Send data to workers
 
+        Safe to call from any thread, like ``send_to_scheduler``.
+        """
+        header['address'] = self.address
+        header['timestamp'] = time()
+        logger.debug('%s: Send to worker %s: %s', self.address, address, header)
+        dumps = header.get('dumps', pickle_dumps)
+        frames = [dumps_header(header), dumps(payload)]
+        if current_thread() is self._loop_thread:
+            self.dealer(address).send_multipart(frames)
+        else:
+            self.call_soon(self._send_to_dealer, address, frames)
+
+    def _send_to_dealer(self, address, frames):
+        self.dealer(address).send_multipart(frames)
+
+    def dealer(self, address):
+        """ Socket to send messages to a peer
+
         This is a bit tricky.  We want to have one DEALER socket per worker.
         We cache these in ``self.dealers``.  If the number of worker peers is
         high then we might run into having too many file descriptors open.
@@ -291,18 +372,27 @@ class Worker(object):
             sock = self.context.socket(zmq.DEALER)
             sock.connect(address)
             self.dealers[address] = sock
+        return self.dealers[address]
 
-        header['address'] = self.address
-        header['timestamp'] = datetime.utcnow()
-        log(self.address, 'Send to worker', address, header)
-        dumps = header.get('dumps', pickle_dumps)
+    def call_soon(self, func, *args):
+        """ Run ``func(*args)`` on the event loop thread
+
+        The only way for other threads, like those running tasks, to touch the
+        sockets.  Returns immediately.
+        """
+        self.inbox.put((func, args))
         with self.lock:
-            self.dealers[address].send_multipart([pickle_dumps(header),
-                                                  dumps(payload)])
+            if self.status != 'closed':
+                self._wakeup_send.send(b'')
 
-    def listen_to_scheduler(self):
+    def loop(self):
         """
-        Event loop listening to commands from scheduler
+        Event loop, handles all communication of this worker
+
+        One thread polls the socket to the scheduler, the socket serving
+        peers, and the inbox of work handed over by other threads, see
+        ``call_soon``.  It also sends heartbeats.  All sockets are used from
+        this thread only.
 
         Header and Payload should deserialize into dicts of the following form:
 
@@ -331,161 +421,196 @@ class Worker(object):
         >>> payload = {'key': 'x', 'value': 10}
         >>> sock.send_multipart(dumps(header), dumps(status))  # doctest: +SKIP
 
-        We match the function string against ``self.scheduler_functions`` to
-        pull out the actual function.  We then execute this function with the
-        provided arguments in another thread from ``self.pool``.  That function
-        may then choose to send results back to the sender.
+        We match the function string against ``self.scheduler_functions`` or
+        ``self.worker_functions`` to pull out the actual function and call it
+        right here.  These functions must not block.  Waiting on data from
+        peers happens through callbacks, see ``fetch``.  Tasks run on
+        ``self.pool``, see ``compute``.
 
         See Also:
-            listen_to_workers
             send_to_scheduler
+            send_to_worker
         """
-        while self.status != 'closed':
-            # Wait on request
-            try:
-                if not self.to_scheduler.poll(100):
-                    continue
-            except zmq.ZMQError:
-                break
-            with logerrors():
-                with self.lock:
-                    header, payload = self.to_scheduler.recv_multipart()
-                header = pickle.loads(header)
-                log(self.address, 'Receive job from scheduler', header)
-                if header['function'] in self.immediate_functions:
-                    function = self.immediate_functions[header['function']]
-                    function(header, payload)
-                elif header['function'] in self.scheduler_functions:
-                    function = self.scheduler_functions[header['function']]
-                    future = self.pool.apply_async(function, args=(header, payload))
-                else:
-                    log(self.address, 'Unknown function', header)
-
-    def listen_to_workers(self):
-        """ Listen to communications from workers
-
-        See ``listen_to_scheduler`` for more in depth docstring
-        """
-        while self.status != 'closed':
-            # Wait on request
-            try:
-                if not self.to_workers.poll(100):
-                    continue
-            except zmq.ZMQError:
-                break
-
-            with logerrors():
-                address, header, payload = self.to_workers.recv_multipart()
-                header = pickle.loads(header)
-                if 'address' not in header:
-                    header['address'] = address
-                log(self.address, 'Receive job from worker', address, header)
-
+        last_heartbeat = 0
+        try:
+            while self.status != 'closed':
+                if self.heartbeat and time() - last_heartbeat > self.heartbeat:
+                    self.send_heartbeat()
+                    last_heartbeat = time()
                 try:
-                    function = self.worker_functions[header['function']]
-                except KeyError:
-                    log(self.address, 'Unknown function', header)
-                else:
-                    future = self.pool.apply_async(function, args=(header, payload))
+                    socks = dict(self.poller.poll(100))
+                except zmq.ZMQError:
+                    break
+
+                if self._wakeup_recv in socks:
+                    while self._wakeup_recv.poll(0):
+                        self._wakeup_recv.recv()
+                while True:
+                    try:
+                        func, args = self.inbox.get_nowait()
+                    except Empty:
+                        break
+                    self._call(func, *args)
+
+                if self.to_scheduler in socks and self.status != 'closed':
+                    header, payload = self.to_scheduler.recv_multipart()
+                    header = loads_header(header)
+                    logger.debug('%s: Receive job from scheduler: %s',
+                                 self.address, header)
+                    function = self.scheduler_functions.get(header['function'])
+                    if function is None:
+                        logger.warning('%s: Unknown function: %s', self.address,
+                                       header)
+                    else:
+                        self._call(function, header, payload)
+
+                if self.to_workers in socks and self.status != 'closed':
+                    address, header, payload = self.to_workers.recv_multipart()
+                    header = loads_header(header)
+                    if 'address' not in header:
+                        header['address'] = address
+                    logger.debug('%s: Receive job from worker %s: %s',
+                                 self.address, address, header)
+                    function = self.worker_functions.get(header['function'])
+                    if function is None:
+                        logger.warning('%s: Unknown function: %s', self.address,
+                                       header)
+                    else:
+                        self._call(function, header, payload)
+        finally:
+            with self.lock:
+                self.status = 'closed'
+                for sock in self.dealers.values():
+                    sock.close(linger=1)
+                self.to_workers.close(linger=1)
+                self.to_scheduler.close(linger=1)
+                self._wakeup_send.close(linger=0)
+                self._wakeup_recv.close(linger=0)
+            self.context.term()
+            logger.debug('%s: Event loop stops', self.address)
+
+    def _call(self, func, *args):
+        """ Call func on the event loop, log errors rather than stop """
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error("Error: %s", e, exc_info=True)
 
     def block(self):
-        """ Block until listener threads close
+        """ Block until the event loop closes
 
         Warning: If some other thread doesn't call `.close()` then, in the
         common case you can not easily escape from this.
         """
-        self._listen_workers_thread.join()
-        self._listen_scheduler_thread.join()
-        if self.heartbeat:
-            self._heartbeat_thread.join()
-        log(self.address, 'Unblocked')
-
-    def collect(self, locations):
-        """ Collect data from peers
+        if self._loop_thread is not current_thread():  # closed from within
+            self._loop_thread.join()
+        logger.debug('%s: Unblocked', self.address)
 
-        Given a dictionary of desired data and who holds that data
-
-        This fires off getitem reqeusts to one of the hosts for each piece of
-        data then blocks on all of the responses, then inserts this data into
-        ``self.data``.
+    def fetch(self, locations, callback):
+        """ Collect data from peers without blocking
 
-        Example
-        -------
-
-        >>> locations = {'x': ['tcp://alice:5000', 'tcp://bob:5000'],
-        ...              'y': ['tcp://bob:5000']}
-        >>> worker.collect(locations)  # doctest: +SKIP
+        Given a dictionary of desired data and who holds that data.  Calls
+        ``callback(None)`` once all of this data is in ``self.data``, or
+        ``callback(exception)`` if some of it could not be found.  Runs on the
+        event loop, see ``collect`` for the blocking version.
 
         Protocol
         --------
 
-        1.  Worker creates unique queue
+        1.  Worker registers the fetch under a unique identifier, ``qkey``
         2.  For each data this worker chooses a worker at random that holds
             that data and fires off a 'getitem' request
-            {'key': ..., 'queue': ...}
+            {'key': ..., 'queue': qkey}
         3.  Recipient worker handles the request and fires back a 'getitem-ack'
             with the data
-            {'key': ..., 'value': ..., 'queue': ...}
-        4.  Local getitem_ack function adds the value to the local dict and
-            puts the key in the queue
-        5.  Once all keys have run through the queue the collect function wakes
-            up again, releases the queue, and returns control
-        6?  This is often called from Worker.compute; control often ends there
+            {'key': ..., 'value': ..., 'queue': qkey}
+        4.  Local getitem_ack function adds the value to the local dict.  If
+            the peer did not have the data we ask another peer that should
+        5.  Once all keys have arrived we call the callback.  This often runs
+            the task that needed the data, see ``Worker.compute``
 
         See also:
-            Worker.getitem
+            Worker.getitem_worker
             Worker.getitem_ack
             Worker.compute
             Scheduler.trigger_task
         """
-        socks = []
-
+        locations = dict((key, set(locs)) for key, locs in locations.items()
+                         if key not in self.data)  # not already local
+        if not locations:
+            callback(None)
+            return
+        logger.debug('%s: Collect data from peers: %s', self.address, locations)
         qkey = str(uuid.uuid1())
-        queue = Queue()
-        self.queues[qkey] = queue
-        locations = locations.copy()  # don't mutate global locations
-
-        # Send out requests for data
-        log(self.address, 'Collect data from peers', locations)
-        start = time()
-        counter = 0
-        with logerrors():
-            for key, locs in list(locations.items()):
-                if key in self.data:  # already have this locally
-                    locations.pop(key)
-                    continue
-                try:
-                    worker = random.choice(tuple(locs))  # randomly select one peer
-                except IndexError:
-                    raise ValueError("%s could not be collected from any "
-                                     "locations." % (key))
-
-                # track keys and where they are comming from
-                self.queues_by_worker[worker][qkey].add(key)
-
-                header = {'jobid': key,
-                          'function': 'getitem'}
-                payload = {'function': 'getitem',
-                           'key': key,
-                           'queue': qkey}
-                self.send_to_worker(worker, header, payload)
-                counter += 1
-
-            msgs = [queue.get() for i in range(counter)]
-            for m in msgs:
-                if m['status'] == 'failed':
-                    locations[m['key']].remove(m['worker'])
-                    log(self.address, 'Failed to get key: ', m['key'],
-                        ' from worker: ', m['worker'])
-                else:
-                    locations.pop(m['key'])
+        self.fetches[qkey] = {'locations': locations, 'callback': callback,
+                              'start': time()}
+        for key in list(locations):
+            self._request(qkey, key)
+
+    def _request(self, qkey, key):
+        """ Ask a random peer holding key for its data, fail if there is none """
+        fetch = self.fetches[qkey]
+        try:
+            worker = random.choice(tuple(fetch['locations'][key]))
+        except IndexError:
+            del self.fetches[qkey]
+            for waiting in self.queues_by_worker.values():
+                waiting.pop(qkey, None)
+            fetch['callback'](ValueError("%s could not be collected from any "
+                                         "locations." % (key)))
+            return
+
+        # track keys and where they are comming from
+        self.queues_by_worker[worker][qkey].add(key)
+
+        header = {'jobid': key,
+                  'function': 'getitem'}
+        payload = {'function': 'getitem',
+                   'key': key,
+                   'queue': qkey}
+        self.send_to_worker(worker, header, payload)
+
+    def _received(self, qkey, key, worker, ok):
+        """ A peer answered a request of a fetch, with data if ok """
+        waiting = self.queues_by_worker.get(worker, {})
+        waiting.get(qkey, set()).discard(key)
+        if not waiting.get(qkey, True):
+            del waiting[qkey]
+        fetch = self.fetches.get(qkey)
+        if fetch is None or key not in fetch['locations']:
+            return
+        if ok:
+            del fetch['locations'][key]
+            if not fetch['locations']:
+                del self.fetches[qkey]
+                logger.debug('%s: Collect finishes in %f seconds',
+                             self.address, time() - fetch['start'])
+                fetch['callback'](None)
+        else:
+            logger.info('%s: Failed to get key %s from worker %s',
+                        self.address, key, worker)
+            fetch['locations'][key].discard(worker)
+            self._request(qkey, key)
 
-            del self.queues[qkey]
-            if locations != {}:
-                log(self.address, 'Retrying collect with keys and locations',
-                    locations)
-                self.collect(locations)
-            log(self.address, 'Collect finishes', time() - start, 'seconds')
+    def collect(self, locations):
+        """ Collect data from peers, block until it has arrived
+
+        Given a dictionary of desired data and who holds that data
+
+        Example
+        -------
+
+        >>> locations = {'x': ['tcp://alice:5000', 'tcp://bob:5000'],
+        ...              'y': ['tcp://bob:5000']}
+        >>> worker.collect(locations)  # doctest: +SKIP
+
+        Must not be called from the event loop, see ``fetch``.
+        """
+        done = Queue()
+        self.call_soon(self.fetch, locations, done.put)
+        error = done.get()
+        if error is not None:
+            raise error
 
     def compute(self, header, payload):
         """ Compute dask task
@@ -498,26 +623,43 @@ class Worker(object):
         ...            'locations': {'x': ['tcp://alice:5000']},
         ...            'queue': 'unique-identifier'}
 
-        Collect necessary data from locations (see ``collect``),
-        then compute task and store result into ``self.data``.  Finally report
-        back to the scheduler that we're free.
+        Collect necessary data from locations (see ``fetch``), then compute
+        task in ``self.pool`` and store result into ``self.data``.  Finally
+        report back to the scheduler that we're free.  The event loop moves on
+        to other messages while we wait for data or compute.
         """
         with logerrors():
             # Unpack payload
             loads = header.get('loads', pickle.loads)
             payload = loads(payload)
-            locations = payload['locations']
+            with self.lock:
+                self.queued += 1
+
+            def run(error):
+                if error is None:
+                    self.pool.apply_async(self.execute, args=(payload,))
+                else:
+                    with self.lock:
+                        self.queued -= 1
+                    self.report(payload, error, 0)
+
+            self.fetch(payload['locations'], run)
+
+    def execute(self, payload):
+        """ Run a task whose data is local, in a thread of ``self.pool`` """
+        with logerrors():
             key = payload['key']
             task = payload['task']
 
-            # Grab data from peers
-            if locations:
-                self.collect(locations)
-
             # Do actual work
             start = time()
+            token = object()
+            with self.lock:
+                self.queued -= 1
+                self.active += 1
+                self._running[token] = start
             status = "OK"
-            log(self.address, "Start computation", key, task)
+            logger.debug('%s: Start computation %s', self.address, key)
             try:
                 result = core.get(self.data, task)
                 end = time()
@@ -526,43 +668,47 @@ class Worker(object):
                 end = time()
             else:
                 self.data[key] = result
-            log(self.address, "End computation", key, task, status)
-
-            # Report finished to scheduler
-            header2 = {'function': 'finished-task'}
-            result = {'key': key,
-                      'duration': end - start,
-                      'status': status,
-                      'dependencies': list(locations),
-                      'queue': payload['queue']}
-            self.send_to_scheduler(header2, result)
+            logger.debug('%s: End computation %s: %s', self.address, key, status)
+            with self.lock:
+                self.active -= 1
+                del self._running[token]
+                self._busy += end - max(start, self._window_start)
+
+            self.report(payload, status, end - start)
+
+    def report(self, payload, status, duration):
+        """ Report a finished task to the scheduler """
+        header = {'function': 'finished-task'}
+        result = {'key': payload['key'],
+                  'duration': duration,
+                  'status': status,
+                  'dependencies': list(payload['locations']),
+                  'occupancy': self.occupancy(),
+                  'queue': payload['queue']}
+        self.send_to_scheduler(header, result)
 
     def close_from_scheduler(self, header, payload):
-        log(self.address, 'Close signal from scheduler')
+        logger.debug('%s: Close signal from scheduler', self.address)
         self.close()
 
     def close(self):
         with self.lock:
             if self.status != 'closed':
                 self.status = 'closed'
+                self._wakeup_send.send(b'')  # the event loop stops
                 do_close = True
             else:
                 do_close = False
 
         if do_close:
-            log(self.address, 'Close')
-            self.status = 'closed'
-            if self.heartbeat:
-                self._heartbeat_thread.event.set()  # stop heartbeat
-            for sock in self.dealers.values():
-                sock.close(linger=1)
-            self.to_workers.close(linger=1)
-            self.to_scheduler.close(linger=1)
+            logger.info('%s: Close', self.address)
+            self.block()  # the event loop closes the sockets on its way out
             self.pool.close()
-            self.pool.join()
-            log(self.address, 'Close pool')
-            self.block()
-            self.context.destroy(linger=3)
+            if self._loop_thread is not current_thread():
+                self.pool.join()
+                logger.debug('%s: Close pool', self.address)
+            if isinstance(self.data, SpillDict):
+                self.data.close()
 
     def __del__(self):
         self.close()
@@ -572,30 +718,68 @@ class Worker(object):
         return s % (self.address.decode('utf-8')[6:],
                     self.scheduler.decode('utf-8')[6:])
 
-    def heart(self, pulse=5):
-        """Send a message to scheduler at a given interval"""
-        while self.status != 'closed':
-            header = {'function': 'heartbeat'}
-            payload = {'pid': self.pid}
-            self.send_to_scheduler(header, payload)
-            self._heartbeat_thread.event.wait(pulse)
+    def send_heartbeat(self):
+        """ Tell the scheduler that we are alive and how busy we are """
+        header = {'function': 'heartbeat'}
+        payload = {'pid': self.pid}
+        self.update_utilization()
+        payload.update(self.occupancy())
+        self.send_to_scheduler(header, payload)
+
+    def update_utilization(self, decay=0.5):
+        """ Fold the core time used since the last call into ``utilization``
+
+        Called once per heartbeat.  ``utilization`` is an exponentially
+        decayed average of the fraction of core time spent on tasks in each
+        heartbeat window, counting the part of running tasks that falls into
+        the window.
+        """
+        with self.lock:
+            now = time()
+            busy = self._busy + sum(now - max(start, self._window_start)
+                                    for start in self._running.values())
+            elapsed = max(now - self._window_start, 1e-6)
+            sample = min(1.0, busy / (elapsed * self.ncores))
+            self.utilization = decay * self.utilization + (1 - decay) * sample
+            self._busy = 0.0
+            self._window_start = now
+
+    def occupancy(self):
+        """ How busy we are: cores, tasks, utilization and memory
+
+        Queued tasks have been sent to us but do not run yet, because they
+        wait for data from peers or for a free thread.  See
+        ``update_utilization`` for the meaning of utilization.
+        """
+        with self.lock:
+            result = {'ncores': self.ncores,
+                      'active': self.active,
+                      'queued': self.queued,
+                      'utilization': self.utilization}
+        result.update(self.memory_usage())
+        return result
+
+    def memory_usage(self):
+        """ Bytes of data held in memory and on disk, if known """
+        if isinstance(self.data, SpillDict):
+            return {'memory': self.data.memory,
+                    'spilled': self.data.spilled,
+                    'memory_limit': self.data.memory_limit}
+        return {}
 
     def worker_death(self, header, payload):
         """
-        A worker died, check no queues are blocking waiting for data from the
-        worker.
+        A worker died, ask other peers for the data we were waiting on from it
         """
         with logerrors():
             loads = header.get('loads', pickle.loads)
             payload = loads(payload)
             removed_workers = payload['removed']
             for w in removed_workers:
-                for queue, keys in self.queues_by_worker[w].items():
-                    for k in keys:
-                        msg = {'status': 'failed',
-                               'key': k,
-                               'worker': w}
-                        self.queues[queue].put(msg)
+                waiting = self.queues_by_worker.pop(w, {})
+                for qkey, keys in list(waiting.items()):
+                    for k in list(keys):
+                        self._received(qkey, k, w, False)
 
 
 def status():
@@ -1,3 +1,5 @@
+import warnings
+
 from dask.utils import raises
 from dask.core import (istask, get, get_dependencies, flatten, subs,
         preorder_traversal)
@@ -147,6 +149,11 @@ def test_subs_with_unfriendly_eq():
         task = (np.sum, np.array([1, 2]))
         assert (subs(task, (4, 5), 1) == task) is True
 
+        task = (np.sum, [np.array([1, 2]), 'x'])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            assert subs(task, 'x', 1)[1][1] == 1
+
 
 def test_subs_with_surprisingly_friendly_eq():
     try:
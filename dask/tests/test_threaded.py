@@ -4,6 +4,8 @@ from dask.utils import raises
 from operator import add
 from dask.context import set_options
 from multiprocessing.pool import ThreadPool
+from threading import Event
+from time import sleep, time
 
 
 inc = lambda x: x + 1
@@ -37,3 +39,25 @@ def test_reuse_pool():
     with set_options(pool=pool):
         assert get({'x': (inc, 1)}, 'x') == 2
         assert get({'x': (inc, 1)}, 'x') == 2
+
+
+def test_speculative_execution():
+    calls = []
+    stuck = Event()
+
+    def straggle_once(i):
+        calls.append(i)
+        if i == 0 and calls.count(0) == 1:
+            stuck.wait(10)  # the first attempt hangs on a slow disk
+        sleep(0.01)
+        return i
+
+    dsk = dict((('x', i), (straggle_once, i)) for i in range(4))
+    start = time()
+    try:
+        with set_options(pool=ThreadPool(4)):
+            assert get(dsk, sorted(dsk), speculative=True) == (0, 1, 2, 3)
+        assert time() - start < 5
+        assert calls.count(0) == 2
+    finally:
+        stuck.set()